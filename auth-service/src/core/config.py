@@ -33,9 +33,17 @@ class Settings(BaseSettings):
     postgres_password: str = Field(default="1", env="POSTGRES_PASSWORD")
     postgres_db: str = Field(default="test", env="POSTGRES_DB")
 
+    redis_host: str = Field("127.0.0.1", env="REDIS_HOST")
+    redis_port: int = Field(6379, env="REDIS_PORT")
+
     jaeger_host: str = Field(default="jaeger")
     jaeger_port: int = Field(default=6831)
     jaeger_enable_tracer: bool = Field(default=True)
+    trace_sampler_ratio: float = Field(0.1, env="TRACE_SAMPLER_RATIO")
+    trace_sampler_parent_based: bool = Field(True, env="TRACE_SAMPLER_PARENT_BASED")
+    trace_retention_enabled: bool = Field(True, env="TRACE_RETENTION_ENABLED")
+    trace_retention_latency: float = Field(1, validation_alias="TRACE_RETENTION_LATENCY_IN_SECONDS")
+    trace_console_exporter: bool = Field(False, env="TRACE_CONSOLE_EXPORTER")
     super_user_pass: str = Field("some_mega_hard_pass", env="SUPER_USER_PASS")
     super_user_mail: str = Field("superuser@god.com", env="SUPER_USER_MAIL")
 
@@ -45,8 +53,12 @@ class Settings(BaseSettings):
     service_host: str = Field("127.0.0.1")
     service_port: str | int = Field(8000)
 
-    token_bucket_capacity: int = Field(default=10)
-    token_bucket_rate: int = Field(default=1)
+    rate_limit_enabled: bool = Field(True, env="RATE_LIMIT_ENABLED")
+    rate_limit_rate: float = Field(1, validation_alias="RATE_LIMIT_RATE_PER_SECOND")
+    rate_limit_burst: int = Field(10, env="RATE_LIMIT_BURST")
+    rate_limit_fallback_cooldown: float = Field(5, validation_alias="RATE_LIMIT_FALLBACK_COOLDOWN_IN_SECONDS")
+    rate_limit_redis_timeout: float = Field(0.1, validation_alias="RATE_LIMIT_REDIS_TIMEOUT_IN_SECONDS")
+    rate_limit_trusted_proxies: str = Field("127.0.0.1", env="RATE_LIMIT_TRUSTED_PROXIES")
 
     @property
     def postgres_url(self):
@@ -0,0 +1,119 @@
+import threading
+from typing import Optional, Sequence
+
+from opentelemetry.context import Context
+from opentelemetry.sdk.trace import ReadableSpan, Span, SpanProcessor
+from opentelemetry.sdk.trace.sampling import Decision, Sampler, SamplingResult
+from opentelemetry.trace import (
+    Link,
+    SpanContext,
+    SpanKind,
+    StatusCode,
+    TraceFlags,
+    TraceState,
+)
+from opentelemetry.util.types import Attributes
+
+# Traces of unfinished requests buffered by the tail retention, the oldest are dropped beyond it.
+MAX_BUFFERED_TRACES = 10_000
+
+
+class RecordingSampler(Sampler):
+    """
+    Sampler recording the spans the wrapped sampler drops instead of discarding them.
+
+    Recorded spans are not exported by the span processors, only TailRetentionSpanProcessor looks
+    at them, to export the traces which turn out slow or failed.
+    """
+
+    def __init__(self, sampler: Sampler):
+        self.sampler = sampler
+
+    def should_sample(
+        self,
+        parent_context: Optional[Context],
+        trace_id: int,
+        name: str,
+        kind: SpanKind = None,
+        attributes: Attributes = None,
+        links: Sequence[Link] = None,
+        trace_state: TraceState = None,
+    ) -> SamplingResult:
+        result = self.sampler.should_sample(parent_context, trace_id, name, kind, attributes, links, trace_state)
+        if result.decision is Decision.DROP:
+            return SamplingResult(Decision.RECORD_ONLY, attributes, result.trace_state)
+        return result
+
+    def get_description(self) -> str:
+        return f"RecordingSampler{{{self.sampler.get_description()}}}"
+
+
+class TailRetentionSpanProcessor(SpanProcessor):
+    """
+    Span processor passing sampled spans on, and the spans of unsampled traces that are slow or failed.
+
+    The spans of a trace the sampler did not pick are held until the local root span ends, the request
+    span. They are then passed on as sampled if the root took ``latency`` seconds or longer, or if
+    any of them has an error status, and discarded otherwise.
+    """
+
+    def __init__(self, span_processor: SpanProcessor, latency: float):
+        self.span_processor = span_processor
+        self.latency_ns = int(latency * 1_000_000_000)
+        self._traces: dict[int, list[ReadableSpan]] = {}
+        self._lock = threading.Lock()
+
+    def on_start(self, span: Span, parent_context: Optional[Context] = None) -> None:
+        self.span_processor.on_start(span, parent_context=parent_context)
+
+    def on_end(self, span: ReadableSpan) -> None:
+        if span.context.trace_flags.sampled:
+            self.span_processor.on_end(span)
+            return
+        trace_id = span.context.trace_id
+        is_root = span.parent is None or span.parent.is_remote
+        with self._lock:
+            if is_root:
+                spans = self._traces.pop(trace_id, [])
+            else:
+                if trace_id not in self._traces and len(self._traces) >= MAX_BUFFERED_TRACES:
+                    del self._traces[next(iter(self._traces))]
+                self._traces.setdefault(trace_id, []).append(span)
+                return
+        spans.append(span)
+        if span.end_time - span.start_time >= self.latency_ns or any(
+            buffered.status.status_code is StatusCode.ERROR for buffered in spans
+        ):
+            for buffered in spans:
+                self.span_processor.on_end(_sampled(buffered))
+
+    def shutdown(self) -> None:
+        self.span_processor.shutdown()
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return self.span_processor.force_flush(timeout_millis)
+
+
+def _sampled(span: ReadableSpan) -> ReadableSpan:
+    """Copy of the span flagged as sampled, which span processors export."""
+    context = span.context
+    return ReadableSpan(
+        name=span.name,
+        context=SpanContext(
+            trace_id=context.trace_id,
+            span_id=context.span_id,
+            is_remote=context.is_remote,
+            trace_flags=TraceFlags(context.trace_flags | TraceFlags.SAMPLED),
+            trace_state=context.trace_state,
+        ),
+        parent=span.parent,
+        resource=span.resource,
+        attributes=span.attributes,
+        events=span.events,
+        links=span.links,
+        kind=span.kind,
+        status=span.status,
+        start_time=span.start_time,
+        end_time=span.end_time,
+        instrumentation_scope=span.instrumentation_scope,
+    )
@@ -1,5 +1,6 @@
 from api.v1 import auth, oauth, role, user_role
 from core.config import settings
+from core.tracing import RecordingSampler, TailRetentionSpanProcessor
 from db import postgres, redis
 from db.tracer import get_tracer
 from fastapi import FastAPI, Request, status
@@ -8,22 +9,36 @@ from opentelemetry import trace
 from opentelemetry.exporter.jaeger.thrift import JaegerExporter
 from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
 from opentelemetry.sdk.resources import SERVICE_NAME, Resource
-from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace import SynchronousMultiSpanProcessor, TracerProvider
 from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
-from rate_limit.token_bucket import TokenBucket
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+from rate_limit.client_key import ClientKey
+from rate_limit.rate_limiter import RedisRateLimiter
 from redis.asyncio import Redis
 from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 
 
 def configure_tracer() -> None:
     if not settings.jaeger_enable_tracer:
-        return-
+        return
+    sampler = TraceIdRatioBased(settings.trace_sampler_ratio)
+    if settings.trace_sampler_parent_based:
+        sampler = ParentBased(sampler)
+    if settings.trace_retention_enabled:
+        sampler = RecordingSampler(sampler)
+    trace.set_tracer_provider(TracerProvider(resource=Resource.create({SERVICE_NAME: "auth-service"}), sampler=sampler))
+    span_processor = SynchronousMultiSpanProcessor()
     jaeger_exporter = JaegerExporter(agent_host_name=settings.jaeger_host, agent_port=settings.jaeger_port)
-    trace.set_tracer_provider(TracerProvider(resource=Resource.create({SERVICE_NAME: "auth-service"})))
-    trace.get_tracer_provider().add_span_processor(BatchSpanProcessor(jaeger_exporter))
-    # Чтобы видеть трейсы в консоли
-    trace.get_tracer_provider().add_span_processor(BatchSpanProcessor(ConsoleSpanExporter()))
+    span_processor.add_span_processor(BatchSpanProcessor(jaeger_exporter))
+    if settings.trace_console_exporter:
+        # Чтобы видеть трейсы в консоли
+        span_processor.add_span_processor(BatchSpanProcessor(ConsoleSpanExporter()))
+    if settings.trace_retention_enabled:
+        span_processor = TailRetentionSpanProcessor(span_processor, latency=settings.trace_retention_latency)
+    trace.get_tracer_provider().add_span_processor(span_processor)
 
+
+configure_tracer()
 app = FastAPI(
     title=f"Read-only API for {settings.project_name}.",
     description="Information about Authorisation and Roles.",
@@ -34,7 +49,6 @@ app = FastAPI(
     default_response_class=ORJSONResponse,
 )
 FastAPIInstrumentor.instrument_app(app)
-token_bucket = TokenBucket(rate=settings.token_bucket_rate, capacity=settings.token_bucket_capacity)
 
 
 @app.middleware("http")
@@ -51,9 +65,17 @@ async def before_request(request: Request, call_next):
 
 @app.middleware("http")
 async def rate_limit_middleware(request: Request, call_next):
-    if not token_bucket.acquire_token():
-        raise ORJSONResponse(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Too Many Requests")
+    if not settings.rate_limit_enabled:
+        return await call_next(request)
+    rate_limit = await app.state.rate_limiter.acquire(app.state.client_key(request))
+    if not rate_limit.allowed:
+        return ORJSONResponse(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            content={"detail": "Too Many Requests"},
+            headers=rate_limit.headers,
+        )
     response = await call_next(request)
+    response.headers.update(rate_limit.headers)
     return response
 
 
@@ -63,6 +85,18 @@ async def startup():
         host=settings.redis_host,
         port=settings.redis_port,
     )
+    app.state.rate_limiter = RedisRateLimiter(
+        redis=redis.redis,
+        rate=settings.rate_limit_rate,
+        burst=settings.rate_limit_burst,
+        prefix="rate_limit:auth-service",
+        cooldown=settings.rate_limit_fallback_cooldown,
+        timeout=settings.rate_limit_redis_timeout,
+    )
+    app.state.client_key = ClientKey(
+        jwt_secret=settings.jwt_secret,
+        trusted_proxies=settings.rate_limit_trusted_proxies,
+    )
 
     engine = create_async_engine(settings.construct_sqlalchemy_url())
     postgres.session_maker = async_sessionmaker(engine, expire_on_commit=False)
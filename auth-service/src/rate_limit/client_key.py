@@ -0,0 +1,59 @@
+import ipaddress
+from hashlib import sha256
+
+import jwt
+from fastapi import Request
+
+
+class ClientKey:
+    """
+    Key the rate of a request is limited by: the user of the bearer token, or the client address.
+
+    Only tokens signed by the auth service name a user, any other token is keyed by address, as its
+    user id could be made up on every request. The X-Real-IP header is only taken from ``trusted_proxies``,
+    the comma separated addresses or networks of the nginx in front of the service, since anyone else
+    could set it.
+    """
+
+    def __init__(self, jwt_secret: str, trusted_proxies: str):
+        self.jwt_secret = jwt_secret
+        self.trusted_proxies = [
+            ipaddress.ip_network(proxy.strip()) for proxy in trusted_proxies.split(",") if proxy.strip()
+        ]
+
+    def __call__(self, request: Request) -> str:
+        user_id = self._user_id(request.headers.get("Authorization"))
+        if user_id:
+            return f"user:{user_id}"
+        return f"ip:{self._address(request)}"
+
+    def _user_id(self, authorization: str | None) -> str | None:
+        scheme, _, token = (authorization or "").partition(" ")
+        if scheme != "Bearer" or not token:
+            return None
+        try:
+            user_id = jwt.decode(token, options={"verify_signature": False}).get("user_id")
+            if not user_id:
+                return None
+            # The auth service signs the tokens of a user with a key derived from the secret and the user id.
+            key = sha256((self.jwt_secret + str(user_id)).encode("utf-8")).hexdigest()
+            payload = jwt.decode(token, key, algorithms=["HS256"], options={"require": ["exp"]})
+        except jwt.InvalidTokenError:
+            return None
+        return str(payload["user_id"])
+
+    def _address(self, request: Request) -> str:
+        peer = request.client.host if request.client else None
+        if peer is None:
+            return "unknown"
+        real_ip = request.headers.get("X-Real-IP")
+        if real_ip and self._is_trusted_proxy(peer):
+            return real_ip
+        return peer
+
+    def _is_trusted_proxy(self, host: str) -> bool:
+        try:
+            address = ipaddress.ip_address(host)
+        except ValueError:
+            return False
+        return any(address in network for network in self.trusted_proxies)
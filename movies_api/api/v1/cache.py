@@ -0,0 +1,43 @@
+from dataclasses import asdict
+
+from db.local_cache import get_local_cache
+from fastapi import APIRouter, Depends
+from models.oauth import Roles
+from services.film import get_film_service
+from services.genre import get_genre_service
+from services.person import get_person_service
+from services.searchable_model_service import SearchableModelService
+from utils.oauth import allowed_user
+
+router = APIRouter()
+
+
+def _service_stats(service: SearchableModelService) -> dict:
+    stats = service.cache.stats
+    return {**asdict(stats), "compression_ratio": stats.compression.ratio}
+
+
+@router.get(
+    "/stats",
+    summary="Cache statistics.",
+    description="Returns hit and miss counters of the cache tiers and compression figures for every entity.",
+    tags=["Cache"],
+    dependencies=[Depends(allowed_user(roles=[Roles.SUPERUSER, Roles.ADMIN]))],
+)
+async def cache_stats(
+    film_service: SearchableModelService = Depends(get_film_service),
+    genre_service: SearchableModelService = Depends(get_genre_service),
+    person_service: SearchableModelService = Depends(get_person_service),
+    local_cache=Depends(get_local_cache),
+) -> dict:
+    return {
+        "local": {
+            "enabled": local_cache is not None,
+            "entries": len(local_cache) if local_cache is not None else 0,
+            "bytes": local_cache.current_bytes if local_cache is not None else 0,
+            "max_bytes": local_cache.max_bytes if local_cache is not None else 0,
+        },
+        "films": _service_stats(film_service),
+        "genres": _service_stats(genre_service),
+        "persons": _service_stats(person_service),
+    }
@@ -0,0 +1,69 @@
+import hashlib
+from enum import Enum
+from http import HTTPStatus
+from typing import Callable
+
+from core.config import settings
+from fastapi import Header, Response
+
+ETAG_DIGEST_SIZE = 16
+
+
+class CachePolicy(Enum):
+    # Catalogue responses, the same for every client, which shared caches like the CDN may store.
+    PUBLIC = "public"
+    # Responses behind a role check, which only the client may store.
+    PRIVATE = "private"
+    # Pages of a cursor, bound to a point in time, which are revalidated on every use.
+    REVALIDATE = "no-cache"
+
+
+def etag(payload: bytes) -> str:
+    """Strong entity tag of the payload, the cached payloads are byte-identical until the documents change."""
+    return f'"{hashlib.blake2b(payload, digest_size=ETAG_DIGEST_SIZE).hexdigest()}"'
+
+
+def cache_control(policy: CachePolicy) -> str:
+    if policy is CachePolicy.REVALIDATE:
+        return policy.value
+    # Clients may keep the response as long as the service keeps it in its cache, and serve it stale
+    # while revalidating as long as the service would.
+    return f"{policy.value}, max-age={settings.cache_expire_time}, stale-while-revalidate={settings.cache_stale_time}"
+
+
+def _matches(if_none_match: str | None, tag: str) -> bool:
+    """Weak comparison of RFC 9110, which If-None-Match uses."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(candidate.strip().removeprefix("W/") == tag for candidate in if_none_match.split(","))
+
+
+class ConditionalResponder:
+    """Builds JSON responses with an ETag, answering 304 Not Modified when the client has the payload."""
+
+    def __init__(self, if_none_match: str | None, policy: CachePolicy):
+        self.if_none_match = if_none_match
+        self.policy = policy
+
+    def __call__(self, content: bytes, headers: dict[str, str] | None = None) -> Response:
+        tag = etag(content)
+        headers = {**(headers or {}), "ETag": tag, "Cache-Control": cache_control(self.policy)}
+        if _matches(self.if_none_match, tag):
+            return Response(status_code=HTTPStatus.NOT_MODIFIED, headers=headers)
+        return Response(content=content, media_type="application/json", headers=headers)
+
+    def with_policy(self, policy: CachePolicy) -> "ConditionalResponder":
+        return ConditionalResponder(if_none_match=self.if_none_match, policy=policy)
+
+
+def conditional_response(policy: CachePolicy) -> Callable[..., ConditionalResponder]:
+    """Build a dependency returning the responder of the endpoint, with the given caching policy."""
+
+    def dependency(
+        if_none_match: str = Header(None, description="ETag of a previous response, answered with 304 if unchanged"),
+    ) -> ConditionalResponder:
+        return ConditionalResponder(if_none_match=if_none_match, policy=policy)
+
+    return dependency
@@ -1,22 +1,28 @@
 from http import HTTPStatus
 from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from models.film import Film
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from models.film import Film, FilmSuggestion, PartialFilm
 from models.sort import MoviesSortOptions
 from services.film import get_film_service
 
+from .conditional import CachePolicy, ConditionalResponder, conditional_response
+from .pagination import cursor_page_response, cursor_query
+from .query_params import fields_query, ids_query
 from .service_protocol import ModelServiceProtocol
 
 router = APIRouter()
 
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
 
 @router.get(
     "/search",
     summary="Search throw all movies.",
-    description="Search throw all movies.",
+    description="Search throw all movies. With `fields`, the films hold only the requested fields and their id.",
     tags=["Search"],
-    response_model=List[Film],
+    response_model=List[Film] | List[PartialFilm],
 )
 async def film_details_list(
     search: str = Query(None, description="Searching text"),
@@ -26,15 +32,80 @@ async def film_details_list(
     ),
     page_size: int = Query(50, ge=1, le=100, description="Number of films per page"),
     page_number: int = Query(1, ge=1, description="Page number"),
+    cursor: str | None = Depends(cursor_query),
+    fields: set[str] | None = Depends(fields_query(Film)),
     model_service: ModelServiceProtocol[Film] = Depends(get_film_service),
-) -> List[Film]:
-    films = await model_service.get_many_by_parameters(
+    respond: ConditionalResponder = Depends(conditional_response(CachePolicy.PUBLIC)),
+) -> Response:
+    if cursor is not None:
+        return await cursor_page_response(
+            model_service, respond, cursor=cursor, page_size=page_size, search=search, sort=sort, fields=fields
+        )
+    films = await model_service.get_raw_many_by_parameters(
         search=search,
         page_number=page_number,
         page_size=page_size,
         sort=sort,
+        fields=fields,
     )
-    return films
+    return respond(films)
+
+
+@router.get(
+    "/suggest",
+    summary="Suggest films while typing.",
+    description="Returns films whose title starts with the prefix, for search as you type.",
+    tags=["Search"],
+    response_model=List[FilmSuggestion],
+)
+async def film_suggestions(
+    prefix: str = Query(..., min_length=1, max_length=100, description="Beginning of the title"),
+    size: int = Query(10, ge=1, le=20, description="Number of suggestions"),
+    model_service: ModelServiceProtocol[Film] = Depends(get_film_service),
+    respond: ConditionalResponder = Depends(conditional_response(CachePolicy.PUBLIC)),
+) -> Response:
+    suggestions = await model_service.get_raw_suggestions(prefix=prefix, size=size)
+    return respond(suggestions)
+
+
+@router.get(
+    "/export",
+    summary="Export films as a stream.",
+    description=(
+        "Streams every film matching the search as newline-delimited JSON, one film per line, "
+        "for mirroring the catalogue without paginating."
+    ),
+    tags=["Search"],
+    response_class=StreamingResponse,
+    responses={HTTPStatus.OK.value: {"content": {NDJSON_MEDIA_TYPE: {}}}},
+)
+async def film_export(
+    search: str = Query(None, description="Searching text"),
+    sort: MoviesSortOptions = Query(
+        None,
+        description='Sort order (Use "imdb_rating" for ascending or "-imdb_rating" for descending)',
+    ),
+    fields: set[str] | None = Depends(fields_query(Film)),
+    model_service: ModelServiceProtocol[Film] = Depends(get_film_service),
+) -> StreamingResponse:
+    films = model_service.export_raw(search=search, sort=sort, fields=fields)
+    return StreamingResponse(content=films, media_type=NDJSON_MEDIA_TYPE)
+
+
+@router.get(
+    "",
+    summary="Films by ids.",
+    description="Returns films with the given uuids in the requested order, unknown uuids are skipped.",
+    tags=["Movies"],
+    response_model=List[Film],
+)
+async def film_details_by_ids(
+    ids: List[str] = Depends(ids_query),
+    model_service: ModelServiceProtocol[Film] = Depends(get_film_service),
+    respond: ConditionalResponder = Depends(conditional_response(CachePolicy.PUBLIC)),
+) -> Response:
+    films = await model_service.get_raw_many_by_ids(ids)
+    return respond(films)
 
 
 @router.get(
@@ -46,8 +117,9 @@ async def film_details_list(
 async def film_details(
     film_id: str,
     model_service: ModelServiceProtocol[Film] = Depends(get_film_service),
-) -> Film:
-    film = await model_service.get_by_id(film_id)
+    respond: ConditionalResponder = Depends(conditional_response(CachePolicy.PUBLIC)),
+) -> Response:
+    film = await model_service.get_raw_by_id(film_id)
     if not film:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="film not found")
-    return film
+    return respond(film)
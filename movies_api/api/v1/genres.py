@@ -1,10 +1,16 @@
 from http import HTTPStatus
 from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from models.film import Film
 from models.genre import Genre
+from models.sort import MoviesSortOptions
+from services.film import get_film_service
 from services.genre import get_genre_service
 
+from .conditional import CachePolicy, ConditionalResponder, conditional_response
+from .pagination import cursor_page_response, cursor_query
+from .query_params import ids_query
 from .service_protocol import ModelServiceProtocol
 
 router = APIRouter()
@@ -21,15 +27,35 @@ async def genre_details_list(
     search: str = Query(None, description="Searching text"),
     page_size: int = Query(50, ge=1, le=100, description="Number of genres per page"),
     page_number: int = Query(1, ge=1, description="Page number"),
+    cursor: str | None = Depends(cursor_query),
     model_service: ModelServiceProtocol[Genre] = Depends(get_genre_service),
-) -> List[Genre]:
-    genres = await model_service.get_many_by_parameters(
+    respond: ConditionalResponder = Depends(conditional_response(CachePolicy.PUBLIC)),
+) -> Response:
+    if cursor is not None:
+        return await cursor_page_response(model_service, respond, cursor=cursor, page_size=page_size, search=search)
+    genres = await model_service.get_raw_many_by_parameters(
         search=search,
         page_number=page_number,
         page_size=page_size,
     )
 
-    return genres
+    return respond(genres)
+
+
+@router.get(
+    "",
+    summary="Genres by ids.",
+    description="Returns genres with the given uuids in the requested order, unknown uuids are skipped.",
+    tags=["Genres"],
+    response_model=List[Genre],
+)
+async def genre_details_by_ids(
+    ids: List[str] = Depends(ids_query),
+    model_service: ModelServiceProtocol[Genre] = Depends(get_genre_service),
+    respond: ConditionalResponder = Depends(conditional_response(CachePolicy.PUBLIC)),
+) -> Response:
+    genres = await model_service.get_raw_many_by_ids(ids)
+    return respond(genres)
 
 
 @router.get(
@@ -41,9 +67,42 @@ async def genre_details_list(
 async def genre_details(
     genre_id: str,
     model_service: ModelServiceProtocol[Genre] = Depends(get_genre_service),
-) -> Genre:
+    respond: ConditionalResponder = Depends(conditional_response(CachePolicy.PUBLIC)),
+) -> Response:
+    genre = await model_service.get_raw_by_id(genre_id)
+    if not genre:
+        raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="genre not found")
+
+    return respond(genre)
+
+
+@router.get(
+    "/{genre_id}/films",
+    tags=["Genres"],
+    description="Returns films of the genre.",
+    response_model=List[Film],
+)
+async def genre_films(
+    genre_id: str,
+    sort: MoviesSortOptions = Query(
+        None,
+        description='Sort order (Use "imdb_rating" for ascending or "-imdb_rating" for descending)',
+    ),
+    page_size: int = Query(50, ge=1, le=100, description="Number of films per page"),
+    page_number: int = Query(1, ge=1, description="Page number"),
+    model_service: ModelServiceProtocol[Genre] = Depends(get_genre_service),
+    film_service: ModelServiceProtocol[Film] = Depends(get_film_service),
+    respond: ConditionalResponder = Depends(conditional_response(CachePolicy.PUBLIC)),
+) -> Response:
     genre = await model_service.get_by_id(genre_id)
     if not genre:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="genre not found")
 
-    return genre
+    # Films store genres by name.
+    films = await film_service.get_raw_many_related(
+        related_to=("genre", genre.name),
+        page_number=page_number,
+        page_size=page_size,
+        sort=sort,
+    )
+    return respond(films)
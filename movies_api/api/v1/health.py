@@ -0,0 +1,29 @@
+from core.config import settings
+from fastapi import APIRouter, Request, Response, status
+
+router = APIRouter()
+
+
+@router.get(
+    "/ready",
+    summary="Readiness probe.",
+    description=(
+        "Returns 503 until the cache warm-up reaches the configured threshold. Failed warm-up steps are "
+        "retried meanwhile, the body reports how many still fail and the current attempt."
+    ),
+    tags=["Health"],
+)
+async def readiness(request: Request, response: Response) -> dict:
+    warmer = request.app.state.cache_warmer
+    if warmer is None:
+        return {"ready": True}
+    ready = warmer.is_ready(settings.cache_warmup_ready_threshold)
+    if not ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return {
+        "ready": ready,
+        "warmup_progress": warmer.progress,
+        "warmup_failed_steps": warmer.failed,
+        "warmup_attempt": warmer.attempt,
+        "warmup_finished": warmer.finished,
+    }
@@ -0,0 +1,40 @@
+from http import HTTPStatus
+
+from fastapi import HTTPException, Query, Response
+
+from .conditional import CachePolicy, ConditionalResponder
+from .service_protocol import ModelServiceProtocol
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def cursor_query(
+    cursor: str = Query(
+        None,
+        description=(
+            f"Cursor from the {NEXT_CURSOR_HEADER} header of the previous page. "
+            "Pass an empty value to start paginating with cursors instead of page numbers"
+        ),
+    ),
+) -> str | None:
+    return cursor
+
+
+async def cursor_page_response(
+    model_service: ModelServiceProtocol,
+    respond: ConditionalResponder,
+    cursor: str,
+    page_size: int,
+    search: str | None = None,
+    sort: str | None = None,
+    fields: set[str] | None = None,
+) -> Response:
+    try:
+        page, next_cursor = await model_service.get_raw_page_after(
+            cursor=cursor, page_size=page_size, search=search, sort=sort, fields=fields
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail=str(e))
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    # Pages of a cursor depend on its point in time, so they are revalidated rather than stored.
+    return respond.with_policy(CachePolicy.REVALIDATE)(page, headers=headers)
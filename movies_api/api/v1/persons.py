@@ -1,12 +1,18 @@
 from http import HTTPStatus
 from typing import List
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from models.film import Film
 from models.oauth import Roles
-from models.person import Person
+from models.person import Person, PersonSuggestion
+from models.sort import MoviesSortOptions
+from services.film import get_film_service
 from services.person import get_person_service
 from utils.oauth import allowed_user
 
+from .conditional import CachePolicy, ConditionalResponder, conditional_response
+from .pagination import cursor_page_response, cursor_query
+from .query_params import ids_query
 from .service_protocol import ModelServiceProtocol
 
 router = APIRouter()
@@ -24,15 +30,54 @@ async def person_details_list(
     search: str = Query(None, description="Searching text"),
     page_size: int = Query(50, ge=1, le=100, description="Number of persons per page"),
     page_number: int = Query(1, ge=1, description="Page number"),
+    cursor: str | None = Depends(cursor_query),
     model_service: ModelServiceProtocol[Person] = Depends(get_person_service),
-) -> List[Person]:
-    persons = await model_service.get_many_by_parameters(
+    respond: ConditionalResponder = Depends(conditional_response(CachePolicy.PRIVATE)),
+) -> Response:
+    if cursor is not None:
+        return await cursor_page_response(model_service, respond, cursor=cursor, page_size=page_size, search=search)
+    persons = await model_service.get_raw_many_by_parameters(
         search=search,
         page_number=page_number,
         page_size=page_size,
     )
 
-    return persons
+    return respond(persons)
+
+
+@router.get(
+    "/suggest",
+    summary="Suggest persons while typing.",
+    description="Returns persons whose name starts with the prefix, for search as you type.",
+    tags=["Search"],
+    response_model=List[PersonSuggestion],
+    dependencies=[Depends(allowed_user(roles=[Roles.SUPERUSER, Roles.ADMIN, Roles.MODERATOR]))],
+)
+async def person_suggestions(
+    prefix: str = Query(..., min_length=1, max_length=100, description="Beginning of the name"),
+    size: int = Query(10, ge=1, le=20, description="Number of suggestions"),
+    model_service: ModelServiceProtocol[Person] = Depends(get_person_service),
+    respond: ConditionalResponder = Depends(conditional_response(CachePolicy.PRIVATE)),
+) -> Response:
+    suggestions = await model_service.get_raw_suggestions(prefix=prefix, size=size)
+    return respond(suggestions)
+
+
+@router.get(
+    "",
+    summary="Persons by ids.",
+    description="Returns persons with the given uuids in the requested order, unknown uuids are skipped.",
+    tags=["Persons"],
+    response_model=List[Person],
+    dependencies=[Depends(allowed_user(roles=[Roles.SUPERUSER, Roles.ADMIN, Roles.MODERATOR]))],
+)
+async def person_details_by_ids(
+    ids: List[str] = Depends(ids_query),
+    model_service: ModelServiceProtocol[Person] = Depends(get_person_service),
+    respond: ConditionalResponder = Depends(conditional_response(CachePolicy.PRIVATE)),
+) -> Response:
+    persons = await model_service.get_raw_many_by_ids(ids)
+    return respond(persons)
 
 
 @router.get(
@@ -45,9 +90,41 @@ async def person_details_list(
 async def person_details(
     person_id: str,
     model_service: ModelServiceProtocol[Person] = Depends(get_person_service),
-) -> Person:
-    person = await model_service.get_by_id(person_id)
+    respond: ConditionalResponder = Depends(conditional_response(CachePolicy.PRIVATE)),
+) -> Response:
+    person = await model_service.get_raw_by_id(person_id)
     if not person:
         raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="person not found")
 
-    return person
+    return respond(person)
+
+
+@router.get(
+    "/{person_id}/films",
+    tags=["Persons"],
+    description="Returns films the person acted in or wrote.",
+    response_model=List[Film],
+    dependencies=[Depends(allowed_user(roles=[Roles.SUPERUSER, Roles.ADMIN, Roles.MODERATOR]))],
+)
+async def person_films(
+    person_id: str,
+    sort: MoviesSortOptions = Query(
+        None,
+        description='Sort order (Use "imdb_rating" for ascending or "-imdb_rating" for descending)',
+    ),
+    page_size: int = Query(50, ge=1, le=100, description="Number of films per page"),
+    page_number: int = Query(1, ge=1, description="Page number"),
+    model_service: ModelServiceProtocol[Person] = Depends(get_person_service),
+    film_service: ModelServiceProtocol[Film] = Depends(get_film_service),
+    respond: ConditionalResponder = Depends(conditional_response(CachePolicy.PRIVATE)),
+) -> Response:
+    if not await model_service.get_raw_by_id(person_id):
+        raise HTTPException(status_code=HTTPStatus.NOT_FOUND, detail="person not found")
+
+    films = await film_service.get_raw_many_related(
+        related_to=("person", person_id),
+        page_number=page_number,
+        page_size=page_size,
+        sort=sort,
+    )
+    return respond(films)
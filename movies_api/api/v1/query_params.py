@@ -0,0 +1,39 @@
+from http import HTTPStatus
+from typing import Callable, List, Optional, Type
+
+from fastapi import HTTPException, Query
+from pydantic import BaseModel
+
+MAX_IDS_PER_REQUEST = 100
+
+
+def ids_query(
+    ids: List[str] = Query(None, description=f"Comma separated or repeated ids, at most {MAX_IDS_PER_REQUEST}"),
+) -> List[str]:
+    parsed_ids = [instance_id for value in ids or [] for instance_id in value.split(",") if instance_id]
+    if not parsed_ids:
+        raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail="ids are required")
+    if len(parsed_ids) > MAX_IDS_PER_REQUEST:
+        raise HTTPException(status_code=HTTPStatus.BAD_REQUEST, detail=f"at most {MAX_IDS_PER_REQUEST} ids are allowed")
+    return parsed_ids
+
+
+def fields_query(model: Type[BaseModel]) -> Callable[..., Optional[set[str]]]:
+    """Build a dependency parsing a comma separated subset of the model fields to return. The id is always returned."""
+
+    def dependency(
+        fields: str = Query(
+            None, description=f"Comma separated fields to return, any of: {', '.join(model.model_fields)}"
+        ),
+    ) -> Optional[set[str]]:
+        if not fields:
+            return None
+        field_set = {name.strip() for name in fields.split(",") if name.strip()}
+        unknown_fields = field_set - model.model_fields.keys()
+        if unknown_fields:
+            raise HTTPException(
+                status_code=HTTPStatus.BAD_REQUEST, detail=f"unknown fields: {', '.join(sorted(unknown_fields))}"
+            )
+        return field_set | {"id"}
+
+    return dependency
@@ -1,4 +1,4 @@
-from typing import List, Optional, Protocol, TypeVar
+from typing import AsyncIterator, List, Optional, Protocol, Set, Tuple, TypeVar
 
 from pydantic import BaseModel
 
@@ -13,3 +13,49 @@ class ModelServiceProtocol(Protocol[T]):
         self, search: Optional[str], page_number: int, page_size: int, sort: str = None
     ) -> List[Optional[T]]:
         ...
+
+    async def get_raw_by_id(self, model_id: str) -> Optional[bytes]:
+        ...
+
+    async def get_raw_many_by_parameters(
+        self,
+        search: Optional[str],
+        page_number: int,
+        page_size: int,
+        sort: str = None,
+        fields: Optional[Set[str]] = None,
+    ) -> bytes:
+        ...
+
+    async def get_raw_page_after(
+        self,
+        cursor: str,
+        page_size: int,
+        search: Optional[str] = None,
+        sort: str = None,
+        fields: Optional[Set[str]] = None,
+    ) -> Tuple[bytes, Optional[str]]:
+        ...
+
+    def export_raw(
+        self,
+        search: Optional[str] = None,
+        sort: str = None,
+        fields: Optional[Set[str]] = None,
+    ) -> AsyncIterator[bytes]:
+        ...
+
+    async def get_raw_suggestions(self, prefix: str, size: int) -> bytes:
+        ...
+
+    async def get_raw_many_related(
+        self,
+        related_to: Tuple[str, str],
+        page_number: int,
+        page_size: int,
+        sort: str = None,
+    ) -> bytes:
+        ...
+
+    async def get_raw_many_by_ids(self, model_ids: List[str]) -> bytes:
+        ...
@@ -0,0 +1,72 @@
+"""
+Per-request CPU spent on a cache hit: model round trip vs. serving the cached bytes.
+
+Run from the movies_api directory:
+
+    python -m benchmarks.cache_hit
+"""
+import asyncio
+import time
+from typing import List
+
+import orjson
+from benchmarks.documents import make_film_source
+from fastapi.responses import ORJSONResponse, Response
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from models.film import Film
+
+ITERATIONS = 2000
+PAGE_SIZE = 50
+
+
+def make_film() -> Film:
+    return Film.deserialize_search({"_source": make_film_source()})
+
+
+async def model_hit(field, cached: bytes, is_list: bool) -> bytes:
+    """The path before the fast path: parse, build models, re-validate against response_model, re-serialize."""
+    if is_list:
+        content = [Film.model_validate_json(item) for item in orjson.loads(cached)]
+    else:
+        content = Film.model_validate_json(cached)
+    serialized = await serialize_response(field=field, response_content=content)
+    return ORJSONResponse(serialized).body
+
+
+async def raw_hit(cached: bytes, is_list: bool) -> bytes:
+    if is_list:
+        cached = b"[" + b",".join(cached) + b"]"
+    return Response(content=cached, media_type="application/json").body
+
+
+async def measure(name: str, func, *args) -> float:
+    started = time.process_time()
+    for _ in range(ITERATIONS):
+        await func(*args)
+    per_request = (time.process_time() - started) / ITERATIONS * 1_000_000
+    print(f"{name:<32} {per_request:10.1f} us/request")
+    return per_request
+
+
+async def main():
+    films = [make_film() for _ in range(PAGE_SIZE)]
+    detail_cached = films[0].model_dump_json().encode()
+    # The list format written by put_list_to_cache before the fast path: a JSON array of JSON strings.
+    list_cached_old = orjson.dumps([film.model_dump_json() for film in films])
+    list_cached_raw = [film.model_dump_json().encode() for film in films]
+
+    detail_field = create_response_field(name="detail", type_=Film)
+    list_field = create_response_field(name="list", type_=List[Film])
+
+    before = await measure("detail, model round trip", model_hit, detail_field, detail_cached, False)
+    after = await measure("detail, cached bytes", raw_hit, detail_cached, False)
+    print(f"{'detail, CPU saved':<32} {before - after:10.1f} us/request\n")
+
+    before = await measure(f"list of {PAGE_SIZE}, model round trip", model_hit, list_field, list_cached_old, True)
+    after = await measure(f"list of {PAGE_SIZE}, cached bytes", raw_hit, list_cached_raw, True)
+    print(f"{'list, CPU saved':<32} {before - after:10.1f} us/request")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,53 @@
+"""
+Compression ratio and encode/decode time of cache entries for every available codec.
+
+Run from the movies_api directory:
+
+    python -m benchmarks.compression
+"""
+import time
+
+import orjson
+from benchmarks.documents import make_film_source
+from cache_storage.cache_entry import CacheEntry
+from cache_storage.compression import Codec, lz4_frame
+from models.film import Film
+
+ITERATIONS = 2000
+
+
+def measure(name: str, payload: bytes, codec: Codec):
+    entry = CacheEntry(payload=payload, soft_expire_at=time.time())
+
+    started = time.perf_counter()
+    for _ in range(ITERATIONS):
+        data = entry.encode(codec)
+    encode_us = (time.perf_counter() - started) / ITERATIONS * 1_000_000
+
+    started = time.perf_counter()
+    for _ in range(ITERATIONS):
+        CacheEntry.decode(data)
+    decode_us = (time.perf_counter() - started) / ITERATIONS * 1_000_000
+
+    ratio = len(payload) / len(data)
+    print(
+        f"{name:<16} {codec.name:<5} {len(payload):>8} -> {len(data):>8} bytes  "
+        f"ratio {ratio:5.2f}  encode {encode_us:8.1f} us  decode {decode_us:8.1f} us"
+    )
+
+
+def main():
+    films = [Film.deserialize_search({"_source": make_film_source()}) for _ in range(100)]
+    payloads = {
+        "film document": films[0].model_dump_json().encode(),
+        "page of 100": b"[" + b",".join(film.model_dump_json().encode() for film in films) + b"]",
+        "page ids": orjson.dumps([film.id for film in films]),
+    }
+    codecs = [Codec.NONE, Codec.ZLIB] + ([Codec.LZ4] if lz4_frame is not None else [])
+    for name, payload in payloads.items():
+        for codec in codecs:
+            measure(name, payload, codec)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+CPU spent building the models of a page, per-item constructors vs. validating the page at once.
+
+Run from the movies_api directory:
+
+    python -m benchmarks.deserialization
+"""
+import json
+import time
+
+import orjson
+from benchmarks.documents import make_film_source
+from models.film import FILM_LIST_ADAPTER, Film
+from models.genre import MovieGenre
+from models.person import PERSON_LIST_ADAPTER, MoviePerson, MoviePersonName, Person
+
+ITERATIONS = 200
+PAGE_SIZE = 100
+
+
+def constructors_search(document) -> Film:
+    """Film.deserialize_search before the fast path: a constructor call for every nested object."""
+    source = document["_source"]
+    return Film(
+        id=source["id"],
+        title=source["title"],
+        description=source["description"],
+        imdb_rating=source["imdb_rating"],
+        actors=[MoviePerson(id=person["id"], full_name=person["name"]) for person in source["actors"]],
+        writers=[MoviePerson(id=person["id"], full_name=person["name"]) for person in source["writers"]],
+        directors=[MoviePersonName(full_name=name) for name in source["director"] if name is not None],
+        genres=[MovieGenre(name=name) for name in source["genre"]],
+    )
+
+
+def constructors_cache(data: bytes) -> Film:
+    """Film.deserialize_cache before the fast path: parsing to dicts, then constructors."""
+    film = orjson.loads(data)
+    return Film(
+        id=film["id"],
+        title=film["title"],
+        description=film["description"],
+        imdb_rating=film["imdb_rating"],
+        actors=[MoviePerson(id=person["id"], full_name=person["full_name"]) for person in film["actors"]],
+        writers=[MoviePerson(id=person["id"], full_name=person["full_name"]) for person in film["writers"]],
+        directors=[MoviePersonName(full_name=director["full_name"]) for director in film["directors"]],
+        genres=[MovieGenre(name=genre["name"]) for genre in film["genres"]],
+    )
+
+
+def measure(name: str, func, *args) -> float:
+    started = time.process_time()
+    for _ in range(ITERATIONS):
+        func(*args)
+    per_page = (time.process_time() - started) / ITERATIONS * 1_000_000
+    print(f"{name:<44} {per_page:10.1f} us/page")
+    return per_page
+
+
+def compare(name: str, before: float, after: float):
+    print(f"{name + ', speedup':<44} {before / after:10.1f} x\n")
+
+
+def main():
+    documents = [{"_source": make_film_source()} for _ in range(PAGE_SIZE)]
+    films = Film.deserialize_search_many(documents)
+    assert films == [constructors_search(document) for document in documents]
+    film_payloads = [film.model_dump_json().encode() for film in films]
+    persons = [
+        Person(id=f"person-{i}", full_name=f"Person Name {i}", films=[{"id": film.id, "roles": ["actor"]}])
+        for i, film in enumerate(films)
+    ]
+    person_payloads = [person.model_dump_json().encode() for person in persons]
+    print(f"Pages of {PAGE_SIZE} documents\n")
+
+    before = measure("films from search, constructors", lambda: [constructors_search(doc) for doc in documents])
+    after = measure("films from search, one validation", Film.deserialize_search_many, documents)
+    compare("films from search", before, after)
+
+    before = measure("films from cache, constructors", lambda: [constructors_cache(data) for data in film_payloads])
+    after = measure(
+        "films from cache, JSON array validation",
+        lambda: FILM_LIST_ADAPTER.validate_json(b"[" + b",".join(film_payloads) + b"]"),
+    )
+    compare("films from cache", before, after)
+
+    before = measure(
+        "persons from cache, json.loads + validate",
+        lambda: [Person.model_validate(json.loads(data)) for data in person_payloads],
+    )
+    after = measure(
+        "persons from cache, JSON array validation",
+        lambda: PERSON_LIST_ADAPTER.validate_json(b"[" + b",".join(person_payloads) + b"]"),
+    )
+    compare("persons from cache", before, after)
+
+
+if __name__ == "__main__":
+    main()
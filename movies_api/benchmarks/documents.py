@@ -0,0 +1,25 @@
+import random
+import uuid
+
+
+def make_person(name: str) -> dict:
+    return {"id": str(uuid.uuid4()), "name": name}
+
+
+def make_film_source(actors: int = 12, writers: int = 4) -> dict:
+    """Build an Elasticsearch document of the movies index with a realistic amount of nested data."""
+    actors_list = [make_person(f"Actor Name {i}") for i in range(actors)]
+    writers_list = [make_person(f"Writer Name {i}") for i in range(writers)]
+    return {
+        "id": str(uuid.uuid4()),
+        "title": "Star Wars: Episode IV - A New Hope",
+        "description": "The Imperial Forces, under orders from cruel Darth Vader, hold Princess Leia hostage "
+        "in their efforts to quell the rebellion against the Galactic Empire.",
+        "imdb_rating": round(random.uniform(1, 10), 1),
+        "actors_names": [actor["name"] for actor in actors_list],
+        "writers_names": [writer["name"] for writer in writers_list],
+        "director": ["George Lucas"],
+        "genre": ["Action", "Adventure", "Fantasy", "Sci-Fi"],
+        "actors": actors_list,
+        "writers": writers_list,
+    }
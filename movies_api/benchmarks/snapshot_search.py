@@ -0,0 +1,71 @@
+"""
+Latency of the searches the film service sends, answered by the snapshot search engine.
+
+Run from the movies_api directory:
+
+    python -m benchmarks.snapshot_search
+"""
+import asyncio
+import os
+import tempfile
+import time
+
+from benchmarks.documents import make_film_source
+from opentelemetry import trace
+from search_engine.snapshot_format import write_snapshot
+from search_engine.snapshot_search_engine import SnapshotSearchEngine
+from services.film import FILM_SEARCH_PROFILE
+from services.search_service import FilmSearchService
+
+FILMS = 10_000
+ITERATIONS = 200
+PAGE_SIZE = 50
+TITLES = ["Star Wars", "The Lord of the Rings", "Back to the Future", "Blade Runner", "The Matrix"]
+
+
+def make_films() -> list[dict]:
+    films = []
+    for i in range(FILMS):
+        source = make_film_source()
+        source["title"] = f"{TITLES[i % len(TITLES)]} {i}"
+        source["title_suggest"] = [source["title"]]
+        films.append(source)
+    return films
+
+
+async def measure(name: str, func) -> None:
+    # The first call builds the inverted indexes the search needs.
+    started = time.perf_counter()
+    await func()
+    first = (time.perf_counter() - started) * 1000
+    started = time.perf_counter()
+    for _ in range(ITERATIONS):
+        await func()
+    per_search = (time.perf_counter() - started) / ITERATIONS * 1000
+    print(f"{name:<36} {per_search:8.2f} ms/search, first {first:8.1f} ms")
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "search.snapshot")
+        write_snapshot(path, {"movies": make_films()})
+        engine = SnapshotSearchEngine(path)
+        service = FilmSearchService(
+            search_engine=engine, index="movies", tracer=trace.get_tracer(__name__), profile=FILM_SEARCH_PROFILE
+        )
+        print(f"{FILMS} films, snapshot of {os.path.getsize(path) / 1024 / 1024:.1f} MiB\n")
+
+        await measure("top rated page", lambda: service.get_by_parameters(1, PAGE_SIZE, sort="-imdb_rating"))
+        await measure("top rated, page 20", lambda: service.get_by_parameters(20, PAGE_SIZE, sort="-imdb_rating"))
+        await measure("phrase search", lambda: service.get_by_parameters(1, PAGE_SIZE, search="blade runner"))
+        await measure("fuzzy search", lambda: service.get_by_parameters(1, PAGE_SIZE, search="matrx"))
+        await measure(
+            "genre films by rating",
+            lambda: service.get_by_parameters(1, PAGE_SIZE, sort="-imdb_rating", related_to=("genre", "Action")),
+        )
+        await measure("suggestions", lambda: service.suggest(prefix="the ma", size=10))
+        await engine.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
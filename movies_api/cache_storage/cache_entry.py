@@ -0,0 +1,57 @@
+import struct
+import sys
+import time
+from dataclasses import dataclass
+
+from cache_storage.compression import Codec, compress, decompress
+
+ENTRY_FORMAT_VERSION = 2
+ENTRY_HEADER = struct.Struct(">BBd")
+# Version 1 entries were written without the codec byte.
+ENTRY_HEADER_V1 = struct.Struct(">Bd")
+
+
+@dataclass
+class CacheEntry:
+    """
+    Cached payload together with its soft expiry.
+
+    After ``soft_expire_at`` (unix time) the entry is still served but is considered stale
+    and should be refreshed. The hard expiry is the TTL of the key in the storage.
+
+    Encoded layout: 1 byte format version, 1 byte codec, 8 bytes soft expiry, payload
+    compressed with the codec. Entries written before the header existed are decoded
+    as never stale.
+    """
+
+    payload: bytes
+    soft_expire_at: float
+
+    @property
+    def is_stale(self) -> bool:
+        return time.time() >= self.soft_expire_at
+
+    def encode(self, codec: Codec = Codec.NONE) -> bytes:
+        payload = self.payload
+        if codec != Codec.NONE:
+            compressed = compress(payload, codec)
+            if len(compressed) < len(payload):
+                payload = compressed
+            else:
+                codec = Codec.NONE
+        return ENTRY_HEADER.pack(ENTRY_FORMAT_VERSION, codec, self.soft_expire_at) + payload
+
+    @classmethod
+    def decode(cls, data: bytes) -> "CacheEntry":
+        version = data[0]
+        if version == ENTRY_FORMAT_VERSION:
+            _, codec, soft_expire_at = ENTRY_HEADER.unpack_from(data)
+            payload = decompress(data[ENTRY_HEADER.size :], Codec(codec))
+            return cls(payload=payload, soft_expire_at=soft_expire_at)
+        if version == 1:
+            _, soft_expire_at = ENTRY_HEADER_V1.unpack_from(data)
+            return cls(payload=data[ENTRY_HEADER_V1.size :], soft_expire_at=soft_expire_at)
+        return cls(payload=data, soft_expire_at=float("inf"))
+
+    def __sizeof__(self) -> int:
+        return object.__sizeof__(self) + sys.getsizeof(self.payload)
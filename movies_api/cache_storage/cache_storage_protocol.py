@@ -14,6 +14,30 @@ class CacheStorageProtocol(Protocol):
         """Retrieve state from the Redis storage."""
         ...
 
+    async def mget(self, keys, *args) -> list[Optional[Any]]:
+        """Retrieve several states from the Redis storage in one round trip."""
+        ...
+
+    async def delete(self, *names) -> int:
+        """Remove states from the Redis storage."""
+        ...
+
+    async def xread(self, streams, count=None, block=None) -> list:
+        """Read messages from Redis streams."""
+        ...
+
+    async def xrevrange(self, name, max="+", min="-", count=None) -> list:
+        """Read messages of a Redis stream, latest first."""
+        ...
+
+    def pipeline(self, transaction: bool = True):
+        """Create a pipeline that sends buffered commands to the Redis storage at once."""
+        ...
+
+    def lock(self, name, timeout=None, thread_local=True):
+        """Create a lock shared by every client of the Redis storage."""
+        ...
+
     async def close(self, close_connection_pool: Optional[bool] = None) -> None:
         """
         Closes Redis client connection
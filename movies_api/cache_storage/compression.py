@@ -0,0 +1,48 @@
+import zlib
+from enum import IntEnum
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:  # pragma: no cover - lz4 is optional, zlib is always available
+    lz4_frame = None
+
+ZLIB_LEVEL = 1
+
+
+class Codec(IntEnum):
+    NONE = 0
+    ZLIB = 1
+    LZ4 = 2
+
+
+def get_codec(name: str) -> Codec:
+    """Resolve a codec by name, falling back to zlib when lz4 is not installed."""
+    codec = Codec[name.upper()]
+    if codec == Codec.LZ4 and lz4_frame is None:
+        return Codec.ZLIB
+    return codec
+
+
+def compress(data: bytes, codec: Codec) -> bytes:
+    if codec == Codec.LZ4:
+        return lz4_frame.compress(data)
+    if codec == Codec.ZLIB:
+        return zlib.compress(data, ZLIB_LEVEL)
+    return data
+
+
+def decompress(data: bytes, codec: Codec) -> bytes:
+    """Decompress the data, raising ValueError if it can not be decompressed with the codec."""
+    if codec == Codec.LZ4:
+        if lz4_frame is None:
+            raise ValueError("Data is compressed with lz4, but lz4 is not installed")
+        try:
+            return lz4_frame.decompress(data)
+        except RuntimeError as e:
+            raise ValueError(e) from e
+    if codec == Codec.ZLIB:
+        try:
+            return zlib.decompress(data)
+        except zlib.error as e:
+            raise ValueError(e) from e
+    return data
@@ -0,0 +1,65 @@
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+
+class LocalCache:
+    """
+    In-process LRU cache bounded by the memory footprint of stored values.
+
+    Used as a per-worker tier in front of Redis. Entries expire after ``ttl`` seconds
+    (or earlier if a shorter expiration time is passed to ``set``), and the least
+    recently used entries are evicted once ``max_bytes`` is exceeded.
+
+    The footprint of a value is taken from ``sys.getsizeof``, so values other than
+    bytes should implement ``__sizeof__`` to account for what they reference.
+    """
+
+    def __init__(self, max_bytes: int, ttl: int):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.current_bytes = 0
+        self._entries: OrderedDict[str, tuple[float, Any, int]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expire_at, value, _ = entry
+        if expire_at <= time.monotonic():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, expiration_time: Optional[int] = None) -> None:
+        if isinstance(value, str):
+            value = value.encode()
+        size = sys.getsizeof(key) + sys.getsizeof(value)
+        if size > self.max_bytes:
+            return
+        ttl = self.ttl if expiration_time is None else min(self.ttl, expiration_time)
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (time.monotonic() + ttl, value, size)
+        self.current_bytes += size
+        while self.current_bytes > self.max_bytes:
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+
+    def delete(self, *keys: str) -> None:
+        for key in keys:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.current_bytes = 0
+
+    def _remove(self, key: str) -> None:
+        _, _, size = self._entries.pop(key)
+        self.current_bytes -= size
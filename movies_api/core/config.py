@@ -11,17 +11,80 @@ logging_config.dictConfig(LOGGING)
 class Settings(BaseSettings):
     project_name: str = Field("movies", env="PROJECT_NAME")
 
-    token_bucket_capacity: int = Field(10, env="TOKEN_BUCKET_CAPACITY")
-    token_bucket_rate: int = Field(1, env="TOKEN_BUCKET_RATE")
+    rate_limit_enabled: bool = Field(True, env="RATE_LIMIT_ENABLED")
+    rate_limit_rate: float = Field(1, validation_alias="RATE_LIMIT_RATE_PER_SECOND")
+    rate_limit_burst: int = Field(10, env="RATE_LIMIT_BURST")
+    rate_limit_fallback_cooldown: float = Field(5, validation_alias="RATE_LIMIT_FALLBACK_COOLDOWN_IN_SECONDS")
+    rate_limit_redis_timeout: float = Field(0.1, validation_alias="RATE_LIMIT_REDIS_TIMEOUT_IN_SECONDS")
+    rate_limit_trusted_proxies: str = Field("127.0.0.1", env="RATE_LIMIT_TRUSTED_PROXIES")
 
     jaeger_host: str = Field("jaeger", env="JAEGER_HOST")
     jaeger_port: int = Field(6831, env="JAEGER_PORT")
     jaeger_enable_tracer: bool = Field(default=True, env="JAEGER_ENABLE_TRACER")
+    trace_sampler_ratio: float = Field(0.1, env="TRACE_SAMPLER_RATIO")
+    trace_sampler_parent_based: bool = Field(True, env="TRACE_SAMPLER_PARENT_BASED")
+    trace_retention_enabled: bool = Field(True, env="TRACE_RETENTION_ENABLED")
+    trace_retention_latency: float = Field(1, validation_alias="TRACE_RETENTION_LATENCY_IN_SECONDS")
+    trace_console_exporter: bool = Field(False, env="TRACE_CONSOLE_EXPORTER")
+
+    request_deadline: float = Field(10, validation_alias="REQUEST_DEADLINE_IN_SECONDS")
+
+    jwt_secret: str = Field("some_mega_encrypting_word", env="JWT_SECRET")
 
     auth_service_host: str = Field("127.0.0.1", env="AUTH_SERVICE_HOST")
     auth_service_port: int = Field(8080, env="AUTH_SERVICE_PORT")
 
     cache_expire_time: int = Field(300, env="CACHE_EXPIRE_TIME_IN_SECONDS")
+    cache_stale_time: int = Field(3600, validation_alias="CACHE_STALE_TIME_IN_SECONDS")
+    cache_negative_expire_time: int = Field(30, validation_alias="CACHE_NEGATIVE_EXPIRE_TIME_IN_SECONDS")
+    cache_compression_codec: str = Field("lz4", env="CACHE_COMPRESSION_CODEC")
+    cache_compression_threshold: int = Field(1024, validation_alias="CACHE_COMPRESSION_THRESHOLD_IN_BYTES")
+    cache_invalidation_enabled: bool = Field(True, env="CACHE_INVALIDATION_ENABLED")
+    cache_invalidation_stream: str = Field("search_index_changes", env="CACHE_INVALIDATION_STREAM")
+
+    cache_retry_attempts: int = Field(1, env="CACHE_RETRY_ATTEMPTS")
+    cache_retry_wait_base: float = Field(0.05, validation_alias="CACHE_RETRY_WAIT_BASE_IN_SECONDS")
+    cache_retry_wait_max: float = Field(0.5, validation_alias="CACHE_RETRY_WAIT_MAX_IN_SECONDS")
+    cache_attempt_timeout: float = Field(0.5, validation_alias="CACHE_ATTEMPT_TIMEOUT_IN_SECONDS")
+    cache_breaker_failure_threshold: int = Field(5, env="CACHE_BREAKER_FAILURE_THRESHOLD")
+    cache_breaker_reset_timeout: float = Field(10, validation_alias="CACHE_BREAKER_RESET_TIMEOUT_IN_SECONDS")
+
+    cache_warmup_enabled: bool = Field(True, env="CACHE_WARMUP_ENABLED")
+    cache_warmup_film_pages: int = Field(5, env="CACHE_WARMUP_FILM_PAGES")
+    cache_warmup_page_size: int = Field(50, env="CACHE_WARMUP_PAGE_SIZE")
+    cache_warmup_concurrency: int = Field(4, env="CACHE_WARMUP_CONCURRENCY")
+    cache_warmup_ready_threshold: float = Field(0.9, env="CACHE_WARMUP_READY_THRESHOLD")
+
+    search_retry_attempts: int = Field(3, env="SEARCH_RETRY_ATTEMPTS")
+    search_retry_wait_base: float = Field(0.1, validation_alias="SEARCH_RETRY_WAIT_BASE_IN_SECONDS")
+    search_retry_wait_max: float = Field(2, validation_alias="SEARCH_RETRY_WAIT_MAX_IN_SECONDS")
+    search_attempt_timeout: float = Field(5, validation_alias="SEARCH_ATTEMPT_TIMEOUT_IN_SECONDS")
+    # Below the attempt timeout, so that a hanging Elasticsearch fails over to the snapshot within the attempt.
+    elastic_request_timeout: float = Field(3, validation_alias="ELASTIC_REQUEST_TIMEOUT_IN_SECONDS")
+    search_breaker_failure_threshold: int = Field(5, env="SEARCH_BREAKER_FAILURE_THRESHOLD")
+    search_breaker_reset_timeout: float = Field(10, validation_alias="SEARCH_BREAKER_RESET_TIMEOUT_IN_SECONDS")
+
+    search_cursor_point_in_time: bool = Field(False, env="SEARCH_CURSOR_POINT_IN_TIME")
+    search_cursor_keep_alive: str = Field("1m", env="SEARCH_CURSOR_KEEP_ALIVE")
+
+    export_batch_size: int = Field(500, env="EXPORT_BATCH_SIZE")
+    export_prefetch_batches: int = Field(2, env="EXPORT_PREFETCH_BATCHES")
+
+    search_batching_enabled: bool = Field(False, env="SEARCH_BATCHING_ENABLED")
+    search_batch_window: float = Field(0.0005, validation_alias="SEARCH_BATCH_WINDOW_IN_SECONDS")
+    search_batch_max_size: int = Field(16, env="SEARCH_BATCH_MAX_SIZE")
+
+    search_snapshot_path: str = Field("", env="SEARCH_SNAPSHOT_PATH")
+    search_snapshot_only: bool = Field(False, env="SEARCH_SNAPSHOT_ONLY")
+    search_snapshot_check_interval: float = Field(5, validation_alias="SEARCH_SNAPSHOT_CHECK_INTERVAL_IN_SECONDS")
+    search_fallback_cooldown: float = Field(30, validation_alias="SEARCH_FALLBACK_COOLDOWN_IN_SECONDS")
+
+    local_cache_enabled: bool = Field(False, env="LOCAL_CACHE_ENABLED")
+    local_cache_max_bytes: int = Field(64 * 1024 * 1024, env="LOCAL_CACHE_MAX_BYTES")
+    local_cache_ttl: int = Field(30, validation_alias="LOCAL_CACHE_TTL_IN_SECONDS")
+
+    single_flight_redis_lock: bool = Field(False, env="SINGLE_FLIGHT_REDIS_LOCK")
+    single_flight_lock_timeout: float = Field(10, validation_alias="SINGLE_FLIGHT_LOCK_TIMEOUT_IN_SECONDS")
 
     redis_host: str = Field("127.0.0.1", env="REDIS_PORT")
     redis_port: int = Field(6379, env="PROJECT_NAME")
@@ -0,0 +1,63 @@
+from prometheus_client import Counter, Gauge, Histogram
+
+# Labels: entity is film, genre or person; operation is by-id, by-ids, list, cursor, suggest or export.
+
+CACHE_HITS = Counter(
+    "movies_api_cache_hits_total",
+    "Cache lookups served from a cache tier.",
+    ["entity", "operation", "tier"],
+)
+CACHE_MISSES = Counter(
+    "movies_api_cache_misses_total",
+    "Cache lookups missing from a cache tier.",
+    ["entity", "operation", "tier"],
+)
+CACHE_BYPASSES = Counter(
+    "movies_api_cache_bypasses_total",
+    "Cache calls skipped or failed because Redis is unavailable.",
+    ["entity"],
+)
+CACHE_LATENCY = Histogram(
+    "movies_api_cache_latency_seconds",
+    "Time spent reading the cache.",
+    ["entity", "operation"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1),
+)
+SEARCH_LATENCY = Histogram(
+    "movies_api_search_latency_seconds",
+    "Time spent querying the search engine, per attempt.",
+    ["entity", "operation"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+RESULT_SIZE = Histogram(
+    "movies_api_result_size",
+    "Number of documents returned to the client.",
+    ["entity", "operation"],
+    buckets=(0, 1, 5, 10, 20, 50, 100),
+)
+PAYLOAD_BYTES = Histogram(
+    "movies_api_payload_bytes",
+    "Size of the response body.",
+    ["entity", "operation"],
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576),
+)
+MSEARCH_BATCH_SIZE = Histogram(
+    "movies_api_msearch_batch_size",
+    "Number of searches sent together in one _msearch request.",
+    buckets=(1, 2, 4, 8, 16, 32, 64),
+)
+SEARCH_FALLBACKS = Counter(
+    "movies_api_search_fallbacks_total",
+    "Search engine requests answered from the snapshot while Elasticsearch is unavailable.",
+    ["method"],
+)
+RETRIES = Counter(
+    "movies_api_retries_total",
+    "Retries of failed cache and search calls.",
+    ["method"],
+)
+CIRCUIT_BREAKER_OPEN = Gauge(
+    "movies_api_circuit_breaker_open",
+    "Whether the circuit breaker of a dependency is open, 1 if it is.",
+    ["dependency"],
+)
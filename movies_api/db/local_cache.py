@@ -0,0 +1,7 @@
+from cache_storage.local_cache import LocalCache
+
+local_cache: LocalCache | None = None
+
+
+async def get_local_cache() -> LocalCache | None:
+    return local_cache
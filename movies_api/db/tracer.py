@@ -1,5 +1,9 @@
 from opentelemetry import trace
 
+# Proxy tracer delegates to the provider configured at startup. Returning the same object
+# keeps lru_cache'd service factories from building a new service on every request.
+tracer: trace.Tracer = trace.get_tracer(__name__)
+
 
 async def get_tracer() -> trace.Tracer:
-    return trace.get_tracer(__name__)
+    return tracer
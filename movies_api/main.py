@@ -1,28 +1,59 @@
-from api.v1 import films, genres, persons
+import asyncio
+import contextlib
+import logging
+
+from api.v1 import cache, films, genres, health, persons
+from cache_storage.local_cache import LocalCache
 from core.config import settings
-from db import elastic, redis
-from db.tracer import get_tracer
+from core.tracing import RecordingSampler, TailRetentionSpanProcessor
+from db import elastic, local_cache, redis
+from db.tracer import get_tracer, tracer
 from elasticsearch import AsyncElasticsearch
-from fastapi import FastAPI, Request, status
+from fastapi import FastAPI, Request, Response, status
 from fastapi.responses import ORJSONResponse
 from opentelemetry import trace
 from opentelemetry.exporter.jaeger.thrift import JaegerExporter
 from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
 from opentelemetry.sdk.resources import SERVICE_NAME, Resource
-from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace import SynchronousMultiSpanProcessor, TracerProvider
 from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
-from rate_limit.token_bucket import TokenBucket
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from rate_limit.client_key import ClientKey
+from rate_limit.rate_limiter import RedisRateLimiter
 from redis.asyncio import Redis
+from resilience.deadline import request_deadline
+from resilience.errors import DependencyUnavailable
+from search_engine.fallback_search_engine import FallbackSearchEngine
+from search_engine.msearch_batcher import MSearchBatcher
+from search_engine.snapshot_search_engine import SnapshotSearchEngine
+from services.cache_invalidation import CacheInvalidator
+from services.cache_warmup import CacheWarmer
+from services.film import get_film_service
+from services.genre import get_genre_service
+from services.person import get_person_service
+
+logger = logging.getLogger(__name__)
 
 
 def configure_tracer() -> None:
     if not settings.jaeger_enable_tracer:
         return
+    sampler = TraceIdRatioBased(settings.trace_sampler_ratio)
+    if settings.trace_sampler_parent_based:
+        sampler = ParentBased(sampler)
+    if settings.trace_retention_enabled:
+        sampler = RecordingSampler(sampler)
+    trace.set_tracer_provider(TracerProvider(resource=Resource.create({SERVICE_NAME: "movies-api"}), sampler=sampler))
+    span_processor = SynchronousMultiSpanProcessor()
     jaeger_exporter = JaegerExporter(agent_host_name=settings.jaeger_host, agent_port=settings.jaeger_port)
-    trace.set_tracer_provider(TracerProvider(resource=Resource.create({SERVICE_NAME: "movies-api"})))
-    trace.get_tracer_provider().add_span_processor(BatchSpanProcessor(jaeger_exporter))
-    # Чтобы видеть трейсы в консоли
-    trace.get_tracer_provider().add_span_processor(BatchSpanProcessor(ConsoleSpanExporter()))
+    span_processor.add_span_processor(BatchSpanProcessor(jaeger_exporter))
+    if settings.trace_console_exporter:
+        # Чтобы видеть трейсы в консоли
+        span_processor.add_span_processor(BatchSpanProcessor(ConsoleSpanExporter()))
+    if settings.trace_retention_enabled:
+        span_processor = TailRetentionSpanProcessor(span_processor, latency=settings.trace_retention_latency)
+    trace.get_tracer_provider().add_span_processor(span_processor)
 
 
 configure_tracer()
@@ -36,29 +67,43 @@ app = FastAPI(
     root_path="/movies",
 )
 FastAPIInstrumentor.instrument_app(app)
+# Paths polled by infrastructure rather than called by clients.
+SERVICE_PATHS = ("/metrics", "/api/v1/health/ready")
 
 
 @app.middleware("http")
 async def before_request(request: Request, call_next):
+    if request.scope["path"] in SERVICE_PATHS:
+        return await call_next(request)
     request_id = request.headers.get("X-Request-Id")
     if not request_id:
         return ORJSONResponse(status_code=status.HTTP_400_BAD_REQUEST, content={"detail": "X-Request-Id is required"})
     tracer = await get_tracer()
-    with tracer.start_as_current_span("movies-api") as span:
+    with tracer.start_as_current_span("movies-api") as span, request_deadline(settings.request_deadline):
         span.set_attribute("http.request_id", request_id)
         response = await call_next(request)
         return response
 
 
-token_bucket = TokenBucket(rate=settings.token_bucket_rate, capacity=settings.token_bucket_capacity)
+@app.exception_handler(DependencyUnavailable)
+async def dependency_unavailable_handler(request: Request, exc: DependencyUnavailable):
+    return ORJSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content={"detail": str(exc)})
 
 
 @app.middleware("http")
 async def rate_limit_middleware(request: Request, call_next):
-    if not token_bucket.acquire_token():
-        raise ORJSONResponse(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Too Many Requests")
+    if request.scope["path"] in SERVICE_PATHS or not settings.rate_limit_enabled:
+        return await call_next(request)
+    rate_limit = await app.state.rate_limiter.acquire(app.state.client_key(request))
+    if not rate_limit.allowed:
+        return ORJSONResponse(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            content={"detail": "Too Many Requests"},
+            headers=rate_limit.headers,
+        )
 
     response = await call_next(request)
+    response.headers.update(rate_limit.headers)
     return response
 
 
@@ -68,11 +113,86 @@ async def startup():
         host=settings.redis_host,
         port=settings.redis_port,
     )
-    elastic.es = AsyncElasticsearch(hosts=[settings.elastic_url])
+    app.state.rate_limiter = RedisRateLimiter(
+        redis=redis.redis,
+        rate=settings.rate_limit_rate,
+        burst=settings.rate_limit_burst,
+        prefix="rate_limit:movies-api",
+        cooldown=settings.rate_limit_fallback_cooldown,
+        timeout=settings.rate_limit_redis_timeout,
+    )
+    app.state.client_key = ClientKey(
+        jwt_secret=settings.jwt_secret,
+        trusted_proxies=settings.rate_limit_trusted_proxies,
+    )
+    if settings.search_snapshot_only:
+        elastic.es = SnapshotSearchEngine(
+            path=settings.search_snapshot_path,
+            check_interval=settings.search_snapshot_check_interval,
+        )
+    else:
+        if settings.elastic_request_timeout >= settings.search_attempt_timeout:
+            logger.warning(
+                "Elasticsearch request timeout %ss is not below the search attempt timeout %ss, "
+                "a hanging Elasticsearch fails the attempt before the snapshot fallback answers",
+                settings.elastic_request_timeout,
+                settings.search_attempt_timeout,
+            )
+        elastic.es = AsyncElasticsearch(hosts=[settings.elastic_url], request_timeout=settings.elastic_request_timeout)
+        if settings.search_batching_enabled:
+            elastic.es = MSearchBatcher(
+                search_engine=elastic.es,
+                window=settings.search_batch_window,
+                max_batch_size=settings.search_batch_max_size,
+            )
+        if settings.search_snapshot_path:
+            # The snapshot is loaded on the first fallback, the ETL may not have written it yet.
+            elastic.es = FallbackSearchEngine(
+                primary=elastic.es,
+                fallback=SnapshotSearchEngine(
+                    path=settings.search_snapshot_path,
+                    check_interval=settings.search_snapshot_check_interval,
+                ),
+                cooldown=settings.search_fallback_cooldown,
+            )
+    if settings.local_cache_enabled:
+        local_cache.local_cache = LocalCache(max_bytes=settings.local_cache_max_bytes, ttl=settings.local_cache_ttl)
+    # Keyword arguments in the order FastAPI passes them, so that lru_cache returns the request-time services.
+    film_service, genre_service, person_service = (
+        get_service(redis=redis.redis, elastic=elastic.es, tracer=tracer, local_cache=local_cache.local_cache)
+        for get_service in (get_film_service, get_genre_service, get_person_service)
+    )
+    if settings.cache_invalidation_enabled:
+        invalidator = CacheInvalidator(
+            cache_storage=redis.redis,
+            services=[film_service, genre_service, person_service],
+            stream=settings.cache_invalidation_stream,
+        )
+        app.state.cache_invalidation = asyncio.create_task(invalidator.run())
+    app.state.cache_warmer = None
+    if settings.cache_warmup_enabled:
+        app.state.cache_warmer = CacheWarmer(
+            film_service=film_service,
+            genre_service=genre_service,
+            film_pages=settings.cache_warmup_film_pages,
+            page_size=settings.cache_warmup_page_size,
+            concurrency=settings.cache_warmup_concurrency,
+        )
+        app.state.cache_warmup = asyncio.create_task(
+            app.state.cache_warmer.run(threshold=settings.cache_warmup_ready_threshold)
+        )
 
 
 @app.on_event("shutdown")
 async def shutdown():
+    if settings.cache_invalidation_enabled:
+        app.state.cache_invalidation.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await app.state.cache_invalidation
+    if settings.cache_warmup_enabled:
+        app.state.cache_warmup.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await app.state.cache_warmup
     await redis.redis.close()
     await elastic.es.close()
 
@@ -90,6 +210,19 @@ app.include_router(
     persons.router,
     prefix="/api/v1/persons",
 )
+app.include_router(
+    cache.router,
+    prefix="/api/v1/cache",
+)
+app.include_router(
+    health.router,
+    prefix="/api/v1/health",
+)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics() -> Response:
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
 
 
 if __name__ == "__main__":
@@ -1,9 +1,33 @@
-import orjson
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter
 
 from .genre import MovieGenre
 from .person import MoviePerson, MoviePersonName
 
+# Source fields of the search index holding every field of the film model.
+FILM_SOURCE_FIELDS = {
+    "id": "id",
+    "title": "title",
+    "description": "description",
+    "imdb_rating": "imdb_rating",
+    "actors": "actors",
+    "writers": "writers",
+    "directors": "director",
+    "genres": "genre",
+}
+
+
+class FilmSuggestion(BaseModel):
+    """
+    Represents a film suggested while the title is being typed.
+
+    Attributes:
+    - id (str): Unique identifier
+    - title (str): The title of the film.
+    """
+
+    id: str
+    title: str
+
 
 class Film(BaseModel):
     """
@@ -31,62 +55,53 @@ class Film(BaseModel):
 
     @staticmethod
     def deserialize_search(document):
-        return Film(
-            id=document["_source"]["id"],
-            title=document["_source"]["title"],
-            description=document["_source"]["description"],
-            imdb_rating=document["_source"]["imdb_rating"],
-            actors=[
-                MoviePerson(
-                    id=person["id"],
-                    full_name=person["name"],
-                )
-                for person in document["_source"]["actors"]
-            ],
-            writers=[
-                MoviePerson(
-                    id=person["id"],
-                    full_name=person["name"],
-                )
-                for person in document["_source"]["writers"]
-            ],
-            directors=[
-                MoviePersonName(full_name=director_name)
-                for director_name in document["_source"]["director"]
-                if director_name is not None
-            ],
-            genres=[MovieGenre(name=genre_name) for genre_name in document["_source"]["genre"]],
-        )
+        return Film.model_validate(_film_values(document["_source"], FILM_SOURCE_FIELDS))
 
     @staticmethod
-    def deserialize_cache(film_str: str):
-        film = orjson.loads(film_str)
-
-        return Film(
-            id=film["id"],
-            title=film["title"],
-            description=film["description"],
-            imdb_rating=film["imdb_rating"],
-            actors=[
-                MoviePerson(
-                    id=person["id"],
-                    full_name=person["full_name"],
-                )
-                for person in film["actors"]
-                if person is not None
-            ],
-            writers=[
-                MoviePerson(
-                    id=person["id"],
-                    full_name=person["full_name"],
-                )
-                for person in film["writers"]
-                if person is not None
-            ],
-            directors=[
-                MoviePersonName(full_name=director["full_name"])
-                for director in film["directors"]
-                if director is not None
-            ],
-            genres=[MovieGenre(name=genre["name"]) for genre in film["genres"] if genre is not None],
+    def deserialize_search_many(documents) -> list["Film"]:
+        """Build the films of search hits, validating the whole page at once."""
+        return FILM_LIST_ADAPTER.validate_python(
+            [_film_values(document["_source"], FILM_SOURCE_FIELDS) for document in documents]
         )
+
+    @staticmethod
+    def deserialize_search_fields(document, fields: set[str]) -> "PartialFilm":
+        """
+        Build a film holding only ``fields`` from a document fetched with their source fields.
+
+        The other fields are left unset, so the film must be serialized with ``include=fields``.
+        """
+        return PartialFilm.model_validate(_film_values(document["_source"], fields))
+
+
+class PartialFilm(BaseModel):
+    """
+    Represents a film holding only the fields requested with the ``fields`` query parameter.
+
+    Attributes are the ones of Film, all of them optional apart from the id.
+    """
+
+    id: str
+    title: str | None = None
+    description: str | None = None
+    imdb_rating: float | None = None
+    actors: list[MoviePerson] | None = None
+    writers: list[MoviePerson] | None = None
+    directors: list[MoviePersonName] | None = None
+    genres: list[MovieGenre] | None = None
+
+
+FILM_LIST_ADAPTER = TypeAdapter(list[Film])
+
+
+def _film_values(source: dict, fields) -> dict:
+    """Values of the film fields in the shape of the model, from the source of a search document."""
+    values = {name: source[FILM_SOURCE_FIELDS[name]] for name in fields}
+    for role in ("actors", "writers"):
+        if values.get(role) is not None:
+            values[role] = [{"id": person["id"], "full_name": person["name"]} for person in values[role]]
+    if values.get("directors") is not None:
+        values["directors"] = [{"full_name": name} for name in values["directors"] if name is not None]
+    if values.get("genres") is not None:
+        values["genres"] = [{"name": name} for name in values["genres"]]
+    return values
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter
 
 
 class MovieGenre(BaseModel):
@@ -25,3 +25,6 @@ class Genre(BaseModel):
     id: str
     name: str
     description: str | None
+
+
+GENRE_LIST_ADAPTER = TypeAdapter(list[Genre])
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter
 
 
 class PersonFilms(BaseModel):
@@ -36,6 +36,19 @@ class MoviePersonName(BaseModel):
     full_name: str
 
 
+class PersonSuggestion(BaseModel):
+    """
+    Represents a person suggested while the name is being typed.
+
+    Attributes:
+    - id (str): Unique identifier
+    - full_name (str): The full_name of the person.
+    """
+
+    id: str
+    full_name: str
+
+
 class Person(BaseModel):
     """
     Represents a person associated with a film.
@@ -50,3 +63,6 @@ class Person(BaseModel):
     id: str
     full_name: str
     films: list["PersonFilms"] | None
+
+
+PERSON_LIST_ADAPTER = TypeAdapter(list[Person])
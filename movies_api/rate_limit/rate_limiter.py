@@ -0,0 +1,126 @@
+import asyncio
+import logging
+import math
+import time
+from dataclasses import dataclass
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+logger = logging.getLogger(__name__)
+
+# Generic cell rate algorithm: the key holds the theoretical arrival time of the next request, and a request
+# is allowed while that time is less than `burst` emission intervals ahead. The clock of Redis is used, so that
+# every worker and node agree on it. Fractions are returned as strings, Lua numbers are truncated to integers.
+GCRA_SCRIPT = """
+local emission_interval = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local clock = redis.call("TIME")
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local arrival = math.max(tonumber(redis.call("GET", KEYS[1])) or now, now)
+local next_arrival = arrival + emission_interval
+local allow_at = next_arrival - burst * emission_interval
+if now < allow_at then
+    return {0, 0, tostring(allow_at - now), tostring(arrival - now)}
+end
+redis.call("SET", KEYS[1], tostring(next_arrival), "PX", math.ceil((next_arrival - now) * 1000))
+return {1, math.floor((now - allow_at) / emission_interval + 1e-9), "0", tostring(next_arrival - now)}
+"""
+# Clients the local limiter tracks before it forgets the ones that regained their whole burst.
+MAX_LOCAL_KEYS = 100_000
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    allowed: bool
+    limit: int
+    remaining: int
+    # Seconds until the client may send the next request, zero if the request is allowed.
+    retry_after: float
+    # Seconds until the client regains the whole burst.
+    reset_after: float
+
+    @property
+    def headers(self) -> dict[str, str]:
+        """Headers of the RateLimit header fields draft, and Retry-After for rejected requests."""
+        headers = {
+            "RateLimit-Limit": str(self.limit),
+            "RateLimit-Remaining": str(self.remaining),
+            "RateLimit-Reset": str(math.ceil(self.reset_after)),
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(math.ceil(self.retry_after))
+        return headers
+
+
+class LocalRateLimiter:
+    """The same algorithm over the clients of the process, for when Redis is unreachable."""
+
+    def __init__(self, rate: float, burst: int):
+        self.emission_interval = 1 / rate
+        self.burst = burst
+        self._arrivals: dict[str, float] = {}
+
+    def acquire(self, key: str) -> RateLimit:
+        now = time.monotonic()
+        if len(self._arrivals) >= MAX_LOCAL_KEYS:
+            self._arrivals = {client: arrival for client, arrival in self._arrivals.items() if arrival > now}
+        arrival = max(self._arrivals.get(key, now), now)
+        next_arrival = arrival + self.emission_interval
+        allow_at = next_arrival - self.burst * self.emission_interval
+        if now < allow_at:
+            return RateLimit(
+                allowed=False, limit=self.burst, remaining=0, retry_after=allow_at - now, reset_after=arrival - now
+            )
+        self._arrivals[key] = next_arrival
+        return RateLimit(
+            allowed=True,
+            limit=self.burst,
+            remaining=math.floor((now - allow_at) / self.emission_interval + 1e-9),
+            retry_after=0.0,
+            reset_after=next_arrival - now,
+        )
+
+
+class RedisRateLimiter:
+    """
+    Rate limiter shared by every worker and node through one atomic Redis script per request.
+
+    Clients may send ``burst`` requests at once, then ``rate`` requests per second. While Redis is
+    unreachable, or takes more than ``timeout`` seconds to answer, requests are limited by a
+    LocalRateLimiter of the process, and Redis is not tried again for ``cooldown`` seconds, so that
+    requests do not wait for its timeouts in the meantime.
+    """
+
+    def __init__(self, redis: Redis, rate: float, burst: int, prefix: str, cooldown: float, timeout: float):
+        self.script = redis.register_script(GCRA_SCRIPT)
+        self.emission_interval = 1 / rate
+        self.burst = burst
+        self.prefix = prefix
+        self.cooldown = cooldown
+        self.timeout = timeout
+        self.local = LocalRateLimiter(rate=rate, burst=burst)
+        self._redis_down_until = 0.0
+
+    async def acquire(self, key: str) -> RateLimit:
+        if time.monotonic() >= self._redis_down_until:
+            try:
+                async with asyncio.timeout(self.timeout):
+                    allowed, remaining, retry_after, reset_after = await self.script(
+                        keys=[f"{self.prefix}:{key}"], args=[self.emission_interval, self.burst]
+                    )
+            except (RedisError, TimeoutError) as e:
+                logger.warning("Redis is unreachable, limiting the rate in the process: %r", e)
+                self._redis_down_until = time.monotonic() + self.cooldown
+            else:
+                if self._redis_down_until:
+                    logger.info("Redis is reachable again, limiting the rate in Redis")
+                    self._redis_down_until = 0.0
+                return RateLimit(
+                    allowed=bool(allowed),
+                    limit=self.burst,
+                    remaining=int(remaining),
+                    retry_after=float(retry_after),
+                    reset_after=float(reset_after),
+                )
+        return self.local.acquire(key)
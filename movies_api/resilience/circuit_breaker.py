@@ -0,0 +1,59 @@
+import logging
+import time
+
+from core.metrics import CIRCUIT_BREAKER_OPEN
+
+from .errors import CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """
+    Stops calling a dependency after ``failure_threshold`` consecutive failures.
+
+    Once open, calls fail at once for ``reset_timeout`` seconds. Then the breaker is half-open:
+    a single call is let through as a probe, which closes the breaker if it succeeds and opens it
+    again if it fails. A probe that never reports, e.g. cancelled with its request, is replaced by
+    another one after ``reset_timeout`` seconds.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.half_open = False
+        self._open_until = 0.0
+
+    @property
+    def is_open(self) -> bool:
+        return self.failures >= self.failure_threshold
+
+    def before_call(self):
+        """Raise CircuitOpenError unless the call may go to the dependency."""
+        if not self.is_open:
+            return
+        now = time.monotonic()
+        if now < self._open_until:
+            raise CircuitOpenError(f"{self.name} is unavailable, its circuit breaker is open")
+        self.half_open = True
+        self._open_until = now + self.reset_timeout
+
+    def record_success(self):
+        if self.is_open:
+            logger.info("%s is available again, closing its circuit breaker", self.name)
+            CIRCUIT_BREAKER_OPEN.labels(self.name).set(0)
+        self.failures = 0
+        self.half_open = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.half_open:
+            # The probe failed, the dependency is still unavailable.
+            self.half_open = False
+            self._open_until = time.monotonic() + self.reset_timeout
+        elif self.failures == self.failure_threshold:
+            logger.warning("%s failed %s times in a row, opening its circuit breaker", self.name, self.failures)
+            CIRCUIT_BREAKER_OPEN.labels(self.name).set(1)
+            self._open_until = time.monotonic() + self.reset_timeout
@@ -0,0 +1,27 @@
+import contextlib
+import time
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+@contextlib.contextmanager
+def request_deadline(seconds: float | None) -> Iterator[None]:
+    """
+    Limit the dependency calls made within the block to a time budget, or lift the limit with None.
+
+    Tasks created within the block inherit the deadline, so work outliving the request, like
+    background refreshes, lifts it before being scheduled.
+    """
+    token = _deadline.set(None if seconds is None else time.monotonic() + seconds)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_time() -> float | None:
+    """Seconds left of the budget of the current request, None outside of requests."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
@@ -0,0 +1,10 @@
+class DependencyUnavailable(Exception):
+    """A dependency failed every attempt the policy allowed, or was not called at all."""
+
+
+class CircuitOpenError(DependencyUnavailable):
+    """The circuit breaker of the dependency is open, so it was not called."""
+
+
+class DeadlineExceeded(DependencyUnavailable):
+    """The request has no time left for the call."""
@@ -0,0 +1,96 @@
+import asyncio
+import functools
+import inspect
+import logging
+import random
+from typing import Any, Awaitable, Callable
+
+from core.metrics import RETRIES
+
+from .circuit_breaker import CircuitBreaker
+from .deadline import remaining_time
+from .errors import DeadlineExceeded, DependencyUnavailable
+
+logger = logging.getLogger(__name__)
+
+
+class ResiliencePolicy:
+    """
+    Calls to one dependency on the request path.
+
+    A call makes at most ``attempts`` attempts, each limited to ``attempt_timeout`` seconds and to
+    the time left to the request. Between attempts it waits a random time up to ``wait_base``
+    seconds, doubled after every attempt and capped at ``wait_max``, unless the request has no time
+    left for it. Only transient errors and timeouts are retried and counted by the circuit breaker,
+    other errors are raised at once, as the dependency did answer.
+
+    Raises DependencyUnavailable, or a subclass of it, when the call did not succeed in time.
+    """
+
+    def __init__(
+        self,
+        breaker: CircuitBreaker,
+        is_transient: Callable[[Exception], bool],
+        attempts: int,
+        wait_base: float,
+        wait_max: float,
+        attempt_timeout: float,
+    ):
+        self.breaker = breaker
+        self.is_transient = is_transient
+        self.attempts = attempts
+        self.wait_base = wait_base
+        self.wait_max = wait_max
+        self.attempt_timeout = attempt_timeout
+
+    async def call(self, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        for attempt in range(1, self.attempts + 1):
+            self.breaker.before_call()
+            remaining = remaining_time()
+            if remaining is not None and remaining <= 0:
+                raise DeadlineExceeded(f"No time left to call {self.breaker.name}")
+            timeout = self.attempt_timeout if remaining is None else min(self.attempt_timeout, remaining)
+            try:
+                async with asyncio.timeout(timeout):
+                    result = await func(*args, **kwargs)
+            except TimeoutError as e:
+                if timeout < self.attempt_timeout:
+                    # The request ran out of time, which says nothing about the dependency.
+                    raise DeadlineExceeded(f"No time left to call {self.breaker.name}") from e
+                error = e
+            except Exception as e:
+                if not self.is_transient(e):
+                    self.breaker.record_success()
+                    raise
+                error = e
+            else:
+                self.breaker.record_success()
+                return result
+
+            self.breaker.record_failure()
+            wait = random.uniform(0, min(self.wait_max, self.wait_base * 2 ** (attempt - 1)))
+            remaining = remaining_time()
+            if attempt == self.attempts or (remaining is not None and wait >= remaining):
+                raise DependencyUnavailable(f"{self.breaker.name} is unavailable") from error
+            RETRIES.labels(func.__qualname__).inc()
+            logger.info("Retrying %s in %.2f seconds as it raised %r", func.__qualname__, wait, error)
+            await asyncio.sleep(wait)
+
+
+def resilient_public_methods(policy: ResiliencePolicy):
+    """Decorate all public coroutine methods of a class with the policy."""
+
+    def decorate(method):
+        @functools.wraps(method)
+        async def wrapper(*args, **kwargs):
+            return await policy.call(method, *args, **kwargs)
+
+        return wrapper
+
+    def decorator(cls):
+        for attr_name, attr_value in list(cls.__dict__.items()):
+            if inspect.iscoroutinefunction(attr_value) and not attr_name.startswith("_"):
+                setattr(cls, attr_name, decorate(attr_value))
+        return cls
+
+    return decorator
@@ -0,0 +1,77 @@
+import logging
+import time
+
+from core.metrics import SEARCH_FALLBACKS
+from elasticsearch import ApiError, TransportError
+
+from .search_engine_protocol import SearchEngineProtocol
+from .snapshot_search_engine import POINT_IN_TIME_PREFIX, SnapshotSearchEngine
+
+logger = logging.getLogger(__name__)
+
+
+class FallbackSearchEngine:
+    """
+    Search engine wrapper answering from the fallback engine while the primary one is unavailable.
+
+    Connection errors, timeouts and server errors of the primary engine send the request to the
+    fallback, and the primary engine is skipped for ``cooldown`` seconds, so that requests do not
+    wait for its timeouts in the meantime. Other errors, like a missing document, are raised as is.
+    The fallback is a SnapshotSearchEngine, searches in its points in time are always sent to it.
+    While it has no snapshot to answer from, errors of the primary engine are raised as is.
+    """
+
+    def __init__(self, primary: SearchEngineProtocol, fallback: SnapshotSearchEngine, cooldown: float):
+        self.primary = primary
+        self.fallback = fallback
+        self.cooldown = cooldown
+        self._primary_down_until = 0.0
+
+    async def get(self, index, id):
+        return await self._call("get", index=index, id=id)
+
+    async def mget(self, index, ids):
+        return await self._call("mget", index=index, ids=ids)
+
+    async def search(self, index, body):
+        if body.get("pit", {}).get("id", "").startswith(POINT_IN_TIME_PREFIX):
+            # Points in time opened on the snapshot are not known to the primary engine.
+            return await self._call_fallback("search", index=index, body=body)
+        return await self._call("search", index=index, body=body)
+
+    async def msearch(self, searches):
+        return await self._call("msearch", searches=searches)
+
+    async def open_point_in_time(self, index, keep_alive):
+        return await self._call("open_point_in_time", index=index, keep_alive=keep_alive)
+
+    async def close_point_in_time(self, id):
+        if id.startswith(POINT_IN_TIME_PREFIX):
+            return await self._call_fallback("close_point_in_time", id=id)
+        return await self._call("close_point_in_time", id=id)
+
+    async def close(self):
+        await self.primary.close()
+        await self.fallback.close()
+
+    async def _call(self, method: str, **kwargs):
+        if time.monotonic() >= self._primary_down_until:
+            try:
+                response = await getattr(self.primary, method)(**kwargs)
+            except (TransportError, ApiError) as e:
+                if isinstance(e, ApiError) and e.meta.status < 500:
+                    raise
+                if not await self.fallback.is_available():
+                    raise
+                logger.warning("Search engine is unavailable, answering from the fallback: %s", e)
+                self._primary_down_until = time.monotonic() + self.cooldown
+            else:
+                if self._primary_down_until:
+                    logger.info("Search engine is available again")
+                    self._primary_down_until = 0.0
+                return response
+        return await self._call_fallback(method, **kwargs)
+
+    async def _call_fallback(self, method: str, **kwargs):
+        SEARCH_FALLBACKS.labels(method).inc()
+        return await getattr(self.fallback, method)(**kwargs)
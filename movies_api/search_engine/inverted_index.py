@@ -0,0 +1,156 @@
+import bisect
+import math
+import re
+from array import array
+from typing import Iterable
+
+# Analysis approximating the ru_en analyzer of the indexes: lowercase words without English
+# stop words, possessives and plural endings. Russian words are not stemmed.
+WORD_PATTERN = re.compile(r"\w+(?:'\w+)*")
+ENGLISH_STOP_WORDS = frozenset(
+    "a an and are as at be but by for if in into is it no not of on or such "
+    "that the their then there these they this to was will with".split()
+)
+# Positions between values of an array field, so that phrases do not match across them.
+POSITION_GAP = 100
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def analyze(text: str) -> list[tuple[int, str]]:
+    """Split the text into terms with their positions, stop words keep their positions empty."""
+    terms = []
+    for position, word in enumerate(WORD_PATTERN.findall(text.lower())):
+        if word in ENGLISH_STOP_WORDS:
+            continue
+        terms.append((position, _stem(word)))
+    return terms
+
+
+def _stem(word: str) -> str:
+    if word.endswith("'s"):
+        word = word[:-2]
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith(("ss", "us")):
+        return word[:-1]
+    return word
+
+
+def edit_distance(source: str, target: str, limit: int) -> int:
+    """Damerau-Levenshtein distance with adjacent transpositions, or limit + 1 when it exceeds the limit."""
+    if abs(len(source) - len(target)) > limit:
+        return limit + 1
+    previous_row = None
+    row = list(range(len(target) + 1))
+    for i in range(1, len(source) + 1):
+        previous_row, row, current = row, [i] + [0] * len(target), previous_row
+        for j in range(1, len(target) + 1):
+            cost = source[i - 1] != target[j - 1]
+            row[j] = min(previous_row[j] + 1, row[j - 1] + 1, previous_row[j - 1] + cost)
+            if i > 1 and j > 1 and source[i - 1] == target[j - 2] and source[i - 2] == target[j - 1]:
+                row[j] = min(row[j], current[j - 2] + 1)
+        if min(row) > limit:
+            return limit + 1
+    return row[-1]
+
+
+def auto_fuzziness(term: str) -> int:
+    """Edits allowed by the AUTO fuzziness of Elasticsearch."""
+    if len(term) <= 2:
+        return 0
+    return 1 if len(term) <= 5 else 2
+
+
+class InvertedIndex:
+    """Positional postings of one text field, scored with BM25."""
+
+    def __init__(self, count: int, values: Iterable[tuple[int, str | list | None]]):
+        self.count = count
+        self.postings: dict[str, dict[int, list[int]]] = {}
+        self.lengths = array("I", bytes(4 * count))
+        for number, value in values:
+            self._add(number, value)
+        self.terms = sorted(self.postings)
+        average_length = (sum(self.lengths) / count) if count else 0
+        # Length normalization of BM25, which depends on the document alone.
+        self.norms = array(
+            "d", (BM25_K1 * (1 - BM25_B + BM25_B * length / (average_length or 1)) for length in self.lengths)
+        )
+        self._idfs: dict[str, float] = {}
+
+    def score(self, term: str, number: int) -> float:
+        documents = self.postings[term]
+        idf = self._idfs.get(term)
+        if idf is None:
+            idf = self._idfs[term] = math.log(1 + (self.count - len(documents) + 0.5) / (len(documents) + 0.5))
+        frequency = len(documents[number])
+        return idf * frequency * (BM25_K1 + 1) / (frequency + self.norms[number])
+
+    def match_terms(self, terms: list[str]) -> dict[int, float]:
+        """Documents containing any of the terms."""
+        scores: dict[int, float] = {}
+        for term in terms:
+            for number in self.postings.get(term, ()):
+                scores[number] = scores.get(number, 0.0) + self.score(term, number)
+        return scores
+
+    def match_phrase(self, terms: list[tuple[int, str]]) -> dict[int, float]:
+        """Documents containing the terms at the same relative positions."""
+        if not terms or any(term not in self.postings for _, term in terms):
+            return {}
+        rarest = min(terms, key=lambda item: len(self.postings[item[1]]))
+        scores = {}
+        for number in self.postings[rarest[1]]:
+            if self._has_phrase(number, terms):
+                scores[number] = sum(self.score(term, number) for _, term in terms)
+        return scores
+
+    def match_fuzzy(self, terms: list[str], prefix_length: int, max_expansions: int) -> dict[int, float]:
+        """Documents containing terms within the AUTO edit distance of any of the terms."""
+        scores: dict[int, float] = {}
+        for term in terms:
+            term_scores: dict[int, float] = {}
+            for expansion, distance in self.expand(term, prefix_length, max_expansions):
+                # Closer expansions weigh more, like the blended scoring of fuzzy queries.
+                weight = 1 - distance / (len(term) + 1)
+                for number in self.postings[expansion]:
+                    term_score = weight * self.score(expansion, number)
+                    term_scores[number] = max(term_scores.get(number, 0.0), term_score)
+            for number, term_score in term_scores.items():
+                scores[number] = scores.get(number, 0.0) + term_score
+        return scores
+
+    def expand(self, term: str, prefix_length: int, max_expansions: int) -> list[tuple[str, int]]:
+        limit = auto_fuzziness(term)
+        prefix = term[:prefix_length]
+        start = bisect.bisect_left(self.terms, prefix)
+        candidates = []
+        for candidate in self.terms[start:]:
+            if not candidate.startswith(prefix):
+                break
+            distance = edit_distance(term, candidate, limit)
+            if distance <= limit:
+                candidates.append((distance, -len(self.postings[candidate]), candidate))
+        return [(candidate, distance) for distance, _, candidate in sorted(candidates)[:max_expansions]]
+
+    def _add(self, number: int, value: str | list | None):
+        values = value if isinstance(value, list) else [value]
+        offset = 0
+        for text in values:
+            if not isinstance(text, str):
+                continue
+            last = -1
+            for position, term in analyze(text):
+                self.postings.setdefault(term, {}).setdefault(number, []).append(offset + position)
+                self.lengths[number] += 1
+                last = position
+            offset += last + 1 + POSITION_GAP
+
+    def _has_phrase(self, number: int, terms: list[tuple[int, str]]) -> bool:
+        positions = [(position, self.postings[term].get(number)) for position, term in terms]
+        if any(found is None for _, found in positions):
+            return False
+        (first_position, starts), rest = positions[0], positions[1:]
+        return any(all(start + position - first_position in found for position, found in rest) for start in starts)
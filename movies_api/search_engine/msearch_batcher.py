@@ -0,0 +1,116 @@
+import asyncio
+import dataclasses
+
+from core.metrics import MSEARCH_BATCH_SIZE
+from elasticsearch.exceptions import HTTP_EXCEPTIONS, ApiError
+
+from .search_engine_protocol import SearchEngineProtocol
+
+
+class MSearchBatcher:
+    """
+    Search engine wrapper sending concurrent searches as one ``_msearch`` request.
+
+    Searches arriving within ``window`` seconds of the first one are collected, up to
+    ``max_batch_size`` of them, and each caller gets back its own response or error.
+    Other requests go straight to the wrapped engine.
+    """
+
+    def __init__(self, search_engine: SearchEngineProtocol, window: float, max_batch_size: int):
+        self.search_engine = search_engine
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self._pending: list[tuple[str, dict, asyncio.Future]] = []
+        self._flush_handle: asyncio.TimerHandle | None = None
+        self._batches: set[asyncio.Task] = set()
+
+    async def get(self, index, id):
+        return await self.search_engine.get(index=index, id=id)
+
+    async def mget(self, index, ids):
+        return await self.search_engine.mget(index=index, ids=ids)
+
+    async def open_point_in_time(self, index, keep_alive):
+        return await self.search_engine.open_point_in_time(index=index, keep_alive=keep_alive)
+
+    async def close_point_in_time(self, id):
+        return await self.search_engine.close_point_in_time(id=id)
+
+    async def msearch(self, searches):
+        return await self.search_engine.msearch(searches=searches)
+
+    async def search(self, index, body):
+        if index is None:
+            # Searches pinned to a point in time name no index and are not batched.
+            return await self.search_engine.search(index=index, body=body)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((index, body, future))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.window, self._flush)
+        return await future
+
+    async def close(self):
+        self._flush()
+        await asyncio.gather(*self._batches, return_exceptions=True)
+        await self.search_engine.close()
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        task = asyncio.ensure_future(self._send(batch))
+        self._batches.add(task)
+        task.add_done_callback(self._batches.discard)
+
+    async def _send(self, batch: list[tuple[str, dict, asyncio.Future]]):
+        MSEARCH_BATCH_SIZE.observe(len(batch))
+        if len(batch) == 1:
+            index, body, future = batch[0]
+            try:
+                response = await self.search_engine.search(index=index, body=body)
+            except Exception as e:
+                self._resolve(future, exception=e)
+            else:
+                self._resolve(future, result=response)
+            return
+
+        searches = []
+        for index, body, _ in batch:
+            searches += [{"index": index}, body]
+        try:
+            response = await self.search_engine.msearch(searches=searches)
+        except Exception as e:
+            for _, _, future in batch:
+                self._resolve(future, exception=e)
+            return
+        for (_, _, future), item in zip(batch, response["responses"]):
+            if "error" in item:
+                self._resolve(future, exception=self._error(response, item))
+            else:
+                self._resolve(future, result=item)
+
+    @staticmethod
+    def _resolve(future: asyncio.Future, result=None, exception: Exception | None = None):
+        # The caller may have been cancelled while the batch was in flight.
+        if future.done():
+            return
+        if exception is not None:
+            future.set_exception(exception)
+        else:
+            future.set_result(result)
+
+    @staticmethod
+    def _error(response, item: dict) -> ApiError:
+        """Build the exception the client would raise for the search if it was sent alone."""
+        status = item.get("status", 500)
+        meta = dataclasses.replace(response.meta, status=status)
+        error = item["error"]
+        message = error.get("type", "") if isinstance(error, dict) else str(error)
+        return HTTP_EXCEPTIONS.get(status, ApiError)(message=message, meta=meta, body=item)
@@ -5,8 +5,20 @@ class SearchEngineProtocol(Protocol):
     async def get(self, index, id):
         ...
 
+    async def mget(self, index, ids):
+        ...
+
     async def search(self, index, body):
         ...
 
+    async def msearch(self, searches):
+        ...
+
+    async def open_point_in_time(self, index, keep_alive):
+        ...
+
+    async def close_point_in_time(self, id):
+        ...
+
     async def close(self):
         ...
@@ -0,0 +1,72 @@
+"""Snapshot of the search indexes, read through a memory map, see snapshot_format for its layout."""
+import asyncio
+import mmap
+from array import array
+from typing import Any, Iterable
+
+import orjson
+
+from .snapshot_format import DIRECTORY_POSITION, MAGIC
+
+
+class SnapshotIndex:
+    """Documents of one index and its rating column, backed by the memory map."""
+
+    def __init__(self, name: str, view: memoryview, entry: dict):
+        self.name = name
+        self.count = entry["count"]
+        self.rated = entry["rated"]
+        self._view = view
+        self.offsets = self._column(entry["offsets"], "Q", self.count + 1)
+        self.ratings = self._column(entry["ratings"], "d", self.rated)
+        self.rating_order = self._column(entry["rating_order"], "I", self.count)
+        ids_start, ids_end = entry["ids"]
+        self.ids: list[str] = orjson.loads(view[ids_start:ids_end])
+        self.numbers = {document_id: number for number, document_id in enumerate(self.ids)}
+        self._ratings_by_number: dict[int, float] | None = None
+        # Search structures built from the documents, like inverted indexes, and the builds in progress.
+        self.structures: dict[tuple[str, str], Any] = {}
+        self.building: dict[tuple[str, str], asyncio.Future] = {}
+
+    def raw(self, number: int) -> memoryview:
+        return self._view[self.offsets[number] : self.offsets[number + 1]]
+
+    def source(self, number: int) -> dict:
+        return orjson.loads(self.raw(number))
+
+    def rating(self, number: int) -> float | None:
+        if self._ratings_by_number is None:
+            self._ratings_by_number = dict(zip(self.rating_order[: self.rated], self.ratings))
+        return self._ratings_by_number.get(number)
+
+    def sources(self) -> Iterable[tuple[int, dict]]:
+        for number in range(self.count):
+            yield number, self.source(number)
+
+    def release(self):
+        for column in (self.offsets, self.ratings, self.rating_order, self._view):
+            column.release()
+
+    def _column(self, position: int, typecode: str, length: int) -> memoryview:
+        size = array(typecode).itemsize * length
+        return self._view[position : position + size].cast(typecode)
+
+
+class Snapshot:
+    def __init__(self, path: str):
+        with open(path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[: len(MAGIC)] != MAGIC:
+            self._mmap.close()
+            raise ValueError(f"{path} is not a search index snapshot")
+        (directory_position,) = DIRECTORY_POSITION.unpack_from(self._mmap, len(MAGIC))
+        directory = orjson.loads(self._mmap[directory_position:])
+        self.indexes = {
+            name: SnapshotIndex(name=name, view=memoryview(self._mmap), entry=entry)
+            for name, entry in directory["indexes"].items()
+        }
+
+    def close(self):
+        for index in self.indexes.values():
+            index.release()
+        self._mmap.close()
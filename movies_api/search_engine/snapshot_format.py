@@ -0,0 +1,86 @@
+"""
+Layout of the snapshot of the search indexes, shared by the ETL, which writes it, and the movies API.
+
+Numbers are in native byte order:
+
+    b"MVSNAP01"           magic
+    uint64                position of the directory
+    for every index, each section aligned to 8 bytes:
+        documents          JSON sources, back to back
+        ids                JSON array of document ids, in document order
+        uint64[count + 1]  positions of the documents, the last one is the end of the final document
+        float64[rated]     ratings of the documents having imdb_rating, ascending
+        uint32[count]      document numbers ordered by imdb_rating and then id, unrated documents last
+    directory              JSON {"indexes": {name: {section: position, "count": ..., "rated": ...}}}
+
+The module only depends on the standard library, the ETL image copies it as is.
+"""
+import json
+import os
+import struct
+from array import array
+from typing import Iterable
+
+MAGIC = b"MVSNAP01"
+DIRECTORY_POSITION = struct.Struct("=Q")
+RATING_FIELD = "imdb_rating"
+
+
+def write_snapshot(path: str, indexes: dict[str, Iterable[dict]]) -> None:
+    """
+    Write the documents of the indexes to a snapshot, replacing the previous one atomically.
+
+    Documents are written as they are iterated, so the indexes may be scrolled lazily.
+    """
+    temporary_path = f"{path}.tmp"
+    directory = {}
+    with open(temporary_path, "wb") as file:
+        file.write(MAGIC + DIRECTORY_POSITION.pack(0))
+        for name, documents in indexes.items():
+            directory[name] = _write_index(file, documents)
+        directory_position = _align(file)
+        file.write(_dumps({"indexes": directory}))
+        file.seek(len(MAGIC))
+        file.write(DIRECTORY_POSITION.pack(directory_position))
+    os.replace(temporary_path, path)
+
+
+def _write_index(file, documents: Iterable[dict]) -> dict:
+    offsets, ids, ratings = [], [], []
+    for number, source in enumerate(documents):
+        offsets.append(file.tell())
+        file.write(_dumps(source))
+        ids.append(source["id"])
+        ratings.append((source.get(RATING_FIELD), source["id"], number))
+    offsets.append(file.tell())
+    rated = sorted(item for item in ratings if item[0] is not None)
+    unrated = sorted(item[1:] for item in ratings if item[0] is None)
+    ids_start = _align(file)
+    file.write(_dumps(ids))
+    return {
+        "count": len(ids),
+        "rated": len(rated),
+        "ids": [ids_start, file.tell()],
+        "offsets": _write_column(file, "Q", offsets),
+        "ratings": _write_column(file, "d", [rating for rating, _, _ in rated]),
+        "rating_order": _write_column(
+            file, "I", [number for _, _, number in rated] + [number for _, number in unrated]
+        ),
+    }
+
+
+def _dumps(value) -> bytes:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def _align(file) -> int:
+    position = file.tell()
+    padding = -position % 8
+    file.write(bytes(padding))
+    return position + padding
+
+
+def _write_column(file, typecode: str, values: list) -> int:
+    position = _align(file)
+    file.write(array(typecode, values).tobytes())
+    return position
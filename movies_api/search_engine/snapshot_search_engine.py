@@ -0,0 +1,436 @@
+import asyncio
+import bisect
+import functools
+import heapq
+import itertools
+import logging
+import os
+import re
+import time
+
+from elastic_transport import ApiResponseMeta
+from elastic_transport import ConnectionError as TransportConnectionError
+from elastic_transport import HttpHeaders, NodeConfig
+from elasticsearch import NotFoundError
+
+from .inverted_index import InvertedIndex, analyze
+from .snapshot import Snapshot, SnapshotIndex
+from .snapshot_format import RATING_FIELD
+
+BOOSTED_FIELD = re.compile(r"^(?P<name>[^\^]+)(?:\^(?P<boost>[\d.]+))?$")
+POINT_IN_TIME_PREFIX = "snapshot:"
+# Stands for the node in errors raised like the ones of the Elasticsearch client.
+SNAPSHOT_NODE = NodeConfig(scheme="file", host="snapshot", port=0)
+
+logger = logging.getLogger(__name__)
+
+
+class SnapshotSearchEngine:
+    """
+    Search engine answering from a snapshot of the indexes, without a network round trip.
+
+    Implements the subset of the Elasticsearch query DSL the services send: match_all,
+    multi_match with phrase and fuzzy matching, bool, terms and nested terms queries,
+    sorting, from/size and search_after paging, point in time searches, source filtering
+    and completion suggestions. Responses have the shape of Elasticsearch ones.
+
+    The snapshot is loaded on first use and reloaded once the ETL replaces the file, which
+    is checked at most every ``check_interval`` seconds. Until a snapshot is written, calls
+    raise a connection error, as Elasticsearch does when it is down. Inverted indexes of
+    text fields, keyword lookups and suggestion lists are built in a thread on their first
+    use from the memory-mapped documents. Sorting by imdb_rating walks the rating column of
+    the snapshot and stops as soon as the requested page is filled. A point in time is the
+    index of the snapshot loaded when the search runs.
+    """
+
+    def __init__(self, path: str, check_interval: float = 5):
+        self.path = path
+        self.check_interval = check_interval
+        self.snapshot: Snapshot | None = None
+        self._version: tuple[int, int] | None = None
+        self._next_check = 0.0
+        self._loading: asyncio.Future | None = None
+
+    async def is_available(self) -> bool:
+        """Whether a snapshot has been written and can be searched."""
+        try:
+            await self._current()
+        except TransportConnectionError:
+            return False
+        return True
+
+    async def get(self, index, id):
+        snapshot_index = self._index(await self._current(), index)
+        number = snapshot_index.numbers.get(id)
+        if number is None:
+            raise self._not_found(f"Document {id} is not found in {index}")
+        return {"_index": index, "_id": id, "found": True, "_source": snapshot_index.source(number)}
+
+    async def mget(self, index, ids):
+        snapshot_index = self._index(await self._current(), index)
+        docs = []
+        for document_id in ids:
+            number = snapshot_index.numbers.get(document_id)
+            if number is None:
+                docs.append({"_index": index, "_id": document_id, "found": False})
+            else:
+                docs.append(
+                    {"_index": index, "_id": document_id, "found": True, "_source": snapshot_index.source(number)}
+                )
+        return {"docs": docs}
+
+    async def search(self, index, body):
+        pit_id = None
+        if "pit" in body:
+            pit_id = body["pit"]["id"]
+            if not pit_id.startswith(POINT_IN_TIME_PREFIX):
+                raise self._not_found(f"Point in time {pit_id} is not found")
+            index = pit_id[len(POINT_IN_TIME_PREFIX) :]
+        snapshot_index = self._index(await self._current(), index)
+        await self._prepare(snapshot_index, body)
+        response = self._search(snapshot_index, body)
+        if pit_id:
+            response["pit_id"] = pit_id
+        return response
+
+    async def msearch(self, searches):
+        responses = []
+        for header, body in zip(searches[::2], searches[1::2]):
+            try:
+                responses.append(await self.search(index=header.get("index"), body=body))
+            except NotFoundError as e:
+                responses.append({"error": {"type": e.message}, "status": e.meta.status})
+        return {"responses": responses}
+
+    async def open_point_in_time(self, index, keep_alive):
+        self._index(await self._current(), index)
+        return {"id": f"{POINT_IN_TIME_PREFIX}{index}"}
+
+    async def close_point_in_time(self, id):
+        return {"succeeded": True, "num_freed": 0}
+
+    async def close(self):
+        if self._loading is not None:
+            await asyncio.gather(self._loading, return_exceptions=True)
+        if self.snapshot is not None:
+            self.snapshot.close()
+
+    async def _current(self) -> Snapshot:
+        """The latest snapshot, loaded in a thread when the file has been replaced since the last check."""
+        now = time.monotonic()
+        if self._loading is None and (self.snapshot is None or now >= self._next_check):
+            self._next_check = now + self.check_interval
+            try:
+                stat = os.stat(self.path)
+            except OSError:
+                stat = None
+            if stat is not None and (stat.st_ino, stat.st_mtime_ns) != self._version:
+                self._loading = asyncio.ensure_future(self._load((stat.st_ino, stat.st_mtime_ns)))
+        if self.snapshot is None and self._loading is not None:
+            # Searches keep using the previous snapshot while the next one loads, only the first one is awaited.
+            await asyncio.shield(self._loading)
+        if self.snapshot is None:
+            raise TransportConnectionError(f"Search snapshot {self.path} is not written yet")
+        return self.snapshot
+
+    async def _load(self, version: tuple[int, int]):
+        try:
+            snapshot = await asyncio.get_running_loop().run_in_executor(None, Snapshot, self.path)
+        except (OSError, ValueError) as e:
+            logger.warning("Unable to load search snapshot %s: %s", self.path, e)
+        else:
+            # The previous snapshot is unmapped once the searches still reading it let it go.
+            self.snapshot, self._version = snapshot, version
+            logger.info("Loaded search snapshot %s", self.path)
+        finally:
+            self._loading = None
+
+    async def _prepare(self, index: SnapshotIndex, body: dict):
+        """Build the structures the search needs in a thread, so that the event loop is not blocked by it."""
+        loop = asyncio.get_running_loop()
+        for key, build in self._requirements(index, body):
+            if key in index.structures:
+                continue
+            if key not in index.building:
+                index.building[key] = loop.run_in_executor(None, build)
+            try:
+                index.structures[key] = await asyncio.shield(index.building[key])
+            finally:
+                index.building.pop(key, None)
+
+    def _requirements(self, index: SnapshotIndex, body: dict):
+        for suggestion in body.get("suggest", {}).values():
+            field = suggestion["completion"]["field"]
+            yield ("suggestions", field), functools.partial(self._build_suggestion_entries, index, field)
+        yield from self._query_requirements(index, body.get("query", {"match_all": {}}))
+
+    def _query_requirements(self, index: SnapshotIndex, query: dict):
+        ((kind, params),) = query.items()
+        if kind == "multi_match":
+            for field in params["fields"]:
+                name = BOOSTED_FIELD.match(field)["name"]
+                yield ("text", name), functools.partial(self._build_text_index, index, name)
+        elif kind in ("term", "terms"):
+            ((path, _),) = params.items()
+            yield ("keyword", path), functools.partial(self._build_keyword_index, index, path)
+        elif kind == "nested":
+            yield from self._query_requirements(index, params["query"])
+        elif kind == "bool":
+            for clause in ("must", "filter", "should"):
+                for subquery in params.get(clause, []):
+                    yield from self._query_requirements(index, subquery)
+
+    def _index(self, snapshot: Snapshot, name: str) -> SnapshotIndex:
+        if name not in snapshot.indexes:
+            raise self._not_found(f"Index {name} is not found")
+        return snapshot.indexes[name]
+
+    def _search(self, index: SnapshotIndex, body: dict) -> dict:
+        response = {"took": 0, "timed_out": False}
+        if "suggest" in body:
+            response["suggest"] = {
+                name: [self._suggest(index, suggestion, body.get("_source"))]
+                for name, suggestion in body["suggest"].items()
+            }
+
+        scores = self._evaluate(index, body.get("query", {"match_all": {}}))
+        size = body.get("size", 10)
+        start = body.get("from", 0)
+        sort = [self._sort_clause(clause) for clause in body.get("sort", [])]
+        hits = []
+        if size:
+            numbers = self._ordered(index, scores, sort or [("_score", True)], body.get("search_after"), start + size)
+            hits = numbers[start:]
+
+        response["hits"] = {
+            "total": {"value": len(scores), "relation": "eq"},
+            "max_score": max(scores.values(), default=None) if not sort else None,
+            "hits": [self._hit(index, number, scores[number], sort, body.get("_source")) for number in hits],
+        }
+        return response
+
+    def _hit(self, index: SnapshotIndex, number: int, score: float, sort: list, includes: list | None) -> dict:
+        source = self._filter_source(index.source(number), includes)
+        hit = {"_index": index.name, "_id": index.ids[number], "_score": None if sort else score, "_source": source}
+        if sort:
+            hit["sort"] = self._sort_values(index, number, score, sort)
+        return hit
+
+    def _ordered(self, index: SnapshotIndex, scores: dict, sort: list, search_after: list | None, limit: int):
+        """First matching document numbers in the sort order, following the search_after values if they are given."""
+        if sort[0][0] == RATING_FIELD and sort[1:] in ([], [("id", False)]):
+            numbers = (number for number in self._rating_order(index, descending=sort[0][1]) if number in scores)
+            if search_after is not None:
+                numbers = itertools.dropwhile(
+                    lambda number: self._compare(self._sort_values(index, number, None, sort), search_after, sort) <= 0,
+                    numbers,
+                )
+            return list(itertools.islice(numbers, limit))
+
+        values = {number: self._sort_values(index, number, score, sort) for number, score in scores.items()}
+        numbers = sorted(scores)
+        if search_after is not None:
+            numbers = [number for number in numbers if self._compare(values[number], search_after, sort) > 0]
+        return heapq.nsmallest(
+            limit, numbers, key=functools.cmp_to_key(lambda a, b: self._compare(values[a], values[b], sort))
+        )
+
+    @staticmethod
+    def _rating_order(index: SnapshotIndex, descending: bool):
+        """Document numbers by rating, ties by id ascending in both directions, unrated documents last."""
+        order = index.rating_order
+        if not descending:
+            yield from order
+            return
+        ratings = index.ratings
+        end = index.rated
+        while end > 0:
+            start = end - 1
+            while start > 0 and ratings[start - 1] == ratings[end - 1]:
+                start -= 1
+            yield from order[start:end]
+            end = start
+        yield from order[index.rated :]
+
+    @staticmethod
+    def _compare(values: list, other: list, sort: list) -> int:
+        for value, other_value, (_, descending) in zip(values, other, sort):
+            if value == other_value:
+                continue
+            # Missing values sort last in both directions, as in Elasticsearch.
+            if value is None:
+                return 1
+            if other_value is None:
+                return -1
+            result = -1 if value < other_value else 1
+            return -result if descending else result
+        return 0
+
+    @staticmethod
+    def _sort_clause(clause: str | dict) -> tuple[str, bool]:
+        if isinstance(clause, str):
+            return clause, clause == "_score"
+        ((name, order),) = clause.items()
+        if isinstance(order, dict):
+            order = order.get("order", "desc" if name == "_score" else "asc")
+        return name, order == "desc"
+
+    @staticmethod
+    def _sort_values(index: SnapshotIndex, number: int, score: float, sort: list) -> list:
+        values = []
+        source = None
+        for name, _ in sort:
+            if name == "_score":
+                values.append(score)
+            elif name == "id":
+                values.append(index.ids[number])
+            elif name == RATING_FIELD:
+                values.append(index.rating(number))
+            else:
+                source = source or index.source(number)
+                values.append(source.get(name))
+        return values
+
+    def _evaluate(self, index: SnapshotIndex, query: dict) -> dict[int, float]:
+        """Scores of the documents matching the query."""
+        ((kind, params),) = query.items()
+        if kind == "match_all":
+            return dict.fromkeys(range(index.count), 1.0)
+        if kind == "multi_match":
+            return self._multi_match(index, params)
+        if kind == "bool":
+            return self._bool(index, params)
+        if kind in ("term", "terms"):
+            ((path, values),) = params.items()
+            values = values if isinstance(values, list) else [values]
+            keyword_index = self._keyword_index(index, path)
+            return dict.fromkeys(set().union(*(keyword_index.get(str(value), ()) for value in values)), 1.0)
+        if kind == "nested":
+            # Nested objects are indexed under their full paths, e.g. actors.id.
+            return self._evaluate(index, params["query"])
+        raise NotImplementedError(f"{kind} queries are not supported by the snapshot search engine")
+
+    def _multi_match(self, index: SnapshotIndex, params: dict) -> dict[int, float]:
+        terms = analyze(params["query"])
+        scores: dict[int, float] = {}
+        for field in params["fields"]:
+            match = BOOSTED_FIELD.match(field)
+            boost = float(match["boost"] or 1)
+            text_index = self._text_index(index, match["name"])
+            if params.get("type") == "phrase":
+                field_scores = text_index.match_phrase(terms)
+            elif "fuzziness" in params:
+                field_scores = text_index.match_fuzzy(
+                    [term for _, term in terms],
+                    prefix_length=params.get("prefix_length", 0),
+                    max_expansions=params.get("max_expansions", 50),
+                )
+            else:
+                field_scores = text_index.match_terms([term for _, term in terms])
+            # The best field gives the score, as in best_fields and phrase multi_match queries.
+            for number, score in field_scores.items():
+                scores[number] = max(scores.get(number, 0.0), boost * score)
+        return scores
+
+    def _bool(self, index: SnapshotIndex, params: dict) -> dict[int, float]:
+        must = [self._evaluate(index, query) for query in params.get("must", [])]
+        filters = [self._evaluate(index, query) for query in params.get("filter", [])]
+        should = [self._evaluate(index, query) for query in params.get("should", [])]
+        minimum_should_match = int(params.get("minimum_should_match", 0 if must or filters else 1))
+        required = must + filters
+        if required:
+            candidates = min(required, key=len)
+        else:
+            candidates = set().union(*should)
+
+        scores = {}
+        for number in candidates:
+            if any(number not in clause for clause in required):
+                continue
+            matched = [clause[number] for clause in should if number in clause]
+            if len(matched) < minimum_should_match:
+                continue
+            scores[number] = sum(clause[number] for clause in must) + sum(matched)
+        return scores
+
+    def _suggest(self, index: SnapshotIndex, suggestion: dict, includes: list | None) -> dict:
+        prefix = suggestion["prefix"]
+        completion = suggestion["completion"]
+        entries = self._suggestion_entries(index, completion["field"])
+        key = prefix.lower()
+        start = bisect.bisect_left(entries, key, key=lambda entry: entry[0])
+        options, seen = [], set()
+        for text_key, text, number in entries[start:]:
+            if not text_key.startswith(key) or len(options) == completion.get("size", 5):
+                break
+            if completion.get("skip_duplicates") and text_key in seen:
+                continue
+            seen.add(text_key)
+            options.append(
+                {
+                    "text": text,
+                    "_index": index.name,
+                    "_id": index.ids[number],
+                    "_score": 1.0,
+                    "_source": self._filter_source(index.source(number), includes),
+                }
+            )
+        return {"text": prefix, "offset": 0, "length": len(prefix), "options": options}
+
+    def _text_index(self, index: SnapshotIndex, field: str) -> InvertedIndex:
+        return self._structure(index, ("text", field), self._build_text_index, field)
+
+    def _keyword_index(self, index: SnapshotIndex, path: str) -> dict[str, set[int]]:
+        return self._structure(index, ("keyword", path), self._build_keyword_index, path)
+
+    def _suggestion_entries(self, index: SnapshotIndex, field: str) -> list[tuple[str, str, int]]:
+        return self._structure(index, ("suggestions", field), self._build_suggestion_entries, field)
+
+    @staticmethod
+    def _structure(index: SnapshotIndex, key: tuple[str, str], build, field: str):
+        # Prepared before the search, built here only for queries _prepare does not know about.
+        if key not in index.structures:
+            index.structures[key] = build(index, field)
+        return index.structures[key]
+
+    @staticmethod
+    def _build_text_index(index: SnapshotIndex, field: str) -> InvertedIndex:
+        return InvertedIndex(
+            count=index.count, values=((number, source.get(field)) for number, source in index.sources())
+        )
+
+    @classmethod
+    def _build_keyword_index(cls, index: SnapshotIndex, path: str) -> dict[str, set[int]]:
+        keyword_index: dict[str, set[int]] = {}
+        for number, source in index.sources():
+            for value in cls._values(source, path.split(".")):
+                keyword_index.setdefault(str(value), set()).add(number)
+        return keyword_index
+
+    @classmethod
+    def _build_suggestion_entries(cls, index: SnapshotIndex, field: str) -> list[tuple[str, str, int]]:
+        return sorted(
+            (text.lower(), text, number) for number, source in index.sources() for text in cls._values(source, [field])
+        )
+
+    @classmethod
+    def _values(cls, value, path: list[str]) -> list:
+        """Values at the dotted path, flattening arrays on the way."""
+        if isinstance(value, list):
+            return [item for element in value for item in cls._values(element, path)]
+        if not path:
+            return [] if value is None else [value]
+        if not isinstance(value, dict):
+            return []
+        return cls._values(value.get(path[0]), path[1:])
+
+    @staticmethod
+    def _filter_source(source: dict, includes: list | None) -> dict:
+        if includes is None:
+            return source
+        return {name: source[name] for name in includes if name in source}
+
+    @staticmethod
+    def _not_found(message: str) -> NotFoundError:
+        meta = ApiResponseMeta(status=404, http_version="1.1", headers=HttpHeaders(), duration=0.0, node=SNAPSHOT_NODE)
+        return NotFoundError(message=message, meta=meta, body={"error": {"type": "not_found", "reason": message}})
@@ -0,0 +1,88 @@
+import asyncio
+import logging
+
+import orjson
+from cache_storage.cache_storage_protocol import CacheStorageProtocol
+from redis.exceptions import RedisError
+from resilience.errors import DependencyUnavailable
+
+from .searchable_model_service import SearchableModelService
+
+logger = logging.getLogger(__name__)
+
+
+class CacheInvalidator:
+    """
+    Follows the stream of documents re-indexed by the ETL and evicts them from the cache.
+
+    Every worker runs its own invalidator, since each of them holds an in-process cache tier.
+    Cached documents are deleted by id, cached pages are dropped by moving the service to the
+    list generation published together with the ids. Redis failures, including at startup, are
+    retried with growing waits, and a malformed message is logged and skipped.
+    """
+
+    def __init__(
+        self,
+        cache_storage: CacheStorageProtocol,
+        services: list[SearchableModelService],
+        stream: str,
+        block_ms: int = 5000,
+        retry_wait_min: float = 1,
+        retry_wait_max: float = 30,
+    ):
+        self.cache_storage = cache_storage
+        self.services = {service.search.index: service for service in services}
+        self.stream = stream
+        self.block_ms = block_ms
+        self.retry_wait_min = retry_wait_min
+        self.retry_wait_max = retry_wait_max
+
+    async def run(self):
+        last_id = None
+        retry_wait = self.retry_wait_min
+        while True:
+            try:
+                if last_id is None:
+                    # Messages published while the generations load are read afterwards, none are skipped.
+                    last_id = await self._last_message_id()
+                    await self._load_generations()
+                response = await self.cache_storage.xread({self.stream: last_id}, count=100, block=self.block_ms)
+            except RedisError as e:
+                logger.warning("Unable to read cache invalidation stream, retrying in %s seconds: %s", retry_wait, e)
+                await asyncio.sleep(retry_wait)
+                retry_wait = min(retry_wait * 2, self.retry_wait_max)
+                continue
+            retry_wait = self.retry_wait_min
+            for _, messages in response or []:
+                for message_id, fields in messages:
+                    last_id = message_id
+                    try:
+                        await self._invalidate(fields)
+                    except Exception:
+                        logger.exception("Skipping cache invalidation message %s", message_id)
+
+    async def _last_message_id(self) -> bytes | str:
+        messages = await self.cache_storage.xrevrange(self.stream, count=1)
+        return messages[0][0] if messages else "0-0"
+
+    async def _load_generations(self):
+        for index, service in self.services.items():
+            generation = await self.cache_storage.get(self._generation_key(index))
+            if generation is not None:
+                service.cache.list_generation = int(generation)
+
+    async def _invalidate(self, fields: dict):
+        index = fields[b"index"].decode()
+        service = self.services.get(index)
+        if service is None:
+            return
+        ids = orjson.loads(fields[b"ids"])
+        try:
+            await service.cache.invalidate_instances(ids)
+        except (RedisError, DependencyUnavailable) as e:
+            logger.warning("Unable to invalidate %s documents of %s: %s", len(ids), index, e)
+        service.cache.list_generation = max(service.cache.list_generation, int(fields[b"generation"]))
+        logger.info("Invalidated %s cached documents of %s", len(ids), index)
+
+    def _generation_key(self, index: str) -> str:
+        return f"{self.stream}_generation_{index}"
@@ -0,0 +1,99 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Optional
+
+from models.sort import MoviesSortOptions
+
+from .searchable_model_service import SearchableModelService
+
+logger = logging.getLogger(__name__)
+
+
+class CacheWarmer:
+    """
+    Pre-populates the cache after a rollout or a cache flush.
+
+    Warms the first pages of the film search in both rating orders, which also caches the
+    documents of the top-rated films, and every page of genres. Pages are requested through
+    the regular service, so each of them is one search request stored with one cache pipeline.
+
+    The service is ready once enough of the cache is warm. Failed steps are retried with a doubling
+    wait until that share is reached, so an outage of the search engine during the startup keeps
+    the instance unready only until the engine recovers. ``max_attempts`` bounds the passes over
+    failed steps, e.g. for a one-off run; by default they are retried for as long as it takes.
+    """
+
+    def __init__(
+        self,
+        film_service: SearchableModelService,
+        genre_service: SearchableModelService,
+        film_pages: int = 5,
+        page_size: int = 50,
+        concurrency: int = 4,
+        max_genre_pages: int = 20,
+        retry_wait_min: float = 1,
+        retry_wait_max: float = 30,
+        max_attempts: Optional[int] = None,
+    ):
+        self.film_service = film_service
+        self.genre_service = genre_service
+        self.film_pages = film_pages
+        self.page_size = page_size
+        self.max_genre_pages = max_genre_pages
+        self.retry_wait_min = retry_wait_min
+        self.retry_wait_max = retry_wait_max
+        self.max_attempts = max_attempts
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self.total = film_pages * len(MoviesSortOptions) + 1
+        self.completed = 0
+        self.failed = 0
+        self.attempt = 0
+        self.finished = False
+
+    @property
+    def progress(self) -> float:
+        return self.completed / self.total if self.total else 1.0
+
+    def is_ready(self, threshold: float) -> bool:
+        return self.progress >= threshold
+
+    async def run(self, threshold: float = 1.0):
+        steps = [
+            lambda sort=sort, page_number=page_number: self._warm_film_page(sort=sort, page_number=page_number)
+            for sort in MoviesSortOptions
+            for page_number in range(1, self.film_pages + 1)
+        ]
+        steps.append(self._warm_genres)
+        retry_wait = self.retry_wait_min
+        while True:
+            self.attempt += 1
+            results = await asyncio.gather(*(self._run_step(step) for step in steps))
+            steps = [step for step, done in zip(steps, results) if not done]
+            self.failed = len(steps)
+            if not steps or self.is_ready(threshold) or self.attempt == self.max_attempts:
+                break
+            logger.warning("Cache warm-up: %s steps failed, retrying in %s seconds", len(steps), retry_wait)
+            await asyncio.sleep(retry_wait)
+            retry_wait = min(retry_wait * 2, self.retry_wait_max)
+        self.finished = True
+        logger.info("Cache warm-up finished: %s of %s steps done, %s failed", self.completed, self.total, self.failed)
+
+    async def _run_step(self, step: Callable[[], Awaitable[None]]) -> bool:
+        async with self._semaphore:
+            try:
+                await step()
+            except Exception as e:
+                logger.warning("Cache warm-up step failed: %s", e)
+                return False
+            self.completed += 1
+            return True
+
+    async def _warm_film_page(self, sort: MoviesSortOptions, page_number: int):
+        await self.film_service.get_raw_many_by_parameters(page_number=page_number, page_size=self.page_size, sort=sort)
+
+    async def _warm_genres(self):
+        # Genres are few, pages are walked until the last, incomplete one.
+        for page_number in range(1, self.max_genre_pages + 1):
+            genres = await self.genre_service.get_many_by_parameters(page_number=page_number, page_size=self.page_size)
+            if len(genres) < self.page_size:
+                return
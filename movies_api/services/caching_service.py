@@ -1,37 +1,163 @@
-import json
-from abc import abstractmethod
-from typing import Generic, List, Optional, TypeVar
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Generic, List, Optional, TypeVar
 
 import orjson
-from backoff.backoff import backoff_public_methods
+from cache_storage.cache_entry import ENTRY_HEADER, CacheEntry
 from cache_storage.cache_storage_protocol import CacheStorageProtocol
+from cache_storage.compression import Codec, get_codec
+from cache_storage.local_cache import LocalCache
 from core.config import settings
-from models.film import Film
-from models.genre import Genre
-from models.person import Person
+from core.metrics import CACHE_BYPASSES, CACHE_HITS, CACHE_LATENCY, CACHE_MISSES
+from models.film import FILM_LIST_ADAPTER, Film
+from models.genre import GENRE_LIST_ADAPTER, Genre
+from models.person import PERSON_LIST_ADAPTER, Person
 from opentelemetry import trace
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter
+from redis.exceptions import ConnectionError as RedisConnectionError
+from redis.exceptions import RedisError
+from redis.exceptions import TimeoutError as RedisTimeoutError
+from resilience.circuit_breaker import CircuitBreaker
+from resilience.errors import DependencyUnavailable
+from resilience.policy import ResiliencePolicy
+from utils.search_query import search_digest
 
 T = TypeVar("T", bound=BaseModel)
+V = TypeVar("V")
+
+logger = logging.getLogger(__name__)
+
+# Payload cached for ids unknown to the search engine, so repeated misses do not reach it.
+TOMBSTONE = b""
+
+CACHE_POLICY = ResiliencePolicy(
+    breaker=CircuitBreaker(
+        "redis",
+        failure_threshold=settings.cache_breaker_failure_threshold,
+        reset_timeout=settings.cache_breaker_reset_timeout,
+    ),
+    is_transient=lambda error: isinstance(error, (RedisConnectionError, RedisTimeoutError)),
+    attempts=settings.cache_retry_attempts,
+    wait_base=settings.cache_retry_wait_base,
+    wait_max=settings.cache_retry_wait_max,
+    attempt_timeout=settings.cache_attempt_timeout,
+)
+
+
+@dataclass
+class CacheTierStats:
+    hits: int = 0
+    misses: int = 0
+
+
+@dataclass
+class CompressionStats:
+    encoded_entries: int = 0
+    compressed_entries: int = 0
+    raw_bytes: int = 0
+    stored_bytes: int = 0
+    encode_seconds: float = 0
+    decoded_entries: int = 0
+    decode_seconds: float = 0
+
+    @property
+    def ratio(self) -> float:
+        return self.raw_bytes / self.stored_bytes if self.stored_bytes else 1.0
+
+
+@dataclass
+class CacheStats:
+    local: CacheTierStats = field(default_factory=CacheTierStats)
+    redis: CacheTierStats = field(default_factory=CacheTierStats)
+    compression: CompressionStats = field(default_factory=CompressionStats)
+
+
+@dataclass
+class CacheResult(Generic[V]):
+    value: V
+    is_stale: bool = False
 
 
-@backoff_public_methods()
 class CachingService(Generic[T]):
+    # Label of the cached model in metrics.
+    entity: str
+
     def __init__(
-        self, cache_storage: CacheStorageProtocol, prefix_plural: str, prefix_single: str, tracer: trace.Tracer
+        self,
+        cache_storage: CacheStorageProtocol,
+        prefix_plural: str,
+        prefix_single: str,
+        tracer: trace.Tracer,
+        local_cache: LocalCache | None = None,
     ):
         self.cache_storage = cache_storage
         self.key_prefix_plural = prefix_plural
         self.key_prefix_single = prefix_single
         self.tracer = tracer
+        self.local_cache = local_cache
+        self.codec = get_codec(settings.cache_compression_codec)
+        self.stats = CacheStats()
+        # Bumped whenever the ETL re-indexes documents, so that every cached page is dropped at once.
+        self.list_generation = 0
+
+    def instance_key(self, instance_id: str) -> str:
+        return f"{self.key_prefix_single}_{instance_id}"
+
+    def list_key(
+        self,
+        page_size: int,
+        page_number: int,
+        search: str | None = None,
+        sort: str | None = None,
+        fields: set[str] | None = None,
+        related_to: tuple[str, str] | None = None,
+    ) -> str:
+        digest = search_digest(search=search, sort=sort, related_to=related_to)
+        if fields:
+            # Sparse pages hold rendered documents instead of ids, so they are kept apart from full pages.
+            field_set = ".".join(sorted(fields))
+            return (
+                f"{self.key_prefix_plural}_fields_{self.list_generation}_{digest}_{field_set}_{page_size}_{page_number}"
+            )
+        return f"{self.key_prefix_plural}_ids_{self.list_generation}_{digest}_{page_size}_{page_number}"
+
+    def suggest_key(self, prefix: str, size: int) -> str:
+        return f"{self.key_prefix_plural}_suggest_{self.list_generation}_{search_digest(search=prefix)}_{size}"
+
+    def parse_instance(self, data: bytes) -> T:
+        return self.model.model_validate_json(data)
 
-    async def get_instance_from_cache(self, instance_id: str) -> Optional[T]:
-        with self.tracer.start_as_current_span("get-cache"):
-            cache_key = f"{self.key_prefix_single}_{instance_id}"
-            data = await self.cache_storage.get(cache_key)
-            if not data:
+    def parse_instances(self, payloads: List[bytes]) -> List[T]:
+        """Build the instances of cached documents, validating them as one JSON array."""
+        return self.list_adapter.validate_json(b"[" + b",".join(payloads) + b"]")
+
+    async def get_instance_from_cache(self, instance_id: str) -> Optional[CacheResult[Optional[bytes]]]:
+        """
+        Return the cached JSON document of the instance, ready to be sent as a response body.
+
+        An instance known to be missing from the search engine is returned with the value None.
+        """
+        with self.tracer.start_as_current_span("get-cache"), CACHE_LATENCY.labels(self.entity, "by-id").time():
+            cache_key = self.instance_key(instance_id)
+            entry = await self._get(cache_key, "by-id")
+            if entry is None:
                 return None
-            return self._parse_instance_from_data(data)
+            return CacheResult(entry.payload or None, entry.is_stale)
+
+    async def get_instances_from_cache(self, instance_ids: List[str]) -> Dict[str, CacheResult[Optional[bytes]]]:
+        """
+        Look up several instances at once. Instances missing from the cache are left out of the result,
+        instances known to be missing from the search engine are returned with the value None.
+        """
+        with self.tracer.start_as_current_span("get-cache"), CACHE_LATENCY.labels(self.entity, "by-ids").time():
+            cache_keys = [self.instance_key(instance_id) for instance_id in instance_ids]
+            entries = await self._get_many(cache_keys, "by-ids")
+            return {
+                instance_id: CacheResult(entry.payload or None, entry.is_stale)
+                for instance_id, entry in zip(instance_ids, entries)
+                if entry is not None
+            }
 
     async def get_list_from_cache(
         self,
@@ -39,23 +165,64 @@ class CachingService(Generic[T]):
         page_number: int,
         search: str | None = None,
         sort: str | None = None,
-    ) -> List[T]:
-        with self.tracer.start_as_current_span("get-cache"):
-            cache_key = f"{self.key_prefix_plural}_{search or ''}_{sort or ''}_{page_size}_{page_number}"
-            data = await self.cache_storage.get(cache_key)
-            if not data:
+        related_to: tuple[str, str] | None = None,
+    ) -> Optional[CacheResult[List[str]]]:
+        """Return the ordered ids of the cached page."""
+        with self.tracer.start_as_current_span("get-cache"), CACHE_LATENCY.labels(self.entity, "list").time():
+            cache_key = self.list_key(
+                page_size=page_size, page_number=page_number, search=search, sort=sort, related_to=related_to
+            )
+            entry = await self._get(cache_key, "list")
+            if entry is None:
+                return None
+            return CacheResult(orjson.loads(entry.payload), entry.is_stale)
+
+    async def get_sparse_page_from_cache(
+        self,
+        page_size: int,
+        page_number: int,
+        fields: set[str],
+        search: str | None = None,
+        sort: str | None = None,
+    ) -> Optional[CacheResult[bytes]]:
+        """Return the cached JSON array of the page holding only the given fields."""
+        with self.tracer.start_as_current_span("get-cache"), CACHE_LATENCY.labels(self.entity, "list").time():
+            cache_key = self.list_key(
+                page_size=page_size, page_number=page_number, search=search, sort=sort, fields=fields
+            )
+            entry = await self._get(cache_key, "list")
+            if entry is None:
+                return None
+            return CacheResult(entry.payload, entry.is_stale)
+
+    async def get_suggestions_from_cache(self, prefix: str, size: int) -> Optional[CacheResult[bytes]]:
+        """Return the cached JSON array of suggestions for the prefix."""
+        with self.tracer.start_as_current_span("get-cache"), CACHE_LATENCY.labels(self.entity, "suggest").time():
+            entry = await self._get(self.suggest_key(prefix, size), "suggest")
+            if entry is None:
                 return None
-            items = orjson.loads(data)
-            return [self._parse_instance_from_data(item) for item in items]
+            return CacheResult(entry.payload, entry.is_stale)
 
-    async def put_instance_to_cache(self, instance: T):
+    async def put_instance_to_cache(self, instance: T) -> bytes:
         with self.tracer.start_as_current_span("put-cache"):
-            cache_key = f"{self.key_prefix_single}_{instance.id}"
-            await self.cache_storage.set(
-                cache_key,
-                instance.model_dump_json(),
-                settings.cache_expire_time,
+            cache_key = self.instance_key(instance.id)
+            payload = self._serialize_instance(instance)
+            await self._set(cache_key, payload)
+            return payload
+
+    async def put_instances_to_cache(self, instances: List[T], missing_ids: List[str] = ()) -> Dict[str, bytes]:
+        """Cache the instances together with tombstones for the ids the search engine does not know."""
+        with self.tracer.start_as_current_span("put-cache"):
+            payloads = {instance.id: self._serialize_instance(instance) for instance in instances}
+            await self._set_many(
+                {self.instance_key(instance_id): payload for instance_id, payload in payloads.items()},
+                tombstones=[self.instance_key(instance_id) for instance_id in missing_ids],
             )
+            return payloads
+
+    async def put_missing_instance_to_cache(self, instance_id: str):
+        with self.tracer.start_as_current_span("put-cache"):
+            await self._set(self.instance_key(instance_id), TOMBSTONE, settings.cache_negative_expire_time)
 
     async def put_list_to_cache(
         self,
@@ -64,34 +231,229 @@ class CachingService(Generic[T]):
         page_number: int,
         instances: List[T],
         search: str | None = None,
-    ):
+        related_to: tuple[str, str] | None = None,
+    ) -> List[bytes]:
+        """
+        Cache the page as an ordered list of ids together with the instances themselves.
+
+        Instances are stored under their own keys, so a film shared by many pages is kept
+        in Redis once and can be invalidated in one place. Empty pages are cached for the
+        negative caching time only.
+        """
         with self.tracer.start_as_current_span("put-cache"):
-            cache_key = f"{self.key_prefix_plural}_{search or ''}_{sort or ''}_{page_size}_{page_number}"
-            instances_json_list = [instance.model_dump_json() for instance in instances]
-            instances_json_str = orjson.dumps(instances_json_list)
-            await self.cache_storage.set(
-                cache_key,
-                instances_json_str,
-                settings.cache_expire_time,
+            cache_key = self.list_key(
+                page_size=page_size, page_number=page_number, search=search, sort=sort, related_to=related_to
             )
+            if not instances:
+                await self._set(cache_key, orjson.dumps([]), settings.cache_negative_expire_time)
+                return []
+            payloads = [self._serialize_instance(instance) for instance in instances]
+            values = {self.instance_key(instance.id): payload for instance, payload in zip(instances, payloads)}
+            values[cache_key] = orjson.dumps([instance.id for instance in instances])
+            await self._set_many(values)
+            return payloads
+
+    async def put_sparse_page_to_cache(
+        self,
+        page_size: int,
+        page_number: int,
+        fields: set[str],
+        instances: List[T],
+        search: str | None = None,
+        sort: str | None = None,
+    ) -> bytes:
+        """
+        Cache the page rendered as a JSON array of the given fields.
+
+        Sparse instances are incomplete, so they are never stored under the instance keys.
+        """
+        with self.tracer.start_as_current_span("put-cache"):
+            cache_key = self.list_key(
+                page_size=page_size, page_number=page_number, search=search, sort=sort, fields=fields
+            )
+            page = self.render_sparse_page(instances, fields)
+            await self._set(cache_key, page, None if instances else settings.cache_negative_expire_time)
+            return page
+
+    async def put_suggestions_to_cache(self, prefix: str, size: int, suggestions: List[dict]) -> bytes:
+        with self.tracer.start_as_current_span("put-cache"):
+            payload = orjson.dumps(suggestions)
+            expire_time = None if suggestions else settings.cache_negative_expire_time
+            await self._set(self.suggest_key(prefix, size), payload, expire_time)
+            return payload
+
+    def render_sparse_page(self, instances: List[T], fields: set[str]) -> bytes:
+        return b"[" + b",".join(self._serialize_instance(instance, include=fields) for instance in instances) + b"]"
+
+    def render_lines(self, instances: List[T], fields: set[str] | None = None) -> bytes:
+        """Render the instances as newline-delimited JSON."""
+        return b"".join(self._serialize_instance(instance, include=fields) + b"\n" for instance in instances)
+
+    async def invalidate_instances(self, instance_ids: List[str]):
+        with self.tracer.start_as_current_span("invalidate-cache"):
+            cache_keys = [self.instance_key(instance_id) for instance_id in instance_ids]
+            if self.local_cache is not None:
+                self.local_cache.delete(*cache_keys)
+            await CACHE_POLICY.call(self.cache_storage.delete, *cache_keys)
+
+    async def _get(self, cache_key: str, operation: str) -> Optional[CacheEntry]:
+        if self.local_cache is not None:
+            entry = self.local_cache.get(cache_key)
+            if entry is not None:
+                self._count_hit("local", operation)
+                self._trace_lookup(hits=1, keys=1, tier="local")
+                return entry
+            self._count_miss("local", operation)
+
+        data = await self._bypass_on_failure(self.cache_storage.get, cache_key)
+        entry = self._decode(cache_key, data) if data else None
+        if entry is None:
+            self._count_miss("redis", operation)
+            self._trace_lookup(hits=0, keys=1)
+            return None
+        self._count_hit("redis", operation)
+        self._trace_lookup(hits=1, keys=1, tier="redis")
+
+        if self.local_cache is not None:
+            self.local_cache.set(cache_key, entry, self._hard_expire_time)
+        return entry
+
+    async def _get_many(self, cache_keys: List[str], operation: str) -> List[Optional[CacheEntry]]:
+        entries: List[Optional[CacheEntry]] = [None] * len(cache_keys)
+        remote_positions = []
+        for position, cache_key in enumerate(cache_keys):
+            if self.local_cache is not None:
+                entries[position] = self.local_cache.get(cache_key)
+                if entries[position] is not None:
+                    self._count_hit("local", operation)
+                    continue
+                self._count_miss("local", operation)
+            remote_positions.append(position)
+
+        if not remote_positions:
+            self._trace_lookup(hits=len(cache_keys), keys=len(cache_keys), tier="local")
+            return entries
+
+        remote_keys = [cache_keys[position] for position in remote_positions]
+        values = await self._bypass_on_failure(self.cache_storage.mget, remote_keys) or [None] * len(remote_keys)
+        for position, data in zip(remote_positions, values):
+            entry = self._decode(cache_keys[position], data) if data else None
+            if entry is None:
+                self._count_miss("redis", operation)
+                continue
+            self._count_hit("redis", operation)
+            entries[position] = entry
+            if self.local_cache is not None:
+                self.local_cache.set(cache_keys[position], entries[position], self._hard_expire_time)
+        self._trace_lookup(hits=sum(entry is not None for entry in entries), keys=len(cache_keys))
+        return entries
+
+    async def _set(self, cache_key: str, data: bytes | str, expire_time: int | None = None):
+        """Cache the data, entries with an explicit expire time are never served stale."""
+        entry = self._make_entry(data, expire_time or settings.cache_expire_time)
+        expire_time = expire_time or self._hard_expire_time
+        await self._bypass_on_failure(self.cache_storage.set, cache_key, self._encode(entry), expire_time)
+        if self.local_cache is not None:
+            self.local_cache.set(cache_key, entry, expire_time)
+
+    async def _set_many(self, values: Dict[str, bytes | str], tombstones: List[str] = ()):
+        if not values and not tombstones:
+            return
+        pipeline = self.cache_storage.pipeline(transaction=False)
+        for cache_key, data in values.items():
+            entry = self._make_entry(data, settings.cache_expire_time)
+            pipeline.set(cache_key, self._encode(entry), ex=self._hard_expire_time)
+            if self.local_cache is not None:
+                self.local_cache.set(cache_key, entry, self._hard_expire_time)
+        for cache_key in tombstones:
+            entry = self._make_entry(TOMBSTONE, settings.cache_negative_expire_time)
+            pipeline.set(cache_key, self._encode(entry), ex=settings.cache_negative_expire_time)
+            if self.local_cache is not None:
+                self.local_cache.set(cache_key, entry, settings.cache_negative_expire_time)
+        await self._bypass_on_failure(pipeline.execute)
+
+    async def _bypass_on_failure(self, func, *args) -> Any:
+        """
+        Call the cache storage, returning None if it is unavailable, so that requests bypass the cache
+        instead of waiting for it. The local tier keeps serving meanwhile.
+        """
+        try:
+            return await CACHE_POLICY.call(func, *args)
+        except (DependencyUnavailable, RedisError) as e:
+            CACHE_BYPASSES.labels(self.entity).inc()
+            logger.debug("Bypassing the cache of %s: %s", self.entity, e)
+            return None
+
+    def _count_hit(self, tier: str, operation: str):
+        getattr(self.stats, tier).hits += 1
+        CACHE_HITS.labels(self.entity, operation, tier).inc()
+
+    def _count_miss(self, tier: str, operation: str):
+        getattr(self.stats, tier).misses += 1
+        CACHE_MISSES.labels(self.entity, operation, tier).inc()
+
+    @staticmethod
+    def _trace_lookup(hits: int, keys: int, tier: str | None = None):
+        """Describe the lookup on the get-cache span, the tier is known when every key was found in one."""
+        span = trace.get_current_span()
+        span.set_attribute("cache.hit", hits == keys)
+        span.set_attribute("cache.hits", hits)
+        span.set_attribute("cache.keys", keys)
+        if tier is not None:
+            span.set_attribute("cache.tier", tier)
+
+    def _encode(self, entry: CacheEntry) -> bytes:
+        """Encode the entry, compressing payloads above the configured threshold."""
+        codec = self.codec if len(entry.payload) >= settings.cache_compression_threshold else Codec.NONE
+        started = time.perf_counter()
+        data = entry.encode(codec)
+        stats = self.stats.compression
+        stats.encode_seconds += time.perf_counter() - started
+        stats.encoded_entries += 1
+        stats.compressed_entries += data[1] != Codec.NONE
+        stats.raw_bytes += len(entry.payload)
+        stats.stored_bytes += len(data) - ENTRY_HEADER.size
+        return data
+
+    def _decode(self, cache_key: str, data: bytes) -> Optional[CacheEntry]:
+        started = time.perf_counter()
+        try:
+            entry = CacheEntry.decode(data)
+        except ValueError as e:
+            logger.warning("Unable to decode cache entry %s: %s", cache_key, e)
+            return None
+        self.stats.compression.decode_seconds += time.perf_counter() - started
+        self.stats.compression.decoded_entries += 1
+        return entry
+
+    @staticmethod
+    def _make_entry(data: bytes | str, expire_time: int) -> CacheEntry:
+        if isinstance(data, str):
+            data = data.encode()
+        return CacheEntry(payload=data, soft_expire_at=time.time() + expire_time)
+
+    @property
+    def _hard_expire_time(self) -> int:
+        return settings.cache_expire_time + settings.cache_stale_time
 
-    @abstractmethod
-    def _parse_instance_from_data(self, data: str) -> T:
-        raise NotImplementedError
+    @staticmethod
+    def _serialize_instance(instance: T, include: set[str] | None = None) -> bytes:
+        return instance.__pydantic_serializer__.to_json(instance, include=include)
 
 
 class FilmCachingService(CachingService[Film]):
-    def _parse_instance_from_data(self, data: str) -> Film:
-        return Film.deserialize_cache(data)
+    entity = "film"
+    model = Film
+    list_adapter = FILM_LIST_ADAPTER
 
 
 class PersonCachingService(CachingService[Person]):
-    def _parse_instance_from_data(self, data: str) -> Person:
-        data_dict = json.loads(data)
-        return Person.model_validate(data_dict)
+    entity = "person"
+    model = Person
+    list_adapter = PERSON_LIST_ADAPTER
 
 
 class GenreCachingService(CachingService[Genre]):
-    def _parse_instance_from_data(self, data: str) -> Genre:
-        data_dict = json.loads(data)
-        return Genre.model_validate(data_dict)
+    entity = "genre"
+    model = Genre
+    list_adapter = GENRE_LIST_ADAPTER
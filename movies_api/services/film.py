@@ -1,25 +1,44 @@
 from functools import lru_cache
 
 from cache_storage.cache_storage_protocol import CacheStorageProtocol
+from cache_storage.local_cache import LocalCache
 from db.elastic import get_elastic
+from db.local_cache import get_local_cache
 from db.redis import get_redis
 from db.tracer import get_tracer
 from fastapi import Depends
 from models.film import Film
 from opentelemetry import trace
 from search_engine.search_engine_protocol import SearchEngineProtocol
+from utils.single_flight import build_single_flight
 
-from .caching_service import FilmCachingService
+from .caching_service import CACHE_POLICY, FilmCachingService
+from .search_profile import SearchProfile
 from .search_service import FilmSearchService
 from .searchable_model_service import SearchableModelService
 
+FILM_SEARCH_PROFILE = SearchProfile(
+    fields={"title": 3, "actors_names": 1.5, "director": 1.5, "writers_names": 1, "description": 0.5},
+    fuzzy_fields=("title", "actors_names", "director", "writers_names"),
+    suggest_field="title_suggest",
+    suggest_source=("id", "title"),
+)
+
 
 @lru_cache()
 def get_film_service(
     redis: CacheStorageProtocol = Depends(get_redis),
     elastic: SearchEngineProtocol = Depends(get_elastic),
     tracer: trace.Tracer = Depends(get_tracer),
+    local_cache: LocalCache | None = Depends(get_local_cache),
 ) -> SearchableModelService:
-    redis = FilmCachingService(cache_storage=redis, prefix_plural="movies", prefix_single="movie", tracer=tracer)
-    elastic = FilmSearchService(search_engine=elastic, index="movies", tracer=tracer)
-    return SearchableModelService[Film](caching_service=redis, search_service=elastic)
+    single_flight = build_single_flight(redis, lock_policy=CACHE_POLICY)
+    redis = FilmCachingService(
+        cache_storage=redis,
+        prefix_plural="movies",
+        prefix_single="movie",
+        tracer=tracer,
+        local_cache=local_cache,
+    )
+    elastic = FilmSearchService(search_engine=elastic, index="movies", tracer=tracer, profile=FILM_SEARCH_PROFILE)
+    return SearchableModelService[Film](caching_service=redis, search_service=elastic, single_flight=single_flight)
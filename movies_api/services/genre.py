@@ -1,25 +1,42 @@
 from functools import lru_cache
 
 from cache_storage.cache_storage_protocol import CacheStorageProtocol
+from cache_storage.local_cache import LocalCache
 from db.elastic import get_elastic
+from db.local_cache import get_local_cache
 from db.redis import get_redis
 from db.tracer import get_tracer
 from fastapi import Depends
 from models.genre import Genre
 from opentelemetry import trace
 from search_engine.search_engine_protocol import SearchEngineProtocol
+from utils.single_flight import build_single_flight
 
-from .caching_service import GenreCachingService
+from .caching_service import CACHE_POLICY, GenreCachingService
+from .search_profile import SearchProfile
 from .search_service import GenreSearchService
 from .searchable_model_service import SearchableModelService
 
+GENRE_SEARCH_PROFILE = SearchProfile(
+    fields={"name": 3, "description": 1},
+    fuzzy_fields=("name",),
+)
+
 
 @lru_cache()
 def get_genre_service(
     redis: CacheStorageProtocol = Depends(get_redis),
     elastic: SearchEngineProtocol = Depends(get_elastic),
     tracer: trace.Tracer = Depends(get_tracer),
+    local_cache: LocalCache | None = Depends(get_local_cache),
 ) -> SearchableModelService:
-    redis = GenreCachingService(cache_storage=redis, prefix_single="genre", prefix_plural="genres", tracer=tracer)
-    elastic = GenreSearchService(search_engine=elastic, index="genres", tracer=tracer)
-    return SearchableModelService[Genre](caching_service=redis, search_service=elastic)
+    single_flight = build_single_flight(redis, lock_policy=CACHE_POLICY)
+    redis = GenreCachingService(
+        cache_storage=redis,
+        prefix_single="genre",
+        prefix_plural="genres",
+        tracer=tracer,
+        local_cache=local_cache,
+    )
+    elastic = GenreSearchService(search_engine=elastic, index="genres", tracer=tracer, profile=GENRE_SEARCH_PROFILE)
+    return SearchableModelService[Genre](caching_service=redis, search_service=elastic, single_flight=single_flight)
@@ -2,25 +2,44 @@ from functools import lru_cache
 from typing import Optional
 
 from cache_storage.cache_storage_protocol import CacheStorageProtocol
+from cache_storage.local_cache import LocalCache
 from db.elastic import get_elastic
+from db.local_cache import get_local_cache
 from db.redis import get_redis
 from db.tracer import get_tracer
 from fastapi import Depends
 from models.person import Person
 from opentelemetry import trace
 from search_engine.search_engine_protocol import SearchEngineProtocol
+from utils.single_flight import build_single_flight
 
-from .caching_service import PersonCachingService
+from .caching_service import CACHE_POLICY, PersonCachingService
+from .search_profile import SearchProfile
 from .search_service import PersonSearchService
 from .searchable_model_service import SearchableModelService
 
+PERSON_SEARCH_PROFILE = SearchProfile(
+    fields={"full_name": 1},
+    fuzzy_fields=("full_name",),
+    suggest_field="full_name_suggest",
+    suggest_source=("id", "full_name"),
+)
+
 
 @lru_cache()
 def get_person_service(
     redis: CacheStorageProtocol = Depends(get_redis),
     elastic: SearchEngineProtocol = Depends(get_elastic),
     tracer: trace.Tracer = Depends(get_tracer),
+    local_cache: LocalCache | None = Depends(get_local_cache),
 ) -> SearchableModelService:
-    redis = PersonCachingService(cache_storage=redis, prefix_plural="persons", prefix_single="person", tracer=tracer)
-    elastic = PersonSearchService(search_engine=elastic, index="persons", tracer=tracer)
-    return SearchableModelService[Person](caching_service=redis, search_service=elastic)
+    single_flight = build_single_flight(redis, lock_policy=CACHE_POLICY)
+    redis = PersonCachingService(
+        cache_storage=redis,
+        prefix_plural="persons",
+        prefix_single="person",
+        tracer=tracer,
+        local_cache=local_cache,
+    )
+    elastic = PersonSearchService(search_engine=elastic, index="persons", tracer=tracer, profile=PERSON_SEARCH_PROFILE)
+    return SearchableModelService[Person](caching_service=redis, search_service=elastic, single_flight=single_flight)
@@ -0,0 +1,72 @@
+from dataclasses import dataclass, field
+
+
+@dataclass(frozen=True)
+class SearchProfile:
+    """
+    Fields of an index searched by the text query and how they are matched.
+
+    ``fields`` maps field names to their boosts. Fuzzy matching is expensive, so it is applied
+    only to ``fuzzy_fields``, which should be short ones like titles and names, and is bounded
+    by ``prefix_length`` and ``max_expansions``. Suggestions are looked up in the completion
+    field ``suggest_field`` and hold only the ``suggest_source`` fields.
+    """
+
+    fields: dict[str, float]
+    fuzzy_fields: tuple[str, ...] = field(default_factory=tuple)
+    fuzziness: str = "AUTO"
+    prefix_length: int = 1
+    max_expansions: int = 20
+    suggest_field: str | None = None
+    suggest_source: tuple[str, ...] = field(default_factory=tuple)
+
+    def phrase_query(self, search: str) -> dict:
+        """Cheap query matching the search text as an exact phrase."""
+        return {
+            "multi_match": {
+                "query": search,
+                "type": "phrase",
+                "fields": self._boosted(self.fields),
+            }
+        }
+
+    def fuzzy_query(self, search: str) -> dict:
+        """Query matching separate words of the search text, tolerating typos in the fuzzy fields."""
+        should = [
+            {
+                "multi_match": {
+                    "query": search,
+                    "fields": self._boosted(self.fields),
+                }
+            }
+        ]
+        if self.fuzzy_fields:
+            should.append(
+                {
+                    "multi_match": {
+                        "query": search,
+                        "fields": self._boosted({name: self.fields.get(name, 1) for name in self.fuzzy_fields}),
+                        "fuzziness": self.fuzziness,
+                        "prefix_length": self.prefix_length,
+                        "max_expansions": self.max_expansions,
+                    }
+                }
+            )
+        return {"bool": {"should": should, "minimum_should_match": 1}}
+
+    def suggest_query(self, prefix: str, size: int) -> dict:
+        # No hits are needed besides the suggestions.
+        return {
+            "size": 0,
+            "_source": list(self.suggest_source),
+            "suggest": {
+                "suggestions": {
+                    "prefix": prefix,
+                    "completion": {"field": self.suggest_field, "size": size, "skip_duplicates": True},
+                }
+            },
+        }
+
+    @staticmethod
+    def _boosted(fields: dict[str, float]) -> list[str]:
+        return [name if boost == 1 else f"{name}^{boost:g}" for name, boost in fields.items()]
@@ -1,58 +1,244 @@
+import logging
+from http import HTTPStatus
 from typing import Generic, List, Optional, TypeVar
 
-from backoff.backoff import backoff_public_methods
-from elasticsearch import NotFoundError
-from models.film import Film
-from models.genre import Genre
-from models.person import Person
+from core.config import settings
+from core.metrics import SEARCH_LATENCY
+from elasticsearch import ApiError, NotFoundError, TransportError
+from models.film import FILM_SOURCE_FIELDS, Film
+from models.genre import GENRE_LIST_ADAPTER, Genre
+from models.person import PERSON_LIST_ADAPTER, Person
 from opentelemetry import trace
 from pydantic import BaseModel
+from resilience.circuit_breaker import CircuitBreaker
+from resilience.policy import ResiliencePolicy, resilient_public_methods
 from search_engine.search_engine_protocol import SearchEngineProtocol
 
+from .search_profile import SearchProfile
+
 T = TypeVar("T", bound=BaseModel)
 
+logger = logging.getLogger(__name__)
+
+
+def is_transient_search_error(error: Exception) -> bool:
+    """Connection errors, timeouts, overload and server errors, the ones worth another attempt."""
+    if isinstance(error, ApiError):
+        return error.meta.status >= 500 or error.meta.status == HTTPStatus.TOO_MANY_REQUESTS
+    return isinstance(error, TransportError)
+
+
+SEARCH_POLICY = ResiliencePolicy(
+    breaker=CircuitBreaker(
+        "elasticsearch",
+        failure_threshold=settings.search_breaker_failure_threshold,
+        reset_timeout=settings.search_breaker_reset_timeout,
+    ),
+    is_transient=is_transient_search_error,
+    attempts=settings.search_retry_attempts,
+    wait_base=settings.search_retry_wait_base,
+    wait_max=settings.search_retry_wait_max,
+    attempt_timeout=settings.search_attempt_timeout,
+)
 
-@backoff_public_methods()
+
+@resilient_public_methods(SEARCH_POLICY)
 class SearchService(Generic[T]):
-    def __init__(self, search_engine: SearchEngineProtocol, index: str, tracer: trace.Tracer):
+    # Label of the searched model in metrics.
+    entity: str
+
+    def __init__(
+        self,
+        search_engine: SearchEngineProtocol,
+        index: str,
+        tracer: trace.Tracer,
+        profile: SearchProfile,
+    ):
         self.search_engine = search_engine
         self.index = index
         self.tracer = tracer
+        self.profile = profile
 
     async def get_by_id(self, instance_id: str) -> Optional[T]:
         try:
-            with self.tracer.start_as_current_span("search-index"):
+            with self.tracer.start_as_current_span("search-index"), SEARCH_LATENCY.labels(self.entity, "by-id").time():
                 doc = await self.search_engine.get(index=self.index, id=instance_id)
                 return self._deserialize(doc)
         except NotFoundError:
             return None
 
+    async def get_many_by_ids(self, instance_ids: List[str]) -> List[T]:
+        if not instance_ids:
+            return []
+        with self.tracer.start_as_current_span("search-index"), SEARCH_LATENCY.labels(self.entity, "by-ids").time():
+            response = await self.search_engine.mget(index=self.index, ids=instance_ids)
+        return self._deserialize_many([doc for doc in response["docs"] if doc.get("found")])
+
     async def get_by_parameters(
         self,
         page_number: int,
         page_size: int,
         search: str | None = None,
         sort: str | None = None,
+        fields: set[str] | None = None,
+        related_to: tuple[str, str] | None = None,
     ) -> Optional[List[T]]:
+        """
+        Return a page of instances, holding only ``fields`` if they are given.
+
+        ``related_to`` narrows the page to instances related to another entity, see ``_get_relation_filter``.
+        """
         query = {
-            "query": self._get_query_match(search=search),
             "size": page_size,
             "from": (page_number - 1) * page_size,
         }
+        if fields:
+            query["_source"] = self._source_fields(fields)
 
         if sort:
             query["sort"] = self._get_sort_params(sort=sort)
 
         try:
-            with self.tracer.start_as_current_span("search-index"):
-                doc = await self.search_engine.search(
-                    index=self.index,
-                    body=query,
-                )
+            doc = await self._search(
+                index=self.index,
+                body=query,
+                search=search,
+                operation="list",
+                filter=self._get_relation_filter(*related_to) if related_to else None,
+            )
         except NotFoundError:
             return None
         documents = doc["hits"]["hits"]
-        return [self._deserialize(doc) for doc in documents]
+        if fields:
+            return [self._deserialize_fields(doc, fields) for doc in documents]
+        return self._deserialize_many(documents)
+
+    async def get_page_after(
+        self,
+        page_size: int,
+        search: str | None = None,
+        sort: str | None = None,
+        search_after: list | None = None,
+        pit_id: str | None = None,
+        fields: set[str] | None = None,
+    ) -> Optional[tuple[List[T], Optional[list], Optional[str]]]:
+        """
+        Return the page following the sort values of the previous page's last hit.
+
+        Returns the instances, the sort values of the last hit and the point in time id to use
+        for the next page, or None if the point in time has expired.
+        """
+        query = {
+            "size": page_size,
+            "sort": self._get_cursor_sort_params(sort=sort),
+        }
+        if search_after:
+            query["search_after"] = search_after
+        if fields:
+            query["_source"] = self._source_fields(fields)
+        if pit_id:
+            # A search pinned to a point in time must not name the index.
+            query["pit"] = {"id": pit_id, "keep_alive": settings.search_cursor_keep_alive}
+
+        try:
+            doc = await self._search(
+                index=None if pit_id else self.index, body=query, search=search, operation="cursor"
+            )
+        except NotFoundError:
+            return None
+        documents = doc["hits"]["hits"]
+        last_sort = documents[-1]["sort"] if documents else None
+        if fields:
+            instances = [self._deserialize_fields(doc, fields) for doc in documents]
+        else:
+            instances = self._deserialize_many(documents)
+        return instances, last_sort, doc.get("pit_id", pit_id)
+
+    async def suggest(self, prefix: str, size: int) -> Optional[List[dict]]:
+        """Return the suggestion fields of the documents completing the prefix."""
+        try:
+            with self.tracer.start_as_current_span("search-index"), SEARCH_LATENCY.labels(
+                self.entity, "suggest"
+            ).time():
+                doc = await self.search_engine.search(index=self.index, body=self.profile.suggest_query(prefix, size))
+        except NotFoundError:
+            return None
+        return [option["_source"] for option in doc["suggest"]["suggestions"][0]["options"]]
+
+    async def open_point_in_time(self) -> str:
+        with self.tracer.start_as_current_span("search-index"):
+            response = await self.search_engine.open_point_in_time(
+                index=self.index, keep_alive=settings.search_cursor_keep_alive
+            )
+        return response["id"]
+
+    async def close_point_in_time(self, pit_id: str):
+        """Release the point in time before it expires, failures are only logged as it expires anyway."""
+        try:
+            with self.tracer.start_as_current_span("search-index"):
+                await self.search_engine.close_point_in_time(id=pit_id)
+        except (ApiError, TransportError) as e:
+            logger.warning("Failed to close point in time: %s", e)
+
+    async def _search(
+        self,
+        index: str | None,
+        body: dict,
+        search: str | None,
+        operation: str,
+        filter: dict | None = None,
+    ) -> dict:
+        """
+        Search with the text query of the profile, narrowed down by the filter if it is given.
+
+        The exact phrase is tried first. The fuzzy query, which is much more expensive, runs only
+        when the phrase matches nothing. The choice depends on the query alone, not on the page,
+        so all pages of a query come from the same result set.
+        """
+        with self.tracer.start_as_current_span("search-index") as span, SEARCH_LATENCY.labels(
+            self.entity, operation
+        ).time():
+            if not search:
+                query = self._filtered({"match_all": {}}, filter)
+                doc = await self.search_engine.search(index=index, body={**body, "query": query})
+                return self._traced(span, doc, query_type="match_all")
+
+            phrase_body = {
+                **body,
+                "query": self._filtered(self.profile.phrase_query(search), filter),
+                "track_total_hits": 1,
+            }
+            doc = await self.search_engine.search(index=index, body=phrase_body)
+            hits = doc["hits"]
+            if hits["hits"] or hits.get("total", {}).get("value"):
+                return self._traced(span, doc, query_type="phrase")
+            if "pit" in body:
+                body = {**body, "pit": {**body["pit"], "id": doc.get("pit_id", body["pit"]["id"])}}
+            doc = await self.search_engine.search(
+                index=index, body={**body, "query": self._filtered(self.profile.fuzzy_query(search), filter)}
+            )
+            return self._traced(span, doc, query_type="fuzzy")
+
+    @staticmethod
+    def _traced(span: trace.Span, doc: dict, query_type: str) -> dict:
+        span.set_attribute("search.query_type", query_type)
+        span.set_attribute("search.hits", len(doc["hits"]["hits"]))
+        return doc
+
+    @staticmethod
+    def _filtered(query: dict, filter: dict | None) -> dict:
+        if filter is None:
+            return query
+        return {"bool": {"must": [query], "filter": [filter]}}
+
+    def _get_relation_filter(self, relation: str, value: str) -> dict:
+        raise NotImplementedError(f"Relation {relation} is not supported by this index")
+
+    @classmethod
+    def _get_cursor_sort_params(cls, sort: str | None) -> list:
+        # search_after needs a total order, the unique id breaks ties between equal ratings or scores.
+        sort_params = cls._get_sort_params(sort=sort) if sort else [{"_score": "desc"}]
+        return sort_params + [{"id": "asc"}]
 
     @staticmethod
     def _get_sort_params(sort):
@@ -61,32 +247,66 @@ class SearchService(Generic[T]):
         )
         return [{sort_key: sort_order}]
 
-    @staticmethod
-    def _get_query_match(search: str | None):
-        if search:
-            return {
-                "multi_match": {
-                    "query": search,
-                    "fields": ["*"],
-                    "fuzziness": "AUTO",
-                }
-            }
-        return {"match_all": {}}
-
     def _deserialize(self, data):
         raise NotImplementedError("Subclasses must implement this method")
 
+    def _deserialize_many(self, documents) -> List[T]:
+        raise NotImplementedError("Subclasses must implement this method")
+
+    def _source_fields(self, fields: set[str]) -> list[str]:
+        raise NotImplementedError("Sparse fieldsets are not supported by this index")
+
+    def _deserialize_fields(self, data, fields: set[str]):
+        raise NotImplementedError("Sparse fieldsets are not supported by this index")
+
 
 class FilmSearchService(SearchService[Film]):
+    entity = "film"
+
     def _deserialize(self, data):
         return Film.deserialize_search(data)
 
+    def _deserialize_many(self, documents) -> List[Film]:
+        return Film.deserialize_search_many(documents)
+
+    def _source_fields(self, fields: set[str]) -> list[str]:
+        return [FILM_SOURCE_FIELDS[name] for name in fields]
+
+    def _get_relation_filter(self, relation: str, value: str) -> dict:
+        if relation == "person":
+            # Only actors and writers are indexed with ids, directors are stored by name.
+            return {
+                "bool": {
+                    "should": [
+                        {"nested": {"path": role, "query": {"terms": {f"{role}.id": [value]}}}}
+                        for role in ("actors", "writers")
+                    ],
+                    "minimum_should_match": 1,
+                }
+            }
+        if relation == "genre":
+            return {"terms": {"genre": [value]}}
+        return super()._get_relation_filter(relation, value)
+
+    def _deserialize_fields(self, data, fields: set[str]):
+        return Film.deserialize_search_fields(data, fields)
+
 
 class GenreSearchService(SearchService[Genre]):
+    entity = "genre"
+
     def _deserialize(self, data):
         return Genre.model_validate(data["_source"])
 
+    def _deserialize_many(self, documents) -> List[Genre]:
+        return GENRE_LIST_ADAPTER.validate_python([document["_source"] for document in documents])
+
 
 class PersonSearchService(SearchService[Person]):
+    entity = "person"
+
     def _deserialize(self, data):
         return Person.model_validate(data["_source"])
+
+    def _deserialize_many(self, documents) -> List[Person]:
+        return PERSON_LIST_ADAPTER.validate_python([document["_source"] for document in documents])
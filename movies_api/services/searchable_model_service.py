@@ -1,27 +1,42 @@
-from typing import Generic, Optional, TypeVar
+import asyncio
+import contextlib
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable, Generic, Optional, TypeVar
 
+from core.config import settings
+from core.metrics import PAYLOAD_BYTES, RESULT_SIZE
 from opentelemetry import trace
 from pydantic import BaseModel
+from resilience.deadline import request_deadline
+from utils.search_cursor import decode_cursor, encode_cursor
+from utils.search_query import normalize_search, search_digest
+from utils.single_flight import SingleFlight
 
-from .caching_service import CachingService
+from .caching_service import CacheResult, CachingService
 from .search_service import SearchService
 
 T = TypeVar("T", bound=BaseModel)
 
+logger = logging.getLogger(__name__)
+
 
 class SearchableModelService(Generic[T]):
-    def __init__(self, caching_service: CachingService, search_service: SearchService):
+    def __init__(
+        self,
+        caching_service: CachingService,
+        search_service: SearchService,
+        single_flight: SingleFlight | None = None,
+    ):
         self.cache = caching_service
         self.search = search_service
+        self.single_flight = single_flight or SingleFlight()
+        self._background_refreshes: set[asyncio.Task] = set()
 
     async def get_by_id(self, film_id: str) -> Optional[T]:
-        item = await self.cache.get_instance_from_cache(film_id)
-        if not item:
-            item = await self.search.get_by_id(film_id)
-            if not item:
-                return None
-            await self.cache.put_instance_to_cache(item)
-        return item
+        payload = await self.get_raw_by_id(film_id)
+        if payload is None:
+            return None
+        return self.cache.parse_instance(payload)
 
     async def get_many_by_parameters(
         self,
@@ -30,20 +45,369 @@ class SearchableModelService(Generic[T]):
         search: str | None = None,
         sort: str | None = None,
     ) -> list[Optional[T]]:
-        items = await self.cache.get_list_from_cache(
-            search=search, page_size=page_size, page_number=page_number, sort=sort
+        payloads = await self._get_page_payloads(page_number=page_number, page_size=page_size, search=search, sort=sort)
+        return self.cache.parse_instances(payloads)
+
+    async def get_raw_by_id(self, film_id: str) -> Optional[bytes]:
+        """Return the JSON document of the instance exactly as it is stored in the cache."""
+        payload = await self._get_through_cache(
+            key=self.cache.instance_key(film_id),
+            get_cached=lambda: self.cache.get_instance_from_cache(film_id),
+            fetch=lambda: self._fetch_by_id(film_id),
         )
-        if not items:
-            items = await self.search.get_by_parameters(
-                search=search, page_number=page_number, page_size=page_size, sort=sort
+        self._observe_payloads("by-id", [payload] if payload is not None else [])
+        return payload
+
+    async def get_raw_many_by_parameters(
+        self,
+        page_number: int,
+        page_size: int,
+        search: str | None = None,
+        sort: str | None = None,
+        fields: set[str] | None = None,
+    ) -> bytes:
+        """
+        Return the page as a JSON array assembled from the cached documents without parsing them.
+
+        With ``fields`` the documents hold only these fields, and the page is cached as a whole.
+        """
+        if fields:
+            return await self._get_sparse_page(
+                page_number=page_number, page_size=page_size, fields=fields, search=search, sort=sort
             )
-            if not items:
-                return []
-            await self.cache.put_list_to_cache(
-                search=search,
-                page_number=page_number,
-                page_size=page_size,
-                sort=sort,
-                instances=items,
+        payloads = await self._get_page_payloads(page_number=page_number, page_size=page_size, search=search, sort=sort)
+        self._observe_payloads("list", payloads)
+        return b"[" + b",".join(payloads) + b"]"
+
+    async def get_raw_many_related(
+        self,
+        related_to: tuple[str, str],
+        page_number: int,
+        page_size: int,
+        sort: str | None = None,
+    ) -> bytes:
+        """
+        Return the page of instances related to another entity as a JSON array, e.g. films of a person.
+
+        ``related_to`` is a pair of the relation name known to the search service and the related value.
+        """
+        payloads = await self._get_page_payloads(
+            page_number=page_number, page_size=page_size, sort=sort, related_to=related_to
+        )
+        self._observe_payloads("list", payloads)
+        return b"[" + b",".join(payloads) + b"]"
+
+    async def get_raw_many_by_ids(self, instance_ids: list[str]) -> bytes:
+        """Return the instances as a JSON array in the order of the ids, skipping unknown ids."""
+        payloads = await self._resolve_ids(list(dict.fromkeys(instance_ids)))
+        self._observe_payloads("by-ids", payloads)
+        return b"[" + b",".join(payloads) + b"]"
+
+    async def get_raw_page_after(
+        self,
+        cursor: str,
+        page_size: int,
+        search: str | None = None,
+        sort: str | None = None,
+        fields: set[str] | None = None,
+    ) -> tuple[bytes, Optional[str]]:
+        """
+        Return the page following the cursor as a JSON array, together with the cursor of the next page.
+
+        An empty cursor starts from the first page. The next cursor is None after the last page.
+        Raises ValueError if the cursor is malformed, belongs to another query or has expired.
+        """
+        search = normalize_search(search)
+        query_digest = search_digest(search=search, sort=sort)
+        position = decode_cursor(cursor) if cursor else {"after": None}
+        if cursor and position.get("query") != query_digest:
+            raise ValueError("Cursor belongs to another query")
+        pit_id = position.get("pit")
+        if not cursor and settings.search_cursor_point_in_time:
+            pit_id = await self.search.open_point_in_time()
+
+        page = await self.search.get_page_after(
+            page_size=page_size,
+            search=search,
+            sort=sort,
+            search_after=position["after"],
+            pit_id=pit_id,
+            fields=fields,
+        )
+        if page is None:
+            raise ValueError("Cursor has expired")
+        items, last_sort, pit_id = page
+
+        next_cursor = None
+        if len(items) == page_size:
+            next_cursor = encode_cursor({"query": query_digest, "after": last_sort, "pit": pit_id})
+        if fields:
+            page = self.cache.render_sparse_page(items, fields)
+            self._observe_result("cursor", len(items), len(page))
+            return page, next_cursor
+
+        # Deep pages are rarely read twice, only their documents are cached.
+        payloads = list((await self.cache.put_instances_to_cache(items)).values())
+        self._observe_payloads("cursor", payloads)
+        return b"[" + b",".join(payloads) + b"]", next_cursor
+
+    async def export_raw(
+        self,
+        search: str | None = None,
+        sort: str | None = None,
+        fields: set[str] | None = None,
+    ) -> AsyncIterator[bytes]:
+        """
+        Yield every instance matching the query as newline-delimited JSON, a chunk per batch.
+
+        Batches are scanned with search_after in a point in time, bypassing the cache. The scan runs
+        ahead of the consumer by at most ``settings.export_prefetch_batches`` batches, so a slow
+        reader pauses it instead of buffering the whole result. Raises RuntimeError if the point
+        in time expires while the consumer is not reading.
+        """
+        batches: asyncio.Queue = asyncio.Queue(maxsize=settings.export_prefetch_batches)
+        # The export takes as long as the client reads it, the deadline of the request does not apply.
+        with request_deadline(None):
+            scan = asyncio.create_task(
+                self._scan(batches=batches, search=normalize_search(search), sort=sort, fields=fields)
+            )
+        try:
+            while (batch := await batches.get()) is not None:
+                if isinstance(batch, Exception):
+                    raise batch
+                yield batch
+        finally:
+            scan.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await scan
+
+    async def get_raw_suggestions(self, prefix: str, size: int) -> bytes:
+        """Return the JSON array of short documents completing the prefix, e.g. ids and titles."""
+        prefix = normalize_search(prefix) or ""
+        suggestions = await self._get_through_cache(
+            key=self.cache.suggest_key(prefix, size),
+            get_cached=lambda: self.cache.get_suggestions_from_cache(prefix, size),
+            fetch=lambda: self._fetch_suggestions(prefix, size),
+        )
+        PAYLOAD_BYTES.labels(self.cache.entity, "suggest").observe(len(suggestions))
+        return suggestions
+
+    async def _scan(self, batches: asyncio.Queue, search: str | None, sort: str | None, fields: set[str] | None):
+        """Put the rendered batches of the export to the queue, then None, or the error that stopped the scan."""
+        batch_size = settings.export_batch_size
+        pit_id = None
+        try:
+            pit_id = await self.search.open_point_in_time()
+            search_after = None
+            while True:
+                page = await self.search.get_page_after(
+                    page_size=batch_size,
+                    search=search,
+                    sort=sort,
+                    search_after=search_after,
+                    pit_id=pit_id,
+                    fields=fields,
+                )
+                if page is None:
+                    raise RuntimeError("Point in time of the export has expired")
+                items, search_after, pit_id = page
+                if items:
+                    chunk = self.cache.render_lines(items, fields)
+                    self._observe_result("export", len(items), len(chunk))
+                    await batches.put(chunk)
+                if len(items) < batch_size:
+                    break
+        except Exception as e:
+            await batches.put(e)
+        else:
+            await batches.put(None)
+        finally:
+            if pit_id is not None:
+                await self.search.close_point_in_time(pit_id)
+
+    async def _fetch_suggestions(self, prefix: str, size: int) -> bytes:
+        suggestions = await self.search.suggest(prefix, size) if prefix else []
+        return await self.cache.put_suggestions_to_cache(prefix, size, suggestions or [])
+
+    def _observe_payloads(self, operation: str, payloads: list[bytes]):
+        self._observe_result(operation, len(payloads), sum(len(payload) for payload in payloads))
+
+    def _observe_result(self, operation: str, count: int, size: int):
+        RESULT_SIZE.labels(self.cache.entity, operation).observe(count)
+        PAYLOAD_BYTES.labels(self.cache.entity, operation).observe(size)
+        span = trace.get_current_span()
+        span.set_attribute("result.count", count)
+        span.set_attribute("result.bytes", size)
+
+    async def _get_sparse_page(
+        self,
+        page_number: int,
+        page_size: int,
+        fields: set[str],
+        search: str | None = None,
+        sort: str | None = None,
+    ) -> bytes:
+        search = normalize_search(search)
+        page = await self._get_through_cache(
+            key=self.cache.list_key(
+                page_size=page_size, page_number=page_number, search=search, sort=sort, fields=fields
+            ),
+            get_cached=lambda: self.cache.get_sparse_page_from_cache(
+                page_size=page_size, page_number=page_number, fields=fields, search=search, sort=sort
+            ),
+            fetch=lambda: self._fetch_sparse_page(
+                page_number=page_number, page_size=page_size, fields=fields, search=search, sort=sort
+            ),
+        )
+        # The number of documents is not kept with the rendered page.
+        PAYLOAD_BYTES.labels(self.cache.entity, "list").observe(len(page))
+        return page
+
+    async def _fetch_sparse_page(
+        self,
+        page_number: int,
+        page_size: int,
+        fields: set[str],
+        search: str | None = None,
+        sort: str | None = None,
+    ) -> bytes:
+        items = await self.search.get_by_parameters(
+            search=search, page_number=page_number, page_size=page_size, sort=sort, fields=fields
+        )
+        return await self.cache.put_sparse_page_to_cache(
+            page_size=page_size, page_number=page_number, fields=fields, instances=items or [], search=search, sort=sort
+        )
+
+    async def _get_page_payloads(
+        self,
+        page_number: int,
+        page_size: int,
+        search: str | None = None,
+        sort: str | None = None,
+        related_to: tuple[str, str] | None = None,
+    ) -> list[bytes]:
+        # Equivalent queries share one cache entry, so they are sent to the search engine in the same form.
+        search = normalize_search(search)
+        payloads = await self._get_through_cache(
+            key=self.cache.list_key(
+                page_size=page_size, page_number=page_number, search=search, sort=sort, related_to=related_to
+            ),
+            get_cached=lambda: self._get_cached_page(
+                search=search, page_size=page_size, page_number=page_number, sort=sort, related_to=related_to
+            ),
+            fetch=lambda: self._fetch_many_by_parameters(
+                page_number=page_number, page_size=page_size, search=search, sort=sort, related_to=related_to
+            ),
+        )
+        return payloads or []
+
+    async def _get_through_cache(
+        self,
+        key: str,
+        get_cached: Callable[[], Awaitable[Optional[CacheResult]]],
+        fetch: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """
+        Serve the value from the cache, refreshing stale entries in the background.
+
+        Only a cache miss waits for the search engine: stale entries are returned as is
+        until their hard expiry, even if the search engine fails to refresh them.
+        """
+        cached = await get_cached()
+        if cached is None:
+
+            async def check():
+                result = await get_cached()
+                return result.value if result else None
+
+            return await self.single_flight.do(key, fetch, check=check)
+
+        if cached.is_stale:
+            self._refresh_in_background(key, fetch)
+        return cached.value
+
+    def _refresh_in_background(self, key: str, fetch: Callable[[], Awaitable[Any]]):
+        if self.single_flight.in_flight(key):
+            return
+        # The refresh outlives the request, so the deadline of the request does not apply.
+        with request_deadline(None):
+            refresh = asyncio.ensure_future(self.single_flight.do(key, fetch))
+        self._background_refreshes.add(refresh)
+        refresh.add_done_callback(self._on_refresh_done)
+
+    def _on_refresh_done(self, refresh: asyncio.Task):
+        self._background_refreshes.discard(refresh)
+        if not refresh.cancelled() and refresh.exception() is not None:
+            logger.warning("Failed to refresh stale cache entry: %s", refresh.exception())
+
+    async def _get_cached_page(
+        self,
+        page_number: int,
+        page_size: int,
+        search: str | None = None,
+        sort: str | None = None,
+        related_to: tuple[str, str] | None = None,
+    ) -> Optional[CacheResult[list[bytes]]]:
+        page = await self.cache.get_list_from_cache(
+            search=search, page_size=page_size, page_number=page_number, sort=sort, related_to=related_to
+        )
+        if page is None:
+            return None
+        return CacheResult(await self._resolve_ids(page.value), page.is_stale)
+
+    async def _resolve_ids(self, instance_ids: list[str]) -> list[bytes]:
+        """
+        Resolve ids to cached documents with one cache lookup.
+
+        Only the instances missing from the cache are fetched from the search engine,
+        with a single multi-get. Ids unknown to the search engine are dropped.
+        """
+        cached = await self.cache.get_instances_from_cache(instance_ids)
+
+        stale_ids = [instance_id for instance_id, result in cached.items() if result.is_stale]
+        if stale_ids:
+            self._refresh_in_background(
+                key="|".join(self.cache.instance_key(instance_id) for instance_id in stale_ids),
+                fetch=lambda: self._fetch_many_by_ids(stale_ids),
             )
-        return items
+
+        # Tombstones of unknown ids are kept with the value None, so they are not fetched again.
+        payloads = {instance_id: result.value for instance_id, result in cached.items()}
+        missing_ids = [instance_id for instance_id in instance_ids if instance_id not in payloads]
+        if missing_ids:
+            payloads.update(await self._fetch_many_by_ids(missing_ids))
+        return [payloads[instance_id] for instance_id in instance_ids if payloads.get(instance_id) is not None]
+
+    async def _fetch_many_by_ids(self, instance_ids: list[str]) -> dict[str, bytes]:
+        items = await self.search.get_many_by_ids(instance_ids)
+        found_ids = {item.id for item in items}
+        return await self.cache.put_instances_to_cache(
+            items, missing_ids=[instance_id for instance_id in instance_ids if instance_id not in found_ids]
+        )
+
+    async def _fetch_by_id(self, film_id: str) -> Optional[bytes]:
+        item = await self.search.get_by_id(film_id)
+        if not item:
+            await self.cache.put_missing_instance_to_cache(film_id)
+            return None
+        return await self.cache.put_instance_to_cache(item)
+
+    async def _fetch_many_by_parameters(
+        self,
+        page_number: int,
+        page_size: int,
+        search: str | None = None,
+        sort: str | None = None,
+        related_to: tuple[str, str] | None = None,
+    ) -> list[bytes]:
+        items = await self.search.get_by_parameters(
+            search=search, page_number=page_number, page_size=page_size, sort=sort, related_to=related_to
+        )
+        return await self.cache.put_list_to_cache(
+            search=search,
+            page_number=page_number,
+            page_size=page_size,
+            sort=sort,
+            instances=items or [],
+            related_to=related_to,
+        )
@@ -0,0 +1,87 @@
+import time
+import zlib
+
+import pytest
+from cache_storage.cache_entry import (
+    ENTRY_FORMAT_VERSION,
+    ENTRY_HEADER,
+    ENTRY_HEADER_V1,
+    CacheEntry,
+)
+from cache_storage.compression import Codec, compress, decompress, get_codec
+
+PAYLOAD = (
+    b'{"id":"f1","title":"Star Wars","description":"' + b"A long time ago in a galaxy far, far away. " * 20 + b'"}'
+)
+
+
+@pytest.mark.parametrize("codec", list(Codec))
+def test_compress_round_trip(codec):
+    assert decompress(compress(PAYLOAD, codec), codec) == PAYLOAD
+
+
+@pytest.mark.parametrize("codec", [Codec.ZLIB, Codec.LZ4])
+def test_decompress_of_corrupted_data_raises_value_error(codec):
+    with pytest.raises(ValueError):
+        decompress(b"not compressed", codec)
+
+
+def test_get_codec_by_name():
+    assert get_codec("none") == Codec.NONE
+    assert get_codec("ZLIB") == Codec.ZLIB
+    assert get_codec("lz4") == Codec.LZ4
+
+
+def test_get_codec_falls_back_to_zlib_without_lz4(monkeypatch):
+    monkeypatch.setattr("cache_storage.compression.lz4_frame", None)
+
+    assert get_codec("lz4") == Codec.ZLIB
+
+
+@pytest.mark.parametrize("codec", list(Codec))
+def test_entry_round_trip(codec):
+    entry = CacheEntry(payload=PAYLOAD, soft_expire_at=1700000000.5)
+
+    assert CacheEntry.decode(entry.encode(codec)) == entry
+
+
+@pytest.mark.parametrize("codec", [Codec.ZLIB, Codec.LZ4])
+def test_entry_header_records_the_codec_of_compressed_payloads(codec):
+    data = CacheEntry(payload=PAYLOAD, soft_expire_at=1.0).encode(codec)
+
+    assert ENTRY_HEADER.unpack_from(data) == (ENTRY_FORMAT_VERSION, codec, 1.0)
+    assert len(data) < ENTRY_HEADER.size + len(PAYLOAD)
+
+
+def test_entry_is_stored_uncompressed_when_compression_does_not_pay_off():
+    payload = b'{"id":"g1"}'
+
+    data = CacheEntry(payload=payload, soft_expire_at=1.0).encode(Codec.ZLIB)
+
+    assert ENTRY_HEADER.unpack_from(data) == (ENTRY_FORMAT_VERSION, Codec.NONE, 1.0)
+    assert data[ENTRY_HEADER.size :] == payload
+
+
+def test_version_1_entry_is_decoded():
+    data = ENTRY_HEADER_V1.pack(1, 1.0) + PAYLOAD
+
+    assert CacheEntry.decode(data) == CacheEntry(payload=PAYLOAD, soft_expire_at=1.0)
+
+
+def test_entry_without_header_is_never_stale():
+    entry = CacheEntry.decode(PAYLOAD)
+
+    assert entry.payload == PAYLOAD
+    assert entry.is_stale is False
+
+
+def test_entry_with_unknown_codec_raises_value_error():
+    data = ENTRY_HEADER.pack(ENTRY_FORMAT_VERSION, 9, 1.0) + zlib.compress(PAYLOAD)
+
+    with pytest.raises(ValueError):
+        CacheEntry.decode(data)
+
+
+def test_entry_is_stale_after_its_soft_expiry():
+    assert CacheEntry(payload=PAYLOAD, soft_expire_at=time.time() - 1).is_stale is True
+    assert CacheEntry(payload=PAYLOAD, soft_expire_at=time.time() + 60).is_stale is False
@@ -0,0 +1,100 @@
+import pytest
+from search_engine.inverted_index import (
+    InvertedIndex,
+    analyze,
+    auto_fuzziness,
+    edit_distance,
+)
+
+
+def make_index(*values) -> InvertedIndex:
+    return InvertedIndex(count=len(values), values=enumerate(values))
+
+
+def test_analyze_skips_stop_words_and_keeps_positions():
+    assert analyze("The Lord of the Rings") == [(1, "lord"), (4, "ring")]
+
+
+@pytest.mark.parametrize(
+    "word, term",
+    [("Wars", "war"), ("stories", "story"), ("Frodo's", "frodo"), ("glass", "glass"), ("virus", "virus")],
+)
+def test_analyze_stems_plurals_and_possessives(word, term):
+    assert analyze(word) == [(0, term)]
+
+
+@pytest.mark.parametrize(
+    "source, target, limit, distance",
+    [
+        ("star", "star", 2, 0),
+        ("star", "stra", 2, 1),
+        ("star", "stor", 2, 1),
+        ("star", "stars", 2, 1),
+        ("star", "trek", 1, 2),
+        ("star", "st", 1, 2),
+    ],
+)
+def test_edit_distance_counts_transpositions_and_stops_past_the_limit(source, target, limit, distance):
+    assert edit_distance(source, target, limit) == distance
+
+
+@pytest.mark.parametrize("term, edits", [("ab", 0), ("star", 1), ("trek", 1), ("galaxy", 2)])
+def test_auto_fuzziness(term, edits):
+    assert auto_fuzziness(term) == edits
+
+
+def test_match_terms_scores_frequent_terms_in_short_documents_higher():
+    index = make_index("star wars", "star wars star", "star wars and a very long title about other things", "trek")
+
+    scores = index.match_terms(["star"])
+
+    assert set(scores) == {0, 1, 2}
+    assert scores[1] > scores[0] > scores[2]
+
+
+def test_match_terms_scores_rare_terms_higher():
+    index = make_index("star wars", "star trek", "star gate")
+
+    scores = index.match_terms(["star", "wars"])
+
+    assert max(scores, key=scores.get) == 0
+    assert scores[1] == scores[2]
+
+
+def test_match_phrase_requires_the_relative_positions():
+    index = make_index("star wars", "wars star", "star of wars")
+
+    scores = index.match_phrase(analyze("star wars"))
+
+    # Stop words keep their positions, so "star of wars" does not match a two word phrase.
+    assert set(scores) == {0}
+    assert set(index.match_phrase(analyze("star the wars"))) == {2}
+
+
+def test_match_phrase_does_not_cross_array_values():
+    index = make_index(["Mark Hamill", "Harrison Ford"], ["Hamill Harrison"])
+
+    assert set(index.match_phrase(analyze("hamill harrison"))) == {1}
+
+
+def test_match_fuzzy_weighs_closer_expansions_higher():
+    index = make_index("star", "stair", "trek")
+
+    scores = index.match_fuzzy(["star"], prefix_length=0, max_expansions=50)
+
+    assert set(scores) == {0, 1}
+    assert scores[1] == pytest.approx(scores[0] * (1 - 1 / 5))
+
+
+def test_expand_keeps_the_prefix_and_the_closest_terms():
+    index = make_index("warp", "wars", "bars", "worse")
+
+    assert index.expand("warz", prefix_length=1, max_expansions=50) == [("war", 1), ("warp", 1)]
+    assert index.expand("warz", prefix_length=1, max_expansions=1) == [("war", 1)]
+
+
+def test_empty_and_missing_values_are_indexed_as_empty_documents():
+    index = make_index(None, "", ["star", None])
+
+    assert list(index.lengths) == [0, 0, 1]
+    assert index.match_terms(["star"]).keys() == {2}
@@ -0,0 +1,132 @@
+import asyncio
+
+import pytest
+from fakeredis import FakeAsyncRedis
+from rate_limit.rate_limiter import LocalRateLimiter, RateLimit, RedisRateLimiter
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+# One request per 10 seconds, so that the time the test takes barely regenerates the burst.
+RATE = 0.1
+BURST = 3
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+class BrokenScript:
+    """Registers scripts that hang or fail, and counts their calls."""
+
+    def __init__(self, error: Exception | None = None):
+        self.error = error
+        self.calls = 0
+
+    def register_script(self, script):
+        async def call(**kwargs):
+            self.calls += 1
+            if self.error is not None:
+                raise self.error
+            await asyncio.sleep(10)
+
+        return call
+
+
+@pytest.fixture
+async def redis():
+    redis = FakeAsyncRedis()
+    yield redis
+    await redis.close()
+
+
+def make_limiter(redis, cooldown: float = 5, timeout: float = 1) -> RedisRateLimiter:
+    return RedisRateLimiter(
+        redis=redis, rate=RATE, burst=BURST, prefix="rate_limit:test", cooldown=cooldown, timeout=timeout
+    )
+
+
+async def test_script_allows_the_burst_and_counts_down_the_remaining_requests(redis):
+    limiter = make_limiter(redis)
+
+    limits = [await limiter.acquire("client") for _ in range(BURST)]
+
+    assert [limit.allowed for limit in limits] == [True] * BURST
+    assert [limit.remaining for limit in limits] == [2, 1, 0]
+    assert [limit.reset_after for limit in limits] == pytest.approx([10, 20, 30], abs=0.5)
+    assert all(limit.retry_after == 0 for limit in limits)
+
+
+async def test_script_rejects_requests_past_the_burst_with_retry_after(redis):
+    limiter = make_limiter(redis)
+    for _ in range(BURST):
+        await limiter.acquire("client")
+
+    limit = await limiter.acquire("client")
+
+    assert limit.allowed is False
+    assert limit.remaining == 0
+    assert limit.retry_after == pytest.approx(10, abs=0.5)
+    assert limit.reset_after == pytest.approx(30, abs=0.5)
+    assert limit.headers["Retry-After"] == "10"
+
+
+async def test_rejected_requests_do_not_use_up_the_rate(redis):
+    limiter = make_limiter(redis)
+    for _ in range(BURST + 5):
+        limit = await limiter.acquire("client")
+
+    assert limit.retry_after == pytest.approx(10, abs=0.5)
+
+
+async def test_script_limits_clients_independently(redis):
+    limiter = make_limiter(redis)
+    for _ in range(BURST):
+        await limiter.acquire("client")
+
+    limit = await limiter.acquire("other client")
+
+    assert limit.allowed is True
+    assert limit.remaining == BURST - 1
+
+
+async def test_script_expires_the_key_once_the_burst_is_regained(redis):
+    limiter = make_limiter(redis)
+    await limiter.acquire("client")
+    await limiter.acquire("client")
+
+    assert await redis.pttl("rate_limit:test:client") == pytest.approx(20_000, abs=500)
+
+
+@pytest.mark.parametrize("broken", [BrokenScript(RedisConnectionError("refused")), BrokenScript()])
+async def test_limiter_falls_back_to_the_process_when_redis_fails(broken):
+    limiter = make_limiter(broken, timeout=0.05)
+
+    limits = [await limiter.acquire("client") for _ in range(BURST + 1)]
+
+    assert [limit.allowed for limit in limits] == [True] * BURST + [False]
+    # Redis is not tried again until the cooldown is over.
+    assert broken.calls == 1
+
+
+def test_local_limiter_follows_the_same_algorithm(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr("rate_limit.rate_limiter.time", clock)
+    limiter = LocalRateLimiter(rate=RATE, burst=BURST)
+
+    limits = [limiter.acquire("client") for _ in range(BURST + 1)]
+    clock.now += 10
+    regained = limiter.acquire("client")
+
+    assert [limit.remaining for limit in limits] == [2, 1, 0, 0]
+    assert limits[-1] == RateLimit(allowed=False, limit=BURST, remaining=0, retry_after=10, reset_after=30)
+    assert regained.allowed is True
+    assert regained.remaining == 0
+
+
+def test_headers_of_an_allowed_request():
+    limit = RateLimit(allowed=True, limit=10, remaining=4, retry_after=0, reset_after=5.2)
+
+    assert limit.headers == {"RateLimit-Limit": "10", "RateLimit-Remaining": "4", "RateLimit-Reset": "6"}
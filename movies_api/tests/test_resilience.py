@@ -0,0 +1,236 @@
+import asyncio
+import time
+
+import pytest
+from resilience.circuit_breaker import CircuitBreaker
+from resilience.deadline import remaining_time, request_deadline
+from resilience.errors import CircuitOpenError, DeadlineExceeded, DependencyUnavailable
+from resilience.policy import ResiliencePolicy
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+class Transient(Exception):
+    pass
+
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr("resilience.circuit_breaker.time", clock)
+    return clock
+
+
+def make_breaker(failure_threshold: int = 2, reset_timeout: float = 10) -> CircuitBreaker:
+    return CircuitBreaker("dependency", failure_threshold=failure_threshold, reset_timeout=reset_timeout)
+
+
+def make_policy(breaker: CircuitBreaker, attempts: int = 3, attempt_timeout: float = 1, wait_base: float = 0):
+    return ResiliencePolicy(
+        breaker=breaker,
+        is_transient=lambda error: isinstance(error, Transient),
+        attempts=attempts,
+        wait_base=wait_base,
+        wait_max=wait_base,
+        attempt_timeout=attempt_timeout,
+    )
+
+
+def dependency(*outcomes):
+    """A call raising or returning the outcomes in turn, the last one for good, and the times it was called."""
+    calls = []
+
+    async def call():
+        outcome = outcomes[min(len(calls), len(outcomes) - 1)]
+        calls.append(time.monotonic())
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    return call, calls
+
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = make_breaker()
+    breaker.record_failure()
+    breaker.before_call()
+    breaker.record_failure()
+
+    assert breaker.is_open
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_breaker_success_resets_the_failures(clock):
+    breaker = make_breaker()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+
+    assert not breaker.is_open
+
+
+def test_breaker_lets_one_probe_through_after_the_reset_timeout(clock):
+    breaker = make_breaker()
+    breaker.record_failure()
+    breaker.record_failure()
+
+    clock.now += 10
+    breaker.before_call()
+
+    assert breaker.half_open
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_breaker_closes_when_the_probe_succeeds(clock):
+    breaker = make_breaker()
+    breaker.record_failure()
+    breaker.record_failure()
+    clock.now += 10
+    breaker.before_call()
+
+    breaker.record_success()
+
+    assert not breaker.is_open
+    assert not breaker.half_open
+    breaker.before_call()
+
+
+def test_breaker_opens_again_when_the_probe_fails(clock):
+    breaker = make_breaker()
+    breaker.record_failure()
+    breaker.record_failure()
+    clock.now += 10
+    breaker.before_call()
+
+    clock.now += 3
+    breaker.record_failure()
+
+    assert breaker.is_open
+    assert not breaker.half_open
+    clock.now += 9
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    clock.now += 1
+    breaker.before_call()
+
+
+def test_breaker_replaces_a_probe_that_never_reports(clock):
+    breaker = make_breaker()
+    breaker.record_failure()
+    breaker.record_failure()
+    clock.now += 10
+    breaker.before_call()
+
+    clock.now += 10
+    breaker.before_call()
+
+    assert breaker.half_open
+
+
+async def test_policy_retries_transient_errors():
+    breaker = make_breaker(failure_threshold=5)
+    call, calls = dependency(Transient(), "ok")
+
+    assert await make_policy(breaker).call(call) == "ok"
+    assert len(calls) == 2
+    assert breaker.failures == 0
+
+
+async def test_policy_raises_dependency_unavailable_after_the_last_attempt():
+    breaker = make_breaker(failure_threshold=5)
+    call, calls = dependency(Transient())
+
+    with pytest.raises(DependencyUnavailable) as error:
+        await make_policy(breaker, attempts=3).call(call)
+
+    assert len(calls) == 3
+    assert isinstance(error.value.__cause__, Transient)
+    assert breaker.failures == 3
+
+
+async def test_policy_raises_other_errors_at_once_without_counting_them():
+    breaker = make_breaker()
+    call, calls = dependency(KeyError("missing"))
+
+    with pytest.raises(KeyError):
+        await make_policy(breaker).call(call)
+
+    assert len(calls) == 1
+    assert breaker.failures == 0
+
+
+async def test_policy_times_out_attempts_and_counts_them_as_failures():
+    breaker = make_breaker(failure_threshold=5)
+
+    async def hang():
+        await asyncio.sleep(10)
+
+    started = time.monotonic()
+    with pytest.raises(DependencyUnavailable) as error:
+        await make_policy(breaker, attempts=2, attempt_timeout=0.05).call(hang)
+
+    assert time.monotonic() - started < 1
+    assert isinstance(error.value.__cause__, TimeoutError)
+    assert breaker.failures == 2
+
+
+async def test_policy_does_not_call_an_open_breaker():
+    breaker = make_breaker(failure_threshold=1)
+    breaker.record_failure()
+    call, calls = dependency(Transient())
+
+    with pytest.raises(CircuitOpenError):
+        await make_policy(breaker).call(call)
+
+    assert calls == []
+
+
+async def test_policy_limits_attempts_to_the_request_deadline():
+    breaker = make_breaker()
+
+    async def hang():
+        await asyncio.sleep(10)
+
+    with request_deadline(0.05), pytest.raises(DeadlineExceeded):
+        await make_policy(breaker, attempt_timeout=5).call(hang)
+
+    # The request ran out of time, which says nothing about the dependency.
+    assert breaker.failures == 0
+
+
+async def test_policy_does_not_wait_for_a_retry_past_the_request_deadline():
+    breaker = make_breaker(failure_threshold=5)
+    call, calls = dependency(Transient())
+
+    started = time.monotonic()
+    with request_deadline(0.5), pytest.raises(DependencyUnavailable):
+        await make_policy(breaker, wait_base=60).call(call)
+
+    assert len(calls) == 1
+    assert time.monotonic() - started < 0.5
+
+
+async def test_policy_does_not_call_without_time_left():
+    call, calls = dependency(Transient())
+
+    with request_deadline(0), pytest.raises(DeadlineExceeded):
+        await make_policy(make_breaker()).call(call)
+
+    assert calls == []
+
+
+def test_request_deadline_is_lifted_with_none():
+    assert remaining_time() is None
+    with request_deadline(5):
+        assert 0 < remaining_time() <= 5
+        with request_deadline(None):
+            assert remaining_time() is None
+    assert remaining_time() is None
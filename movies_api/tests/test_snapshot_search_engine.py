@@ -0,0 +1,190 @@
+import asyncio
+import os
+
+import pytest
+from elastic_transport import ConnectionError as TransportConnectionError
+from elasticsearch import NotFoundError
+from search_engine.snapshot_format import write_snapshot
+from search_engine.snapshot_search_engine import SnapshotSearchEngine
+
+FILMS = [
+    {"id": "f1", "title": "Star Wars", "imdb_rating": 8.6, "genre": ["Sci-Fi"], "actors": [{"id": "p1"}]},
+    {"id": "f2", "title": "Star Trek", "imdb_rating": 7.9, "genre": ["Sci-Fi"], "actors": [{"id": "p2"}]},
+    {"id": "f3", "title": "The Lord of the Rings", "imdb_rating": 8.8, "genre": ["Fantasy"], "actors": []},
+    {"id": "f4", "title": "Wars of the Worlds", "imdb_rating": None, "genre": ["Sci-Fi"], "actors": [{"id": "p1"}]},
+    {"id": "f5", "title": "Hope Floats", "imdb_rating": 7.9, "genre": ["Drama"], "actors": []},
+]
+
+
+@pytest.fixture
+def snapshot_path(tmp_path) -> str:
+    path = str(tmp_path / "search.snapshot")
+    write_snapshot(path, {"movies": FILMS, "genres": [{"id": "g1", "name": "Drama"}]})
+    return path
+
+
+@pytest.fixture
+async def engine(snapshot_path):
+    engine = SnapshotSearchEngine(snapshot_path)
+    yield engine
+    await engine.close()
+
+
+def ids(response: dict) -> list[str]:
+    return [hit["_id"] for hit in response["hits"]["hits"]]
+
+
+async def test_get_returns_the_source(engine):
+    response = await engine.get(index="movies", id="f2")
+
+    assert response["found"] is True
+    assert response["_source"] == FILMS[1]
+
+
+async def test_get_of_a_missing_document_raises_not_found(engine):
+    with pytest.raises(NotFoundError):
+        await engine.get(index="movies", id="missing")
+
+
+async def test_mget_reports_missing_documents(engine):
+    response = await engine.mget(index="movies", ids=["f1", "missing"])
+
+    assert [doc["found"] for doc in response["docs"]] == [True, False]
+
+
+async def test_unwritten_snapshot_is_unavailable(tmp_path):
+    engine = SnapshotSearchEngine(str(tmp_path / "missing.snapshot"))
+
+    assert await engine.is_available() is False
+    with pytest.raises(TransportConnectionError):
+        await engine.search(index="movies", body={"query": {"match_all": {}}})
+
+
+async def test_replaced_snapshot_is_reloaded(snapshot_path):
+    engine = SnapshotSearchEngine(snapshot_path, check_interval=0)
+    assert (await engine.search(index="movies", body={}))["hits"]["total"]["value"] == len(FILMS)
+
+    write_snapshot(snapshot_path, {"movies": FILMS[:2]})
+    # Makes sure the version differs even where the file system reuses the inode.
+    os.utime(snapshot_path, ns=(0, 0))
+
+    # Searches keep using the previous snapshot while the new one loads in a thread.
+    for _ in range(100):
+        total = (await engine.search(index="movies", body={}))["hits"]["total"]["value"]
+        if total == 2:
+            break
+        await asyncio.sleep(0.01)
+    await engine.close()
+
+    assert total == 2
+
+
+async def test_multi_match_ranks_the_best_match_first(engine):
+    body = {"query": {"multi_match": {"query": "star wars", "fields": ["title"]}}}
+
+    response = await engine.search(index="movies", body=body)
+
+    assert ids(response)[0] == "f1"
+    assert set(ids(response)) == {"f1", "f2", "f4"}
+    assert response["hits"]["max_score"] == response["hits"]["hits"][0]["_score"]
+
+
+async def test_multi_match_phrase_and_fuzzy(engine):
+    phrase = {"query": {"multi_match": {"query": "star wars", "fields": ["title"], "type": "phrase"}}}
+    fuzzy = {"query": {"multi_match": {"query": "strr", "fields": ["title"], "fuzziness": "AUTO"}}}
+
+    assert ids(await engine.search(index="movies", body=phrase)) == ["f1"]
+    assert set(ids(await engine.search(index="movies", body=fuzzy))) == {"f1", "f2"}
+
+
+async def test_field_boost_multiplies_the_score(engine):
+    plain = {"query": {"multi_match": {"query": "hope", "fields": ["title"]}}}
+    boosted = {"query": {"multi_match": {"query": "hope", "fields": ["title^3"]}}}
+
+    plain_score = (await engine.search(index="movies", body=plain))["hits"]["max_score"]
+    boosted_score = (await engine.search(index="movies", body=boosted))["hits"]["max_score"]
+
+    assert boosted_score == pytest.approx(3 * plain_score)
+
+
+async def test_bool_filters_by_terms_and_nested_terms(engine):
+    body = {
+        "query": {
+            "bool": {
+                "must": [{"multi_match": {"query": "wars", "fields": ["title"]}}],
+                "filter": [
+                    {"terms": {"genre": ["Sci-Fi"]}},
+                    {"nested": {"path": "actors", "query": {"terms": {"actors.id": ["p1"]}}}},
+                ],
+            }
+        }
+    }
+
+    assert set(ids(await engine.search(index="movies", body=body))) == {"f1", "f4"}
+
+
+@pytest.mark.parametrize(
+    "order, expected",
+    [("desc", ["f3", "f1", "f2", "f5", "f4"]), ("asc", ["f2", "f5", "f1", "f3", "f4"])],
+)
+async def test_rating_sort_breaks_ties_by_id_and_puts_unrated_last(engine, order, expected):
+    body = {"size": 10, "sort": [{"imdb_rating": order}, {"id": "asc"}]}
+
+    response = await engine.search(index="movies", body=body)
+
+    assert ids(response) == expected
+    assert response["hits"]["hits"][-1]["sort"] == [None, "f4"]
+
+
+@pytest.mark.parametrize("order", ["desc", "asc"])
+async def test_search_after_pages_follow_the_sort(engine, order):
+    sort = [{"imdb_rating": order}, {"id": "asc"}]
+    full = ids(await engine.search(index="movies", body={"size": 10, "sort": sort}))
+
+    pages, search_after = [], None
+    while True:
+        body = {"size": 2, "sort": sort}
+        if search_after is not None:
+            body["search_after"] = search_after
+        hits = (await engine.search(index="movies", body=body))["hits"]["hits"]
+        if not hits:
+            break
+        pages += [hit["_id"] for hit in hits]
+        search_after = hits[-1]["sort"]
+
+    assert pages == full
+
+
+async def test_from_and_size_page_and_source_is_filtered(engine):
+    body = {"from": 1, "size": 2, "sort": [{"imdb_rating": "desc"}, {"id": "asc"}], "_source": ["title"]}
+
+    response = await engine.search(index="movies", body=body)
+
+    assert response["hits"]["total"]["value"] == len(FILMS)
+    assert [hit["_source"] for hit in response["hits"]["hits"]] == [{"title": "Star Wars"}, {"title": "Star Trek"}]
+
+
+async def test_suggest_completes_the_prefix(engine):
+    body = {"size": 0, "suggest": {"titles": {"prefix": "sta", "completion": {"field": "title", "size": 5}}}}
+
+    response = await engine.search(index="movies", body=body)
+
+    options = response["suggest"]["titles"][0]["options"]
+    assert [option["text"] for option in options] == ["Star Trek", "Star Wars"]
+
+
+async def test_point_in_time_search_runs_on_its_index(engine):
+    pit = await engine.open_point_in_time(index="movies", keep_alive="1m")
+
+    response = await engine.search(index=None, body={"pit": {"id": pit["id"]}, "size": 1})
+
+    assert response["pit_id"] == pit["id"]
+    assert response["hits"]["total"]["value"] == len(FILMS)
+
+
+async def test_msearch_reports_errors_per_search(engine):
+    response = await engine.msearch([{"index": "movies"}, {"size": 1}, {"index": "missing"}, {"size": 1}])
+
+    first, second = response["responses"]
+    assert first["hits"]["total"]["value"] == len(FILMS)
+    assert second["status"] == 404
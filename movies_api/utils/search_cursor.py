@@ -0,0 +1,19 @@
+import base64
+
+import orjson
+
+
+def encode_cursor(position: dict) -> str:
+    """Pack the position of a page into an opaque url-safe token."""
+    return base64.urlsafe_b64encode(orjson.dumps(position)).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> dict:
+    """Unpack a token made by ``encode_cursor``, raising ValueError if it is malformed."""
+    try:
+        position = orjson.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError as e:
+        raise ValueError("Malformed cursor") from e
+    if not isinstance(position, dict) or not isinstance(position.get("after"), list):
+        raise ValueError("Malformed cursor")
+    return position
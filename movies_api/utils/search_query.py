@@ -0,0 +1,31 @@
+import hashlib
+from enum import Enum
+
+# Bump whenever the normalization or the key layout changes, so that old page keys are never read.
+SEARCH_KEY_VERSION = 3
+
+
+def normalize_search(search: str | None) -> str | None:
+    """
+    Bring equivalent search queries to one form: lower case, single spaces.
+
+    The normalized query is also the one sent to the search engine, so it only does what the
+    analyzers of the indexes do anyway and never changes the results: they split on whitespace
+    and lowercase, but neither fold case further, like "ß" to "ss", nor apply Unicode NFKC.
+
+    Returns None for queries without any text, as they match everything.
+    """
+    if search is None:
+        return None
+    normalized = " ".join(search.lower().split())
+    return normalized or None
+
+
+def search_digest(search: str | None, sort: str | None = None, related_to: tuple[str, str] | None = None) -> str:
+    """Fixed-length digest of the normalized query, sort order and relation filter, used in cache keys."""
+    if isinstance(sort, Enum):
+        sort = sort.value
+    key = f"{normalize_search(search) or ''}\x00{sort or ''}"
+    if related_to:
+        key += "\x00{}={}".format(*related_to)
+    return f"v{SEARCH_KEY_VERSION}:" + hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
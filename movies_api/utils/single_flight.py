@@ -0,0 +1,121 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Optional
+
+from cache_storage.cache_storage_protocol import CacheStorageProtocol
+from core.config import settings
+from redis.exceptions import LockError, RedisError
+from resilience.deadline import remaining_time, request_deadline
+from resilience.errors import DeadlineExceeded, DependencyUnavailable
+from resilience.policy import ResiliencePolicy
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into a single in-flight call.
+
+    Every caller of ``do`` with a key that is already being fetched awaits the result of the
+    running call instead of starting its own. When ``lock_storage`` is given, the leader of
+    each worker additionally takes a Redis lock, so only one worker fetches the key while the
+    others poll ``check`` until the value shows up in the cache. Lock calls go through
+    ``lock_policy``, and a caller fetches the value itself when Redis fails to answer them.
+
+    The shared call runs without the deadline of the request that started it, as it serves the
+    other callers too; each caller waits for it only as long as its own deadline allows, and gets
+    DeadlineExceeded past it.
+    """
+
+    def __init__(
+        self,
+        lock_storage: Optional[CacheStorageProtocol] = None,
+        lock_timeout: float = 10,
+        poll_interval: float = 0.05,
+        lock_policy: Optional[ResiliencePolicy] = None,
+    ):
+        self.lock_storage = lock_storage
+        self.lock_timeout = lock_timeout
+        self.poll_interval = poll_interval
+        self.lock_policy = lock_policy
+        self._calls: dict[str, asyncio.Task] = {}
+
+    def in_flight(self, key: str) -> bool:
+        return key in self._calls
+
+    async def do(
+        self,
+        key: str,
+        func: Callable[[], Awaitable[Any]],
+        check: Optional[Callable[[], Awaitable[Any]]] = None,
+    ) -> Any:
+        task = self._calls.get(key)
+        if task is None:
+            with request_deadline(None):
+                if self.lock_storage is not None:
+                    task = asyncio.ensure_future(self._do_with_lock(key, func, check))
+                else:
+                    task = asyncio.ensure_future(func())
+            self._calls[key] = task
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        try:
+            async with asyncio.timeout(remaining_time()) as timeout:
+                # A cancelled waiter must not cancel the fetch shared with the other waiters.
+                return await asyncio.shield(task)
+        except TimeoutError as e:
+            if not timeout.expired():
+                raise
+            raise DeadlineExceeded(f"No time left to wait for {key}") from e
+
+    async def _do_with_lock(
+        self,
+        key: str,
+        func: Callable[[], Awaitable[Any]],
+        check: Optional[Callable[[], Awaitable[Any]]],
+    ) -> Any:
+        lock = self.lock_storage.lock(f"lock_{key}", timeout=self.lock_timeout, thread_local=False)
+        try:
+            acquired = await self._call_lock(lock.acquire, blocking=False)
+        except (RedisError, DependencyUnavailable) as e:
+            logger.warning("Unable to take lock for %s, fetching without it: %s", key, e)
+            return await func()
+
+        if acquired:
+            try:
+                return await func()
+            finally:
+                try:
+                    await self._call_lock(lock.release)
+                except (LockError, RedisError, DependencyUnavailable):
+                    pass
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.lock_timeout
+        while loop.time() < deadline:
+            await asyncio.sleep(self.poll_interval)
+            if check is not None:
+                result = await check()
+                if result:
+                    return result
+            try:
+                if not await self._call_lock(lock.locked):
+                    break
+            except (RedisError, DependencyUnavailable) as e:
+                logger.warning("Unable to check lock for %s, fetching without it: %s", key, e)
+                break
+        return await func()
+
+    async def _call_lock(self, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        if self.lock_policy is None:
+            return await func(*args, **kwargs)
+        return await self.lock_policy.call(func, *args, **kwargs)
+
+
+def build_single_flight(cache_storage: CacheStorageProtocol, lock_policy: ResiliencePolicy) -> SingleFlight:
+    if settings.single_flight_redis_lock:
+        return SingleFlight(
+            lock_storage=cache_storage,
+            lock_timeout=settings.single_flight_lock_timeout,
+            lock_policy=lock_policy,
+        )
+    return SingleFlight()
@@ -0,0 +1,42 @@
+"""
+Pre-populates the cache without starting the API, e.g. after a deploy or a Redis flush.
+
+    python warm_cache.py
+"""
+import asyncio
+import logging
+
+from core.config import settings
+from db.tracer import tracer
+from elasticsearch import AsyncElasticsearch
+from redis.asyncio import Redis
+from services.cache_warmup import CacheWarmer
+from services.film import get_film_service
+from services.genre import get_genre_service
+
+WARMUP_ATTEMPTS = 3
+
+
+async def warm_cache():
+    redis = Redis(host=settings.redis_host, port=settings.redis_port)
+    elastic = AsyncElasticsearch(hosts=[settings.elastic_url])
+    try:
+        warmer = CacheWarmer(
+            film_service=get_film_service(redis=redis, elastic=elastic, tracer=tracer, local_cache=None),
+            genre_service=get_genre_service(redis=redis, elastic=elastic, tracer=tracer, local_cache=None),
+            film_pages=settings.cache_warmup_film_pages,
+            page_size=settings.cache_warmup_page_size,
+            concurrency=settings.cache_warmup_concurrency,
+            max_attempts=WARMUP_ATTEMPTS,
+        )
+        await warmer.run(threshold=settings.cache_warmup_ready_threshold)
+    finally:
+        await redis.close()
+        await elastic.close()
+    if not warmer.is_ready(settings.cache_warmup_ready_threshold):
+        logging.error("Cache warm-up did not reach the threshold: %.0f%%", warmer.progress * 100)
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(warm_cache())
@@ -78,7 +78,11 @@ class MoviesTransformQuery(BaseQueryBuilder):
                             )
                         ) FILTER (WHERE p.id IS NOT NULL AND pfw.role = 'writer'),
                         '[]'::json
-                    ) AS writers
+                    ) AS writers,
+                    array_remove(
+                        ARRAY[fw.title, substring(fw.title from ' (.+)$')],
+                        NULL
+                    ) AS title_suggest
                     FROM content.film_work fw
                     LEFT JOIN content.person_film_work pfw ON pfw.film_work_id = fw.id
                     LEFT JOIN content.person p ON p.id = pfw.person_id
@@ -95,7 +99,11 @@ class PersonTransformQuery(BaseQueryBuilder):
         return """
         SELECT p.id,
             p.full_name,
-            COALESCE(jsonb_agg(film_roles), '[]'::jsonb) AS films
+            COALESCE(jsonb_agg(film_roles), '[]'::jsonb) AS films,
+            array_remove(
+                ARRAY[p.full_name, substring(p.full_name from ' (.+)$')],
+                NULL
+            ) AS full_name_suggest
         FROM content.person p
         LEFT JOIN (
             SELECT pfw.person_id,
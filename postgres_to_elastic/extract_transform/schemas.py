@@ -14,6 +14,7 @@ class FilmWork:
     genre: list[str] = field(default_factory=list)
     actors: list[dict] = field(default_factory=list)
     writers: list[dict] = field(default_factory=list)
+    title_suggest: list[str] = field(default_factory=list)
 
 
 @dataclass
@@ -28,3 +29,4 @@ class Person:
     id: UUID
     full_name: str
     films: list[dict] = field(default_factory=list)
+    full_name_suggest: list[str] = field(default_factory=list)
@@ -0,0 +1,43 @@
+import json
+import logging
+from typing import Iterable
+
+from load.elastic_config import ElasticIndexName
+from redis.client import Redis
+from time_event_decorators.backoff import backoff_public_methods
+
+
+@backoff_public_methods()
+class ChangePublisher:
+    def __init__(self, redis_adapter: Redis, stream: str, max_length: int = 10000) -> None:
+        """
+        Publishes ids of re-indexed documents to a Redis stream, so that consumers can evict their caches.
+
+        Every publication also increments the generation of the index. Consumers use it to
+        invalidate cached search pages of the index at once.
+
+        :param redis_adapter: Redis client.
+        :param stream: Name of the Redis stream.
+        :param max_length: Approximate number of messages kept in the stream.
+        """
+        self.redis_adapter = redis_adapter
+        self.stream = stream
+        self.max_length = max_length
+
+    def publish(self, es_index: ElasticIndexName, ids: Iterable) -> None:
+        """
+        Publishes ids of documents loaded to the index.
+
+        :return: None
+        """
+        ids = [str(document_id) for document_id in ids]
+        if not ids:
+            return
+        generation = self.redis_adapter.incr(f"{self.stream}_generation_{es_index.value}")
+        self.redis_adapter.xadd(
+            self.stream,
+            {"index": es_index.value, "ids": json.dumps(ids), "generation": generation},
+            maxlen=self.max_length,
+            approximate=True,
+        )
+        logging.info("Published %s changed ids of %s", len(ids), es_index.value)
@@ -38,6 +38,7 @@ ELASTIC_PERSON_MAPPING = {
             "type": "text",
             "analyzer": "ru_en",
         },
+        "full_name_suggest": {"type": "completion", "analyzer": "simple"},
         "films": {
             "type": "nested",
             "dynamic": "strict",
@@ -63,6 +64,7 @@ ELASTIC_MOVIE_MAPPING = {
             "analyzer": "ru_en",
             "fields": {"raw": {"type": "keyword"}},
         },
+        "title_suggest": {"type": "completion", "analyzer": "simple"},
         "description": {
             "type": "text",
             "analyzer": "ru_en",
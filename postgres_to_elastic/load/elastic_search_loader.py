@@ -40,11 +40,18 @@ class ElasticLoader:
             logging.info("You passed empty data to load to: %s".format(es_index))
             return
         actions = ElasticLoader.transform_data_to_actions(es_data, es_index)
-        helpers.bulk(self.es, actions)
+        # Wait until searches see the documents: the changes are published right after, and the APIs
+        # would otherwise cache the documents as they were before under the new generation.
+        helpers.bulk(self.es, actions, refresh="wait_for")
 
     def create_indexes(self):
         for elastic_configuration in self.es_configs:
             if self.has_index(elastic_configuration.elastic_index.value):
+                # New fields, like the suggestion ones, are added to indexes created before them.
+                self.es.indices.put_mapping(
+                    index=elastic_configuration.elastic_index.value,
+                    properties=elastic_configuration.mapping["properties"],
+                )
                 continue
             self.es.indices.create(
                 index=elastic_configuration.elastic_index.value,
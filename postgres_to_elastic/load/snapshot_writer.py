@@ -0,0 +1,48 @@
+import logging
+import os
+from typing import Iterator
+
+from elasticsearch import Elasticsearch, helpers
+from load.elastic_config import ElasticIndexName
+from snapshot_format import write_snapshot
+
+
+class SnapshotWriter:
+    def __init__(self, es_url: str, path: str) -> None:
+        """
+        Writes the documents of the indexes to a snapshot file, which the movies API searches when
+        Elasticsearch is unavailable.
+
+        The layout and the writer are the ones of movies_api/search_engine/snapshot_format.py, which
+        the image copies next to this package. Documents are written as they are scrolled, the file is
+        replaced atomically once it is complete.
+
+        Unlike the loader, the writer is not retried: the snapshot only serves the API while Elasticsearch
+        is down, so a failed write is left to the next run instead of holding up the indexing.
+
+        :param es_url: Elasticsearch url.
+        :param path: Path of the snapshot file.
+        """
+        self.es = Elasticsearch(es_url)
+        self.path = path
+        self._outdated = True
+
+    def outdated(self) -> bool:
+        """Whether the snapshot is missing or the last write failed, so it must be written even without changes."""
+        return self._outdated or not os.path.exists(self.path)
+
+    def write(self, es_indexes: list[ElasticIndexName]) -> None:
+        """
+        Writes a snapshot of the indexes.
+
+        :return: None
+        """
+        self._outdated = True
+        write_snapshot(self.path, {es_index.value: self._sources(es_index) for es_index in es_indexes})
+        self._outdated = False
+        logging.info("Wrote search snapshot to %s", self.path)
+
+    def _sources(self, es_index: ElasticIndexName) -> Iterator[dict]:
+        self.es.indices.refresh(index=es_index.value)
+        for document in helpers.scan(self.es, index=es_index.value, query={"query": {"match_all": {}}}):
+            yield document["_source"]
@@ -1,7 +1,11 @@
+import logging
+from typing import TYPE_CHECKING
+
 from extract_transform.boundaries import get_query_boundaries
 from extract_transform.extract_settings import setup_database_orchester
 from extract_transform.postgres_orchester import PostgresOrchester
 from extract_transform.query_manager import PostgresTableName
+from load.change_publisher import ChangePublisher
 from load.elastic_config import ELASTIC_CONFIGS, ElasticIndexName
 from load.elastic_search_loader import ElasticLoader
 from project_setup.env_settings import Settings
@@ -10,6 +14,9 @@ from state.state import State
 from state.storage import RedisStorage
 from time_event_decorators.repeat_after_sleep import repeat_after_sleep
 
+if TYPE_CHECKING:
+    from load.snapshot_writer import SnapshotWriter
+
 ELASTIC_INDEXES = list(ElasticIndexName)
 TABLE_NAMES = list(PostgresTableName)
 
@@ -19,8 +26,11 @@ def synchronise_postgres_elastic(
     loader: ElasticLoader,
     extractor: PostgresOrchester,
     state,
+    publisher: ChangePublisher,
+    snapshot_writer: "SnapshotWriter | None" = None,
 ):
     time_boundaries = None
+    changed = False
     for index in ELASTIC_INDEXES:
         current_state_key = f"{index.value}_update"
         update_state = state.get_state(current_state_key)
@@ -36,10 +46,21 @@ def synchronise_postgres_elastic(
             es_data=data_to_load,
             es_index=index,
         )
+        if data_to_load:
+            changed = True
+            publisher.publish(
+                es_index=index,
+                ids=[document["id"] for document in data_to_load],
+            )
         state.set_state(
             current_state_key,
             time_boundaries.till_time.isoformat(),
         )
+    if snapshot_writer is not None and (changed or snapshot_writer.outdated()):
+        try:
+            snapshot_writer.write(ELASTIC_INDEXES)
+        except Exception:
+            logging.exception("Unable to write the search snapshot, it is written again on the next run")
     return time_boundaries.till_time
 
 
@@ -50,12 +71,26 @@ if __name__ == "__main__":
         es_indexes=ELASTIC_INDEXES,
         es_configs=ELASTIC_CONFIGS,
     )
-    redis_storage = RedisStorage(redis_adapter=Redis.from_url(url=settings.redis_url))
+    redis_adapter = Redis.from_url(url=settings.redis_url)
+    redis_storage = RedisStorage(redis_adapter=redis_adapter)
     state = State(storage=redis_storage)
+    change_publisher = ChangePublisher(
+        redis_adapter=redis_adapter,
+        stream=settings.changes_stream,
+        max_length=settings.changes_stream_max_length,
+    )
+    snapshot_writer = None
+    if settings.snapshot_path:
+        # The snapshot format is copied into the image, see the Dockerfile.
+        from load.snapshot_writer import SnapshotWriter
+
+        snapshot_writer = SnapshotWriter(es_url=settings.elastic_url, path=settings.snapshot_path)
     postgres_receiver_orchester = setup_database_orchester(settings.database_url)
     while True:
         synchronise_postgres_elastic(
             loader=elastic_search_loader,
             extractor=postgres_receiver_orchester,
             state=state,
+            publisher=change_publisher,
+            snapshot_writer=snapshot_writer,
         )
@@ -18,6 +18,9 @@ class Settings(BaseSettings):
     elastic_port: int = Field(default=9200, env="ELASTIC_PORT")
     elastic_scheme: str = Field(default="http", env="ELASTIC_SCHEME")
     repeat_time_seconds: int = Field(default=60, env="REPEAT_TIME_SECONDS")
+    changes_stream: str = Field(default="search_index_changes", validation_alias="CACHE_INVALIDATION_STREAM")
+    changes_stream_max_length: int = Field(default=10000, validation_alias="CACHE_INVALIDATION_STREAM_MAX_LENGTH")
+    snapshot_path: str = Field(default="", validation_alias="SEARCH_SNAPSHOT_PATH")
 
     @property
     def elastic_url(self):